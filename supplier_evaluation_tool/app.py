@@ -1,23 +1,42 @@
+import os
+import time
+import uuid
+import numpy as np
+import pandas as pd
 import streamlit as st
 
 # Import modules from your organized structure
 from ui.header import render_header
 from ui.sidebar import render_sidebar
-from core.data_loader import load_data
-from core.data_preprocessor import preprocess_data
-from core.model_handler import train_model, rank_suppliers
-from utils.chart_generator import generate_chart
-from utils.report_generator import generate_supplier_report
-from utils.pdf_exporter import create_pdf
-
+from ui.profiling_panel import render_profiling_panel
+from core.data_loader import load_data_chunked
+from core.data_preprocessor import analyze_dataset_columns
+from core.deduplication import deduplicate_suppliers
+from core.model_handler import rank_positions
+from core.dataset_store import DatasetStore, dataset_key
+from core.pipeline_cache import PipelineCache
+from core.model_registry import ModelRegistry
+from core.scenarios import weight_perturbations
+from core.job_queue import JobQueue, job_key
+from core.jobs import run_pdf_job, run_ranking_job, run_report_job, run_scenario_job
+from utils.report_generator import DEFAULT_TOKEN_BUDGET, build_compact_report_prompt
+from utils.ranking_export import EXPORT_FORMATS, ExportCache, RankingExport
+from utils.instrumentation import StageRecorder, use_recorder
+
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+if 'stage_recorder' not in st.session_state:
+    st.session_state['stage_recorder'] = StageRecorder()
+# Stage timings go to this session's recorder, so the profiling panel only shows its own runs
+use_recorder(st.session_state['stage_recorder'])
 if 'data' not in st.session_state:
     st.session_state['data'] = None
 if 'ranked_data' not in st.session_state:
     st.session_state['ranked_data'] = None
 if 'report' not in st.session_state:
     st.session_state['report'] = None
-if 'chart_fig' not in st.session_state:
-    st.session_state['chart_fig'] = None
+if 'chart_png' not in st.session_state:
+    st.session_state['chart_png'] = None
 if 'criteria_selected' not in st.session_state:
     st.session_state['criteria_selected'] = []
 if 'column_info' not in st.session_state:
@@ -26,26 +45,141 @@ if 'filter_conditions' not in st.session_state:
     st.session_state['filter_conditions'] = {}
 if 'has_label' not in st.session_state:
     st.session_state['has_label'] = False
+if 'data_fingerprint' not in st.session_state:
+    st.session_state['data_fingerprint'] = None
+if 'uploaded_file_id' not in st.session_state:
+    st.session_state['uploaded_file_id'] = None
+if 'filter_engine' not in st.session_state:
+    st.session_state['filter_engine'] = None
+if 'ranking_inputs' not in st.session_state:
+    st.session_state['ranking_inputs'] = None
+if 'scoring_engine' not in st.session_state:
+    st.session_state['scoring_engine'] = None
+if 'incremental_ranker' not in st.session_state:
+    st.session_state['incremental_ranker'] = None
+if 'row_hashes' not in st.session_state:
+    st.session_state['row_hashes'] = None
+if 'column_stats' not in st.session_state:
+    st.session_state['column_stats'] = None
+if 'attribution_table' not in st.session_state:
+    st.session_state['attribution_table'] = None
+if 'attribution_chart_png' not in st.session_state:
+    st.session_state['attribution_chart_png'] = None
+if 'ranking_fingerprint' not in st.session_state:
+    st.session_state['ranking_fingerprint'] = None
+if 'ranking_job_id' not in st.session_state:
+    st.session_state['ranking_job_id'] = None
+if 'applied_ranking_job_id' not in st.session_state:
+    st.session_state['applied_ranking_job_id'] = None
+if 'ranking_messages' not in st.session_state:
+    st.session_state['ranking_messages'] = []
+if 'report_job_id' not in st.session_state:
+    st.session_state['report_job_id'] = None
+if 'pdf_job_id' not in st.session_state:
+    st.session_state['pdf_job_id'] = None
+if 'scenarios' not in st.session_state:
+    st.session_state['scenarios'] = []
+if 'scenario_job_id' not in st.session_state:
+    st.session_state['scenario_job_id'] = None
+if 'merge_duplicates' not in st.session_state:
+    st.session_state['merge_duplicates'] = False
+if 'dedup_summary' not in st.session_state:
+    st.session_state['dedup_summary'] = None
+
+REPORT_MAX_SUPPLIERS = 25
+JOB_POLL_SECONDS = 0.5
+ATTRIBUTION_METHODS = {
+    'tree_path': "Contributions follow each supplier's path through the decision trees: every split adds or removes probability of a good match.",
+    'centroid_distance': "The score falls from 1 as a supplier moves away from the best cluster centre; each feature takes its share of that distance.",
+    'occlusion': "Each contribution is how much the score drops when that feature is reset to the dataset average.",
+    'weighted_sum': "Each contribution is the criterion weight times the supplier's normalized value; they add up to the score.",
+    'topsis': "Each contribution is the criterion weight times the supplier's normalized value; TOPSIS combines them non-linearly.",
+}
+
+@st.cache_resource
+def get_pipeline_cache():
+    return PipelineCache()
+
+@st.cache_resource
+def get_dataset_store():
+    return DatasetStore(spill_dir=os.environ.get('SUPPLIER_DATASET_DIR'))
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+@st.cache_resource
+def get_export_cache():
+    return ExportCache()
+
+@st.cache_resource
+def get_model_registry():
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_registry')
+    return ModelRegistry(os.environ.get('SUPPLIER_MODEL_DIR', default_dir))
 
 render_header()
+poll_jobs = False
 
 render_sidebar()
 
 st.markdown("<h2 class='sub-header'>Step 1: Upload Supplier Data</h2>", unsafe_allow_html=True)
 uploaded_file = st.file_uploader("Upload your supplier dataset (CSV)", type="csv")
+merge_duplicates = st.checkbox("Merge duplicate suppliers (fuzzy name/address matching)", value=False,
+                               help="Suppliers listed under slightly different names or IDs are merged into one row before ranking")
+
+dataset_store = get_dataset_store()
+dataset_store.touch(st.session_state['session_id'])
+
+def load_uploaded_dataset():
+    uploaded_file.seek(0)
+    data, column_info = load_data_chunked(uploaded_file)
+    if merge_duplicates:
+        try:
+            with st.spinner("Matching duplicate suppliers..."):
+                merged, _ = deduplicate_suppliers(data)
+            if merged is not data:
+                data = merged
+                column_info = analyze_dataset_columns(data)
+        except ValueError as e:
+            st.session_state['dedup_summary'] = f"⚠️ Duplicates not merged: {str(e)}"
+    return data, column_info
 
 if uploaded_file is not None:
     try:
-        data = load_data(uploaded_file)
-        st.session_state['data'] = data
-        st.session_state['has_label'] = 'Label' in data.columns
-
-        from core.data_preprocessor import analyze_dataset_columns
-        st.session_state['column_info'] = analyze_dataset_columns(data)
+        if st.session_state['uploaded_file_id'] != uploaded_file.id or st.session_state['merge_duplicates'] != merge_duplicates:
+            st.session_state['dedup_summary'] = None
+            # Sessions that upload the same file share one copy of the data and its indexes
+            shared = dataset_store.acquire(
+                dataset_key(uploaded_file.getvalue(), merge_duplicates=merge_duplicates),
+                st.session_state['session_id'],
+                load_uploaded_dataset
+            )
+            data = shared.data
+            if merge_duplicates and st.session_state['dedup_summary'] is None:
+                if 'Duplicate_Count' in data.columns:
+                    merged_suppliers = int((data['Duplicate_Count'] > 1).sum())
+                    st.session_state['dedup_summary'] = f"🔗 Merged {int(data['Duplicate_Count'].sum()) - len(data):,} duplicate rows into {merged_suppliers:,} suppliers."
+                else:
+                    st.session_state['dedup_summary'] = "🔗 No duplicate suppliers found."
+            st.session_state['data'] = data
+            st.session_state['has_label'] = 'Label' in data.columns
+            st.session_state['column_info'] = shared.column_info
+            st.session_state['row_hashes'] = shared.row_hashes
+            st.session_state['data_fingerprint'] = shared.fingerprint
+            st.session_state['filter_engine'] = shared.filter_engine
+            st.session_state['column_stats'] = shared.column_stats
+            st.session_state['scoring_engine'] = None
+            st.session_state['scenarios'] = []
+            st.session_state['scenario_job_id'] = None
+            st.session_state['uploaded_file_id'] = uploaded_file.id
+            st.session_state['merge_duplicates'] = merge_duplicates
+        data = st.session_state['data']
 
         st.success(f"✅ Dataset loaded successfully! ({data.shape[0]} rows, {data.shape[1]} columns)")
         if st.session_state['has_label']:
             st.info("📋 Supervised dataset detected with 'Label' column. Will use supervised learning approach.")
+        if st.session_state['dedup_summary']:
+            st.info(st.session_state['dedup_summary'])
 
         with st.expander("Data Preview"):
             st.dataframe(data.head())
@@ -56,7 +190,7 @@ if uploaded_file is not None:
                 st.write(data.dtypes)
             with col2:
                 st.markdown("<p class='info-text'><b>Summary Statistics:</b></p>", unsafe_allow_html=True)
-                st.write(data.describe().round(2))
+                st.write(st.session_state['column_stats'].summary().round(2))
 
     except Exception as e:
         st.error(f"Error loading dataset: {str(e)}")
@@ -71,6 +205,8 @@ if st.session_state['data'] is not None:
 
     selected_criteria = []
     sort_directions = []
+    criteria_weights = {}
+    scoring_method = None
 
     if ranking_method == "Select specific criteria":
         criteria_options = st.multiselect(
@@ -80,6 +216,17 @@ if st.session_state['data'] is not None:
         )
         st.session_state['criteria_selected'] = criteria_options
 
+        scoring_label = st.radio(
+            "How should the criteria be combined?",
+            ["Sort by criteria in order", "Weighted score (TOPSIS)", "Weighted score (weighted sum)"],
+            horizontal=True,
+            help="Sorting lets the first criterion dominate; weighted scores trade criteria off against each other."
+        )
+        scoring_method = {
+            "Weighted score (TOPSIS)": 'topsis',
+            "Weighted score (weighted sum)": 'weighted_sum',
+        }.get(scoring_label)
+
         if criteria_options:
             st.markdown("<p class='info-text'>Configure ranking parameters for each criterion:</p>", unsafe_allow_html=True)
             for criterion in criteria_options:
@@ -100,6 +247,15 @@ if st.session_state['data'] is not None:
                                 horizontal=True
                             )
                             sort_directions.append(True if sort_dir == "Ascending" else False)
+                        if scoring_method:
+                            with col2:
+                                criteria_weights[criterion] = st.number_input(
+                                    f"Weight for {criterion}",
+                                    min_value=0.0,
+                                    value=1.0,
+                                    step=0.5,
+                                    key=f"weight_{criterion}"
+                                )
 
                         with st.expander("Add filter (optional)"):
                             min_val = col_info.get('min', 0)
@@ -112,6 +268,8 @@ if st.session_state['data'] is not None:
                                 step=(max_val - min_val) / 100 if max_val > min_val else 0.1,
                                 key=f"slider_{criterion}"
                             )
+                            range_count = st.session_state['column_stats'].range_count(criterion, filter_min, filter_max)
+                            st.caption(f"{range_count:,} of {len(st.session_state['data']):,} suppliers in this range")
                             if filter_min > min_val or filter_max < max_val:
                                 st.session_state['filter_conditions'][criterion] = {
                                     'type': 'numeric',
@@ -141,6 +299,8 @@ if st.session_state['data'] is not None:
                                 default=unique_values,
                                 key=f"filter_{criterion}"
                             )
+                            member_count = st.session_state['column_stats'].membership_count(criterion, selected_values)
+                            st.caption(f"{member_count:,} of {len(st.session_state['data']):,} suppliers have these values")
                             if len(selected_values) < len(unique_values):
                                 st.session_state['filter_conditions'][criterion] = {
                                     'type': col_type,
@@ -176,6 +336,11 @@ if st.session_state['data'] is not None:
                     st.markdown("</div>", unsafe_allow_html=True)
 
             selected_criteria = criteria_options
+            if scoring_method and not criteria_weights:
+                st.warning("Weighted scoring needs at least one numeric criterion. Falling back to sorting.")
+                scoring_method = None
+            elif scoring_method:
+                st.markdown("<p class='info-text'>Descending criteria are treated as benefits (higher is better), ascending criteria as costs.</p>", unsafe_allow_html=True)
 
     elif st.session_state['has_label']:
         st.info("Using the supervised model to predict and rank suppliers based on their probability of being a good supplier (Label = 1).")
@@ -191,38 +356,76 @@ if st.session_state['data'] is not None:
                 st.markdown(f"• {col}: {', '.join(str(v) for v in filter_info.get('values', []))}")
             elif filter_type == 'text':
                 st.markdown(f"• {col}: Contains '{filter_info.get('search')}'")
+        match_count = int(st.session_state['filter_engine'].mask(st.session_state['filter_conditions']).sum())
+        st.markdown(f"<p class='info-text'><b>{match_count:,}</b> of {len(st.session_state['data']):,} suppliers match all active filters.</p>", unsafe_allow_html=True)
         st.markdown("</div>")
         if st.button("Clear All Filters"):
             st.session_state['filter_conditions'] = {}
 
     st.markdown("<h2 class='sub-header'>Step 3: Process and Rank Suppliers</h2>", unsafe_allow_html=True)
+    model_search = None
+    if st.session_state['has_label'] and not selected_criteria:
+        if st.checkbox("Tune the model (cross-validated search)", help="Compares decision tree, random forest, gradient boosting and logistic regression settings with 5-fold cross-validation, in parallel across all cores."):
+            model_search = {'time_budget': st.slider("Search time budget (seconds)", min_value=10, max_value=300, value=60, step=10)}
+    profile_next_run = st.checkbox("Profile this run with cProfile", help="Adds a cProfile breakdown to the Performance Profile panel.")
     if st.button("Process and Rank Suppliers", type="primary"):
-        with st.spinner("Processing data and ranking suppliers..."):
-            try:
-                X, y, feature_names = preprocess_data(st.session_state['data'])
-                predictions, prediction_probs, accuracy = train_model(X, y)
-
-                if st.session_state['has_label'] and accuracy is not None:
-                    st.metric("Model Accuracy", f"{accuracy * 100:.2f}%")
-
-                ranked_data, error = rank_suppliers(
-                    st.session_state['data'],
-                    st.session_state['filter_conditions'],
-                    predictions,
-                    prediction_probs,
-                    selected_criteria,
-                    sort_directions
-                )
-
-                if error:
-                    st.error(error)
-                else:
-                    st.session_state['ranked_data'] = ranked_data
-                    st.session_state['chart_fig'] = generate_chart(ranked_data, selected_criteria, top_n=10)
-                    st.success("✅ Suppliers ranked successfully!")
-
-            except Exception as e:
-                st.error(f"Error during processing: {e}")
+        request = {
+            'data': st.session_state['data'],
+            'fingerprint': st.session_state['data_fingerprint'],
+            'hashes': st.session_state['row_hashes'],
+            'filter_engine': st.session_state['filter_engine'],
+            'ranker': st.session_state['incremental_ranker'],
+            'scoring_engine': st.session_state['scoring_engine'],
+            'cache': get_pipeline_cache(),
+            'registry': get_model_registry(),
+            'model_search': model_search,
+            'filter_conditions': dict(st.session_state['filter_conditions']),
+            'selected_criteria': selected_criteria,
+            'sort_directions': sort_directions,
+            'scoring_method': scoring_method,
+            'criteria_weights': dict(criteria_weights) if scoring_method else None,
+            'profile': profile_next_run,
+        }
+        # Rankings depend on this session's incremental model, so they are only deduplicated per session
+        key = job_key('rank', st.session_state['session_id'], st.session_state['data_fingerprint'],
+                      request['filter_conditions'], selected_criteria, sort_directions, scoring_method,
+                      request['criteria_weights'], model_search, profile_next_run)
+        job = get_job_queue().submit(key, run_ranking_job, request, name="Ranking suppliers",
+                                     subscriber=st.session_state['session_id'])
+        st.session_state['ranking_job_id'] = job.id
+        st.session_state['ranking_messages'] = []
+
+    ranking_job = get_job_queue().get(st.session_state['ranking_job_id'])
+    if ranking_job is not None and not ranking_job.finished:
+        poll_jobs = True
+        st.progress(ranking_job.progress, text=f"⏳ {ranking_job.message or 'Waiting for a worker...'} ({ranking_job.elapsed:.0f}s)")
+        if st.button("Cancel ranking", disabled=ranking_job.cancel_requested):
+            get_job_queue().cancel(ranking_job.id, subscriber=st.session_state['session_id'])
+    elif ranking_job is not None and st.session_state['applied_ranking_job_id'] != ranking_job.id:
+        st.session_state['applied_ranking_job_id'] = ranking_job.id
+        if ranking_job.status == 'done':
+            result = ranking_job.result
+            for key in ('ranked_data', 'ranking_inputs', 'ranking_fingerprint', 'chart_png', 'attribution_table',
+                        'attribution_chart_png', 'ranking_messages'):
+                st.session_state[key] = result[key]
+            st.session_state['incremental_ranker'] = result['ranker']
+            st.session_state['scoring_engine'] = result['scoring_engine']
+            if result['profile'] is not None:
+                st.session_state['cprofile_result'] = result['profile']
+            st.session_state['ranking_messages'].append(('success', "✅ Suppliers ranked successfully!"))
+        elif ranking_job.status == 'failed':
+            st.session_state['ranking_messages'] = [('error', f"Error during processing: {ranking_job.error}")]
+        else:
+            st.session_state['ranking_messages'] = [('warning', "Ranking cancelled.")]
+
+    for kind, message in st.session_state['ranking_messages']:
+        if kind == 'metric':
+            st.metric(*message)
+        elif kind == 'leaderboard':
+            st.markdown("<p class='info-text'><b>Model search leaderboard:</b></p>", unsafe_allow_html=True)
+            st.dataframe(message)
+        else:
+            getattr(st, kind)(message)
 
     if st.session_state['ranked_data'] is not None:
         st.markdown("<h2 class='sub-header'>Step 4: Results and Report</h2>", unsafe_allow_html=True)
@@ -230,30 +433,200 @@ if st.session_state['data'] is not None:
 
         if 'Supplier_Score' in st.session_state['ranked_data'].columns and st.session_state['has_label']:
             st.info("The 'Supplier_Score' column represents the probability of the supplier being a good match (Label = 1). Higher scores indicate better suppliers.")
+        elif 'Supplier_Score' in st.session_state['ranked_data'].columns:
+            st.info("Without a Label column, suppliers are clustered and the 'Supplier_Score' column is 1 / (1 + distance to the best-performing cluster centre). Higher scores indicate better suppliers.")
 
         st.dataframe(st.session_state['ranked_data'].head(10))
-        csv_data = st.session_state['ranked_data'].to_csv(index=False)
-        st.download_button(
-            label="Download Complete Rankings (CSV)",
-            data=csv_data,
-            file_name="ranked_suppliers.csv",
-            mime="text/csv",
-        )
 
-        if st.session_state['chart_fig']:
+        st.markdown("<p class='info-text'><b>Export Complete Rankings:</b></p>", unsafe_allow_html=True)
+        export_options = list(st.session_state['data'].columns)
+        if not st.session_state['ranking_inputs']['selected_criteria'] and 'Supplier_Score' not in export_options:
+            export_options.append('Supplier_Score')
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS), format_func=lambda fmt: EXPORT_FORMATS[fmt][0])
+        with col2:
+            export_columns = st.multiselect("Columns (all when empty)", options=export_options)
+        export_cache = get_export_cache()
+        export_key = ExportCache.key(st.session_state['ranking_fingerprint'], export_format, export_columns)
+        # Serialization only runs when asked for; reruns reuse the cached bytes
+        payload = export_cache.get(export_key)
+        if payload is None and st.button("Prepare Export"):
+            with st.spinner("Ranking and exporting all matching suppliers..."):
+                positions, scores, error = rank_positions(
+                    st.session_state['data'],
+                    filter_engine=st.session_state['filter_engine'],
+                    **st.session_state['ranking_inputs']
+                )
+                if error:
+                    st.error(error)
+                else:
+                    try:
+                        payload = export_cache.export(RankingExport(st.session_state['data'], positions, scores),
+                                                      st.session_state['ranking_fingerprint'], export_format, export_columns)
+                    except ValueError as e:
+                        st.error(str(e))
+        if payload is not None:
+            label, extension, mime = EXPORT_FORMATS[export_format]
+            st.download_button(
+                label=f"Download Complete Rankings ({label})",
+                data=payload,
+                file_name=f"ranked_suppliers.{extension}",
+                mime=mime,
+            )
+
+        if st.session_state['chart_png']:
             st.markdown("<p class='info-text'><b>Supplier Comparison Chart:</b></p>", unsafe_allow_html=True)
-            st.pyplot(st.session_state['chart_fig'])
+            st.image(st.session_state['chart_png'], use_column_width=True)
+
+        if st.session_state['attribution_table'] is not None:
+            with st.expander("Why do these suppliers rank highest?"):
+                drivers_table = st.session_state['attribution_table']
+                st.caption(ATTRIBUTION_METHODS.get(drivers_table.attrs.get('method'), ''))
+                st.dataframe(drivers_table.head(10))
+                if st.session_state['attribution_chart_png']:
+                    st.image(st.session_state['attribution_chart_png'], use_column_width=True)
+
+        with st.expander("Compare what-if scenarios"):
+            st.caption("Save the current filters and weights as scenarios, then rank all of them in one batch to see which suppliers stay on top.")
+            scenarios = st.session_state['scenarios']
+            ranker = st.session_state['incremental_ranker']
+            if selected_criteria and not scoring_method:
+                current = None
+                st.info("Scenarios compare weighted scores or model scores; choose a weighted score in Step 2 to save one.")
+            else:
+                current = {'filter_conditions': dict(st.session_state['filter_conditions'])}
+                if scoring_method:
+                    directions = dict(zip(selected_criteria, sort_directions))
+                    current.update(weights=dict(criteria_weights), method=scoring_method,
+                                   benefit={c: not directions[c] for c in criteria_weights})
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                scenario_name = st.text_input("Scenario name", value=f"Scenario {len(scenarios) + 1}")
+            with col2:
+                variations = st.number_input("Weight variations", min_value=0, max_value=200, value=0, step=10,
+                                             help="Also save this many copies with every weight randomly changed by up to ±25%.",
+                                             disabled=current is None or 'weights' not in current)
+            with col3:
+                if st.button("Save scenario", disabled=current is None):
+                    current['name'] = scenario_name
+                    scenarios.append(current)
+                    if variations and 'weights' in current:
+                        scenarios.extend(weight_perturbations(current, int(variations)))
+                    st.session_state['scenario_job_id'] = None
+
+            if scenarios:
+                st.dataframe(pd.DataFrame({
+                    'Scenario': [s['name'] for s in scenarios],
+                    'Filters': [len(s['filter_conditions']) for s in scenarios],
+                    'Scoring': [s.get('method', 'model score') for s in scenarios],
+                    'Weights': [', '.join(f"{c}={w:g}" for c, w in s['weights'].items()) if s.get('weights') else '' for s in scenarios],
+                }))
+                col1, col2 = st.columns(2)
+                with col1:
+                    run_clicked = st.button(f"Rank {len(scenarios)} scenarios", type="primary")
+                with col2:
+                    if st.button("Clear scenarios"):
+                        st.session_state['scenarios'] = []
+                        st.session_state['scenario_job_id'] = None
+                        st.experimental_rerun()
+                if run_clicked:
+                    model_scores = None
+                    if ranker is not None:
+                        model_scores = ranker.prediction_probs if ranker.prediction_probs is not None else ranker.predictions
+                    key = job_key('scenarios', st.session_state['session_id'], st.session_state['data_fingerprint'], scenarios)
+                    job = get_job_queue().submit(key, run_scenario_job, st.session_state['data'], list(scenarios), model_scores,
+                                                 st.session_state['filter_engine'], st.session_state['scoring_engine'],
+                                                 name="Ranking scenarios", subscriber=st.session_state['session_id'])
+                    st.session_state['scenario_job_id'] = job.id
+
+            scenario_job = get_job_queue().get(st.session_state['scenario_job_id'])
+            if scenario_job is not None and not scenario_job.finished:
+                poll_jobs = True
+                st.progress(scenario_job.progress, text=f"⏳ {scenario_job.message or 'Waiting for a worker...'}")
+            elif scenario_job is not None and scenario_job.status == 'failed':
+                st.error(f"Error ranking scenarios: {scenario_job.error}")
+            elif scenario_job is not None and scenario_job.status == 'done':
+                results = scenario_job.result
+                st.markdown("<p class='info-text'><b>Scenario leaders:</b></p>", unsafe_allow_html=True)
+                st.dataframe(results.summary())
+                st.markdown("<p class='info-text'><b>Rank stability across scenarios:</b></p>", unsafe_allow_html=True)
+                st.dataframe(results.stability().head(25), hide_index=True)
+                if len(results) <= 30:
+                    st.markdown("<p class='info-text'><b>Shared top suppliers between scenarios:</b></p>", unsafe_allow_html=True)
+                    st.dataframe(results.overlap())
+                shown = st.selectbox("Show the top suppliers of", range(len(results)), format_func=lambda i: results.names[i])
+                st.dataframe(results.ranked(shown).head(10))
+
+        if st.checkbox("Show distribution across all matching suppliers"):
+            from utils.chart_generator import generate_distribution_chart, render_chart_png
+            inputs = st.session_state['ranking_inputs']
+            match_mask = st.session_state['filter_engine'].mask(inputs['filter_conditions'])
+            if inputs['selected_criteria']:
+                first_criterion = inputs['selected_criteria'][0]
+                values = st.session_state['data'][first_criterion]
+                if pd.api.types.is_numeric_dtype(values):
+                    distribution_fig = generate_distribution_chart(
+                        values.to_numpy(dtype=float, na_value=np.nan)[match_mask],
+                        label=first_criterion,
+                        higher_is_better=not inputs['sort_directions'][0]
+                    )
+                else:
+                    distribution_fig = None
+                    st.info(f"'{first_criterion}' is not numeric, so it has no distribution to plot.")
+            else:
+                scores = inputs['prediction_probs'] if inputs['prediction_probs'] is not None else inputs['predictions']
+                distribution_fig = generate_distribution_chart(np.asarray(scores, dtype=float)[match_mask])
+            if distribution_fig is not None:
+                st.image(render_chart_png(distribution_fig, dpi=100), use_column_width=True)
+
+        report_top_n = st.slider(
+            "Suppliers to include in the AI report",
+            min_value=1,
+            max_value=min(REPORT_MAX_SUPPLIERS, len(st.session_state['ranked_data'])),
+            value=min(3, len(st.session_state['ranked_data'])),
+        ) if len(st.session_state['ranked_data']) > 1 else 1
+        prompt_plan = build_compact_report_prompt(
+            st.session_state['ranked_data'],
+            selected_criteria if selected_criteria else None,
+            top_n=report_top_n,
+            token_budget=DEFAULT_TOKEN_BUDGET
+        )
+        st.caption(
+            f"Estimated prompt size: ~{prompt_plan['estimated_tokens']:,} tokens (budget {DEFAULT_TOKEN_BUDGET:,})"
+            + (f"; {len(prompt_plan['dropped_columns'])} columns left out" if prompt_plan['dropped_columns'] else "")
+        )
 
         if st.button("Generate AI-Powered Supplier Report"):
-            with st.spinner("Generating detailed report..."):
-                try:
-                    st.session_state['report'] = generate_supplier_report(
-                        st.session_state['ranked_data'],
-                        selected_criteria if selected_criteria else None,
-                        top_n=3
-                    )
-                except Exception as e:
-                    st.error(f"Error generating report: {e}")
+            report_criteria = selected_criteria if selected_criteria else None
+            # Identical reports requested by any session share one LLM call
+            key = job_key('report', st.session_state['ranking_fingerprint'], report_criteria, report_top_n, DEFAULT_TOKEN_BUDGET)
+            job = get_job_queue().submit(key, run_report_job, st.session_state['ranked_data'], report_criteria,
+                                         report_top_n, DEFAULT_TOKEN_BUDGET, st.session_state['attribution_table'],
+                                         name="Generating report", subscriber=st.session_state['session_id'])
+            st.session_state['report_job_id'] = job.id
+
+        report_job = get_job_queue().get(st.session_state['report_job_id'])
+        if report_job is not None and not report_job.finished:
+            st.progress(report_job.progress, text=f"⏳ {report_job.message or 'Waiting for a worker...'} ({report_job.elapsed:.0f}s)")
+            if st.button("Cancel report"):
+                # Only this session stops waiting; the job itself stops once no other session shares it
+                get_job_queue().cancel(report_job.id, subscriber=st.session_state['session_id'])
+                st.session_state['report_job_id'] = None
+                st.warning("Report generation cancelled.")
+            else:
+                poll_jobs = True
+                if report_job.partial:
+                    st.markdown(report_job.partial)
+        elif report_job is not None:
+            st.session_state['report_job_id'] = None
+            if report_job.status == 'done':
+                st.session_state['report'] = report_job.result
+                st.session_state['pdf_job_id'] = None
+            elif report_job.status == 'failed':
+                st.error(f"Error generating report: {report_job.error}")
+            else:
+                st.warning("Report generation cancelled.")
 
         if st.session_state['report']:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
@@ -262,22 +635,37 @@ if st.session_state['data'] is not None:
             st.markdown("</div>", unsafe_allow_html=True)
 
             if st.button("Generate PDF Report"):
-                with st.spinner("Creating PDF report..."):
-                    pdf_buffer = create_pdf(
-                        st.session_state['report'],
-                        selected_criteria if selected_criteria else None,
-                        st.session_state['chart_fig']
-                    )
-                    if pdf_buffer:
-                        st.download_button(
-                            label="Download PDF Report",
-                            data=pdf_buffer,
-                            file_name="supplier_evaluation_report.pdf",
-                            mime="application/pdf",
-                        )
+                pdf_criteria = selected_criteria if selected_criteria else None
+                # The chart follows from the ranking, so its fingerprint stands in for the PNG bytes
+                key = job_key('pdf', st.session_state['ranking_fingerprint'], st.session_state['report'], pdf_criteria)
+                job = get_job_queue().submit(key, run_pdf_job, st.session_state['report'], pdf_criteria,
+                                             st.session_state['chart_png'], name="Creating PDF",
+                                             subscriber=st.session_state['session_id'])
+                st.session_state['pdf_job_id'] = job.id
+
+            pdf_job = get_job_queue().get(st.session_state['pdf_job_id'])
+            if pdf_job is not None and not pdf_job.finished:
+                poll_jobs = True
+                st.progress(pdf_job.progress, text=f"⏳ {pdf_job.message or 'Waiting for a worker...'}")
+            elif pdf_job is not None and pdf_job.status == 'done':
+                st.download_button(
+                    label="Download PDF Report",
+                    data=pdf_job.result,
+                    file_name="supplier_evaluation_report.pdf",
+                    mime="application/pdf",
+                )
+            elif pdf_job is not None and pdf_job.status == 'failed':
+                st.error(f"Error creating PDF: {pdf_job.error}")
 
 else:
     st.info("👆 Please upload your supplier dataset (CSV) to get started.")
 
+render_profiling_panel()
+
+if poll_jobs:
+    # Background jobs keep running between reruns; poll until they finish
+    time.sleep(JOB_POLL_SECONDS)
+    st.experimental_rerun()
+
 st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 st.markdown("<p style='text-align: center; color: #6B7280; font-size: 0.8rem;'>Supplier Evaluation & Ranking System © 2025</p>", unsafe_allow_html=True)
\ No newline at end of file
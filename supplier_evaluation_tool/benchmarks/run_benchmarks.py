@@ -0,0 +1,184 @@
+"""Time the supplier pipeline's hot paths on synthetic data and compare against a saved baseline.
+
+Run from the supplier_evaluation_tool directory:
+    python -m benchmarks.run_benchmarks --sizes 10000,100000
+    python -m benchmarks.run_benchmarks --sizes 10000,100000 --output benchmarks/baseline.json --no-baseline
+
+The first form compares against the committed benchmarks/baseline.json; the second refreshes it.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+import sklearn
+
+from benchmarks.synthetic_data import generate_supplier_dataset
+from core.data_loader import load_data, load_data_chunked
+from core.data_preprocessor import analyze_dataset_columns, preprocess_data
+from core.filter_engine import FilterEngine
+from core.model_handler import apply_filters_to_data, rank_suppliers, train_model
+from utils.chart_generator import generate_chart, render_chart_png
+from utils.pdf_exporter import create_pdf
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+NOISE_FLOOR_SECONDS = 0.005
+
+FILTER_CONDITIONS = {
+    'Quality': {'type': 'numeric', 'min': 6.0, 'max': 9.0},
+    'Region': {'type': 'categorical', 'values': ['North', 'East', 'Central']},
+    'Supplier_Name': {'type': 'text', 'search': 'acme'},
+}
+
+def _prepare(data):
+    """Inputs shared by the benchmarks; computed once per size and not timed"""
+    csv_bytes = data.to_csv(index=False).encode('utf-8')
+    X, y, _ = preprocess_data(data)
+    predictions, prediction_probs, _ = train_model(X, y)
+    ranked, _ = rank_suppliers(data, {}, predictions, prediction_probs, top_k=10)
+    chart_fig = generate_chart(ranked, ['Quality', 'Cost'], top_n=10)
+    return {
+        'data': data,
+        'csv_bytes': csv_bytes,
+        'X': X,
+        'y': y,
+        'predictions': predictions,
+        'prediction_probs': prediction_probs,
+        'ranked': ranked,
+        'filters': FILTER_CONDITIONS,
+        'chart_png': render_chart_png(chart_fig),
+    }
+
+BENCHMARKS = {
+    'load_data': lambda ctx: load_data(io.BytesIO(ctx['csv_bytes'])),
+    'load_data_chunked': lambda ctx: load_data_chunked(io.BytesIO(ctx['csv_bytes'])),
+    'analyze_dataset_columns': lambda ctx: analyze_dataset_columns(ctx['data']),
+    'preprocess_data': lambda ctx: preprocess_data(ctx['data']),
+    'train_model_supervised': lambda ctx: train_model(ctx['X'], ctx['y']),
+    'train_model_unsupervised': lambda ctx: train_model(ctx['X'], None),
+    'apply_filters_to_data': lambda ctx: apply_filters_to_data(ctx['data'], ctx['filters']),
+    'filter_mask_warm': lambda ctx: ctx.setdefault('engine', FilterEngine(ctx['data'])).mask(ctx['filters']),
+    'rank_suppliers_full': lambda ctx: rank_suppliers(ctx['data'], {}, ctx['predictions'], ctx['prediction_probs']),
+    'rank_suppliers_top_k': lambda ctx: rank_suppliers(ctx['data'], {}, ctx['predictions'], ctx['prediction_probs'], top_k=10),
+    'rank_suppliers_criteria_top_k': lambda ctx: rank_suppliers(ctx['data'], {}, selected_criteria=['Region', 'Quality'],
+                                                                 sort_directions=[True, False], top_k=10),
+    'generate_chart': lambda ctx: generate_chart(ctx['ranked'], ['Quality', 'Cost'], top_n=10),
+    'create_pdf': lambda ctx: create_pdf("Benchmark report\n" * 40, ['Quality'], chart_png=ctx['chart_png']),
+}
+
+def time_call(func, ctx, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ctx)
+        timings.append(time.perf_counter() - start)
+    return {'min': round(min(timings), 6), 'median': round(statistics.median(timings), 6), 'repeat': repeat}
+
+def run_benchmarks(sizes, repeat=3, only=None, seed=42, log=print):
+    """Run every selected benchmark at every size. Returns the results document."""
+    results = {}
+    for rows in sizes:
+        log(f"Generating {rows:,} synthetic suppliers...")
+        ctx = _prepare(generate_supplier_dataset(rows, seed=seed))
+        for name, func in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            # Multi-million-row runs are slow enough that one repetition is representative
+            timing = time_call(func, ctx, repeat if rows < 1_000_000 else 1)
+            results[f"{name}@{rows}"] = dict(timing, benchmark=name, rows=rows)
+            log(f"  {name:<32} {timing['min']:>10.4f}s")
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+def compare_to_baseline(current, baseline, threshold=0.25):
+    """Compare best times with the baseline, one entry per benchmark present in both.
+
+    'ratio' is current / baseline; an entry is a regression when the time grew by more than
+    threshold (0.25 = 25%). Baseline times under NOISE_FLOOR_SECONDS never count as regressions.
+    """
+    comparisons = []
+    for key, result in current['results'].items():
+        reference = baseline['results'].get(key)
+        if reference is None:
+            continue
+        ratio = result['min'] / reference['min'] if reference['min'] > 0 else float('inf')
+        comparisons.append({'benchmark': key, 'baseline': reference['min'], 'current': result['min'],
+                            'ratio': round(ratio, 3),
+                            'regression': reference['min'] >= NOISE_FLOOR_SECONDS and ratio > 1 + threshold})
+    return comparisons
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the supplier ranking pipeline on synthetic data.")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES), help="Comma-separated row counts")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per benchmark below 1M rows")
+    parser.add_argument('--only', default='', help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="Baseline results JSON to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument('--no-baseline', action='store_true', help="Skip the baseline comparison")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    unknown = only - set(BENCHMARKS)
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        current = run_benchmarks(sizes, repeat=args.repeat, only=only, seed=args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.no_baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --output {args.baseline} --no-baseline to create one",
+              file=sys.stderr)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    comparisons = compare_to_baseline(current, baseline, args.threshold)
+    if not comparisons:
+        print(f"No benchmark in this run is in {args.baseline}", file=sys.stderr)
+        return 2
+    print(f"\nAgainst {args.baseline} ({baseline['meta'].get('platform', 'unknown platform')}):")
+    for comparison in comparisons:
+        change = comparison['ratio'] - 1
+        flag = '  REGRESSION' if comparison['regression'] else ''
+        print(f"  {comparison['benchmark']:<40} {comparison['baseline']:>9.4f}s -> {comparison['current']:>9.4f}s "
+              f"({change:+.0%}){flag}")
+    regressions = [c for c in comparisons if c['regression']]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
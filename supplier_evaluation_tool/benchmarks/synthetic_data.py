@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ['Quality', 'Delivery_Time', 'Cost', 'Reliability', 'Lead_Time', 'Defect_Rate',
+                   'Capacity', 'Years_In_Business']
+CATEGORICAL_COLUMNS = {
+    'Region': ['North', 'South', 'East', 'West', 'Central'],
+    'Category': ['Raw Materials', 'Components', 'Packaging', 'Logistics', 'Services', 'Electronics'],
+    'Certification': ['ISO9001', 'ISO14001', 'None', 'IATF16949'],
+    'Payment_Terms': ['Net30', 'Net45', 'Net60', 'Prepaid'],
+}
+TEXT_COLUMNS = ['Supplier_Name', 'Address', 'Notes']
+NAME_PARTS = np.array(['Acme', 'Global', 'Prime', 'United', 'Apex', 'Summit', 'Vertex', 'Nova', 'Delta', 'Omni'])
+NAME_SUFFIXES = np.array(['Industries', 'Supply', 'Corp', 'Trading', 'Manufacturing', 'Logistics'])
+
+def generate_supplier_dataset(rows, numeric=6, categorical=3, text=2, null_rate=0.02, label=True, seed=42):
+    """Seeded synthetic supplier dataset shaped like the CSVs the app expects.
+
+    numeric, categorical and text set how many columns of each kind to include (on top of
+    Supplier_ID); extra numeric columns beyond the named ones are called Metric_<n>. A share
+    null_rate of every non-ID cell is blanked out. With label=True a binary Label column
+    correlated with quality and reliability is added.
+    """
+    rng = np.random.default_rng(seed)
+    data = {'Supplier_ID': np.char.add('S', np.arange(1, rows + 1).astype(str))}
+
+    numeric_names = NUMERIC_COLUMNS[:numeric] + [f'Metric_{i}' for i in range(max(numeric - len(NUMERIC_COLUMNS), 0))]
+    for name in numeric_names:
+        if name == 'Delivery_Time' or name == 'Lead_Time':
+            data[name] = rng.integers(1, 60, rows).astype(np.float64)
+        elif name == 'Cost':
+            data[name] = rng.lognormal(6.5, 0.4, rows).round(2)
+        elif name == 'Reliability':
+            data[name] = rng.beta(8, 2, rows).round(3)
+        elif name == 'Defect_Rate':
+            data[name] = rng.beta(2, 30, rows).round(4)
+        elif name == 'Years_In_Business':
+            data[name] = rng.integers(0, 80, rows).astype(np.float64)
+        else:
+            data[name] = rng.normal(7.5, 1.2, rows).round(2)
+
+    categorical_names = list(CATEGORICAL_COLUMNS)[:categorical]
+    categorical_names += [f'Segment_{i}' for i in range(max(categorical - len(CATEGORICAL_COLUMNS), 0))]
+    for name in categorical_names:
+        values = np.array(CATEGORICAL_COLUMNS.get(name, ['A', 'B', 'C', 'D']), dtype=object)
+        data[name] = values[rng.integers(0, len(values), rows)]
+
+    for i in range(text):
+        name = TEXT_COLUMNS[i] if i < len(TEXT_COLUMNS) else f'Text_{i}'
+        ids = rng.integers(0, max(rows // 3, 1), rows).astype(str)
+        if name == 'Address':
+            data[name] = np.char.add(np.char.add(ids, ' Market Street, Unit '), rng.integers(1, 500, rows).astype(str))
+        else:
+            first = NAME_PARTS[rng.integers(0, len(NAME_PARTS), rows)]
+            suffix = NAME_SUFFIXES[rng.integers(0, len(NAME_SUFFIXES), rows)]
+            data[name] = np.char.add(np.char.add(np.char.add(first, ' '), suffix), np.char.add(' ', ids))
+
+    frame = pd.DataFrame(data)
+    for name in frame.columns[1:]:
+        if frame[name].dtype.kind == 'U':
+            frame[name] = frame[name].astype(object)
+
+    if label:
+        signal = np.zeros(rows)
+        for name in ('Quality', 'Reliability'):
+            if name in frame:
+                column = frame[name].to_numpy()
+                signal += (column - column.mean()) / (column.std() or 1.0)
+        frame['Label'] = (signal + rng.normal(0, 1, rows) > 0).astype(np.int64)
+
+    if null_rate > 0:
+        for name in frame.columns[1:]:
+            if name == 'Label':
+                continue
+            blanks = rng.random(rows) < null_rate
+            if blanks.any():
+                frame.loc[blanks, name] = np.nan
+    return frame
@@ -0,0 +1,212 @@
+"""Headless batch ranking of supplier CSV files.
+
+Example:
+    python cli.py --input-dir data/regions --output-dir out --formats csv,parquet,pdf --workers 8
+    python cli.py --dataset history/ --output-dir out --criteria Quality,Cost --descending Quality --top-n 100
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+from core.data_loader import load_data_chunked
+from core.data_source import DatasetSource
+from core.data_preprocessor import preprocess_data
+from core.deduplication import deduplicate_suppliers
+from core.model_handler import train_model, rank_suppliers
+from utils.chart_generator import generate_chart_png
+from utils.pdf_exporter import create_pdf
+
+OUTPUT_FORMATS = ['csv', 'parquet', 'pdf']
+
+@contextmanager
+def _timed(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 4)
+
+def _summary_text(ranked_data, selected_criteria, top_n, source_name):
+    criteria_text = ', '.join(selected_criteria) if selected_criteria else "AI-powered evaluation (model score)"
+    lines = [f"Supplier Ranking: {source_name}", f"Ranking criteria: {criteria_text}",
+             f"Suppliers ranked: {len(ranked_data)}", "", f"Top {min(top_n, len(ranked_data))} suppliers:"]
+    for rank, (_, row) in enumerate(ranked_data.head(top_n).iterrows(), start=1):
+        values = ', '.join(f"{col}: {val}" for col, val in row.items() if pd.notna(val))
+        lines.append(f"{rank}. {values}")
+    return '\n'.join(lines)
+
+def _write_outputs(ranked_data, name, output_dir, formats, selected_criteria, top_n, ai_report, timings, result):
+    os.makedirs(output_dir, exist_ok=True)
+    if 'csv' in formats:
+        with _timed(timings, 'write_csv'):
+            csv_path = os.path.join(output_dir, f"{name}_ranked.csv")
+            ranked_data.to_csv(csv_path, index=False)
+            result['outputs'].append(csv_path)
+    if 'parquet' in formats:
+        with _timed(timings, 'write_parquet'):
+            parquet_path = os.path.join(output_dir, f"{name}_ranked.parquet")
+            ranked_data.to_parquet(parquet_path, index=False)
+            result['outputs'].append(parquet_path)
+    if 'pdf' in formats:
+        with _timed(timings, 'generate_chart'):
+            chart_png = generate_chart_png(ranked_data, selected_criteria, top_n=top_n)
+        if ai_report:
+            from utils.report_generator import generate_supplier_report
+            with _timed(timings, 'generate_report'):
+                report_text = generate_supplier_report(ranked_data, selected_criteria, top_n=min(top_n, 3))
+        else:
+            report_text = _summary_text(ranked_data, selected_criteria, top_n, name)
+        with _timed(timings, 'create_pdf'):
+            pdf_buffer = create_pdf(report_text, selected_criteria, chart_png=chart_png)
+        if pdf_buffer is None:
+            raise ValueError("PDF export failed")
+        pdf_path = os.path.join(output_dir, f"{name}_report.pdf")
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_buffer.getvalue())
+        result['outputs'].append(pdf_path)
+
+def rank_file(path, output_dir, selected_criteria=None, sort_directions=None, filter_conditions=None,
+              formats=('csv',), top_n=10, ai_report=False, merge_duplicates=False):
+    """Rank one supplier CSV and write the requested outputs. Returns a result dict with timings."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    timings = {}
+    result = {'file': path, 'outputs': [], 'timings': timings, 'error': None}
+    start = time.perf_counter()
+    try:
+        with _timed(timings, 'load_data'), open(path, 'rb') as f:
+            data, _ = load_data_chunked(f)
+        if merge_duplicates:
+            with _timed(timings, 'deduplicate'):
+                merged, _ = deduplicate_suppliers(data)
+            result['duplicates_merged'] = len(data) - len(merged)
+            data = merged
+        result['rows'] = len(data)
+
+        predictions = prediction_probs = None
+        if not selected_criteria:
+            with _timed(timings, 'preprocess_data'):
+                X, y, _ = preprocess_data(data)
+            with _timed(timings, 'train_model'):
+                predictions, prediction_probs, accuracy = train_model(X, y)
+            result['accuracy'] = accuracy
+            del X
+
+        with _timed(timings, 'rank_suppliers'):
+            ranked_data, error = rank_suppliers(data, filter_conditions or {}, predictions, prediction_probs,
+                                                selected_criteria, sort_directions)
+        if error:
+            result['error'] = error
+            return result
+
+        _write_outputs(ranked_data, name, output_dir, formats, selected_criteria, top_n, ai_report, timings, result)
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        timings['total'] = round(time.perf_counter() - start, 4)
+    return result
+
+def rank_dataset(path, output_dir, selected_criteria=None, sort_directions=None, filter_conditions=None,
+                 formats=('csv',), top_n=10, ai_report=False):
+    """Rank a Parquet/Arrow dataset out of core, keeping only the top_n suppliers in memory"""
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    timings = {}
+    result = {'file': path, 'outputs': [], 'timings': timings, 'error': None}
+    start = time.perf_counter()
+    try:
+        source = DatasetSource(path)
+        with _timed(timings, 'rank_suppliers'):
+            ranked_data, error = rank_suppliers(source, filter_conditions or {}, None, None,
+                                                selected_criteria, sort_directions, top_k=top_n)
+        if error:
+            result['error'] = error
+            return result
+        result['rows'] = len(ranked_data)
+        _write_outputs(ranked_data, name, output_dir, formats, selected_criteria, top_n, ai_report, timings, result)
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        timings['total'] = round(time.perf_counter() - start, 4)
+    return result
+
+def _print_result(result):
+    status = f"ERROR: {result['error']}" if result['error'] else f"{result.get('rows', 0)} rows"
+    stages = ', '.join(f"{stage}={seconds:.2f}s" for stage, seconds in result['timings'].items())
+    print(f"{os.path.basename(os.path.normpath(result['file']))}: {status} [{stages}]")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rank every supplier CSV in a directory without the Streamlit UI.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input-dir', help="Directory containing supplier CSV files")
+    source.add_argument('--dataset', help="Parquet/Arrow file or (hive-partitioned) directory to rank out of core; "
+                                          "only the top-n suppliers are kept")
+    parser.add_argument('--output-dir', required=True, help="Directory for ranked outputs")
+    parser.add_argument('--pattern', default='*.csv', help="Glob pattern for input files (default: *.csv)")
+    parser.add_argument('--criteria', default='', help="Comma-separated columns to rank by; omit to use the model score")
+    parser.add_argument('--descending', default='', help="Comma-separated criteria to sort descending")
+    parser.add_argument('--filters', help="JSON file with filter_conditions, as built by the app")
+    parser.add_argument('--formats', default='csv', help=f"Comma-separated outputs: {', '.join(OUTPUT_FORMATS)}")
+    parser.add_argument('--top-n', type=int, default=10, help="Suppliers shown in the chart and PDF summary")
+    parser.add_argument('--dedup', action='store_true', help="Merge fuzzy-duplicate suppliers (name/address) before ranking CSV files")
+    parser.add_argument('--ai-report', action='store_true', help="Use Gemini for the PDF text instead of a plain summary")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Parallel worker processes")
+    parser.add_argument('--timings', help="Write per-file stage timings to this JSON file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    formats = [f.strip().lower() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown:
+        print(f"Unknown output format(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    selected_criteria = [c.strip() for c in args.criteria.split(',') if c.strip()] or None
+    descending = {c.strip() for c in args.descending.split(',') if c.strip()}
+    sort_directions = [c not in descending for c in selected_criteria] if selected_criteria else None
+    filter_conditions = {}
+    if args.filters:
+        with open(args.filters) as f:
+            filter_conditions = json.load(f)
+
+    if args.dataset:
+        result = rank_dataset(args.dataset, args.output_dir, selected_criteria, sort_directions, filter_conditions,
+                              formats, args.top_n, args.ai_report)
+        _print_result(result)
+        if args.timings:
+            with open(args.timings, 'w') as f:
+                json.dump([result], f, indent=2, default=str)
+        return 1 if result['error'] else 0
+
+    paths = sorted(glob.glob(os.path.join(args.input_dir, args.pattern)))
+    if not paths:
+        print(f"No files matching {args.pattern} in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(rank_file, path, args.output_dir, selected_criteria, sort_directions,
+                                   filter_conditions, formats, args.top_n, args.ai_report, args.dedup) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            _print_result(result)
+
+    if args.timings:
+        with open(args.timings, 'w') as f:
+            json.dump(sorted(results, key=lambda r: r['file']), f, indent=2, default=str)
+
+    failed = [r for r in results if r['error']]
+    print(f"Ranked {len(results) - len(failed)} of {len(results)} files")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
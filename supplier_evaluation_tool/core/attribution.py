@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOP_DRIVERS = 3
+
+class ScoreAttribution:
+    """Per-feature contributions to the score of each explained supplier.
+
+    contributions has one row per supplier and one column per feature; each row sums with
+    baseline to the supplier's score, except for TOPSIS, whose weighted normalized values rank
+    suppliers the same way but are not additive.
+    """
+
+    def __init__(self, contributions, baseline, scores, method):
+        self.contributions = contributions
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.method = method
+
+    def __len__(self):
+        return len(self.contributions)
+
+    def top_drivers(self, n=DEFAULT_TOP_DRIVERS):
+        """Text per supplier naming its n largest contributions, e.g. 'Quality +0.12, Cost -0.05'"""
+        values = self.contributions.to_numpy()
+        names = np.asarray(self.contributions.columns, dtype=object)
+        order = np.argsort(-np.abs(values), axis=1, kind='stable')[:, :n]
+        drivers = []
+        for row, columns in zip(values, order):
+            drivers.append(', '.join(f"{names[col]} {row[col]:+.3f}" for col in columns if row[col] != 0))
+        return pd.Series(drivers, index=self.contributions.index)
+
+    def table(self, labels=None, n=DEFAULT_TOP_DRIVERS):
+        """Compact table of score, baseline and the top n drivers per supplier"""
+        table = pd.DataFrame({
+            'Supplier': labels if labels is not None else self.contributions.index,
+            'Score': self.scores,
+            'Baseline': self.baseline,
+            'Top drivers': self.top_drivers(n).to_numpy(),
+        })
+        return table.round({'Score': 4, 'Baseline': 4})
+
+def _tree_steps(tree, n_features, class_index):
+    """Sparse (nodes x features) matrix of the class probability change at every split"""
+    from scipy.sparse import csr_matrix
+    values = tree.value[:, 0, :]
+    probs = values[:, class_index] / values.sum(axis=1)
+    parents = np.full(tree.node_count, -1)
+    internal = np.flatnonzero(tree.children_left >= 0)
+    parents[tree.children_left[internal]] = internal
+    parents[tree.children_right[internal]] = internal
+    children = np.flatnonzero(parents >= 0)
+    deltas = probs[children] - probs[parents[children]]
+    features = tree.feature[parents[children]]
+    return csr_matrix((deltas, (children, features)), shape=(tree.node_count, n_features)), probs[0]
+
+def tree_contributions(model, X, class_index=1):
+    """Path contributions of a fitted decision tree or forest of trees.
+
+    Following each supplier's path from the root, the change in predicted class probability at
+    every split is credited to the split feature. Returns (baseline, contributions) where the
+    baseline is the root probability; baseline plus contributions equals predict_proba.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    trees = getattr(model, 'estimators_', [model])
+    contributions = np.zeros(X.shape)
+    baseline = 0.0
+    for tree_model in trees:
+        steps, root = _tree_steps(tree_model.tree_, X.shape[1], class_index)
+        contributions += (tree_model.decision_path(X) @ steps).toarray()
+        baseline += root
+    return np.full(len(X), baseline / len(trees)), contributions / len(trees)
+
+def centroid_contributions(cluster_model, X):
+    """Split the gap between 1 and a supplier's cluster score across features.
+
+    The score is 1 / (1 + distance to the best centroid); each feature takes the share of the
+    gap equal to its share of the squared distance. Returns (baseline, contributions) with a
+    baseline of 1, so contributions are never positive.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    center = cluster_model.kmeans.cluster_centers_[cluster_model.best_cluster]
+    squared = (X - center) ** 2
+    total = squared.sum(axis=1, keepdims=True)
+    gap = 1.0 - cluster_model.score(X)
+    shares = np.divide(squared, total, out=np.zeros_like(squared), where=total > 0)
+    return np.ones(len(X)), -gap[:, None] * shares
+
+def occlusion_contributions(score, X, background=None):
+    """Score change when each feature is reset to the background value (the training mean).
+
+    Used for models without a tree or centroid structure. All suppliers and features are
+    scored in one batch. Returns (baseline, contributions) with the baseline chosen so each
+    row sums to the score.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n_rows, n_features = X.shape
+    background = np.zeros(n_features) if background is None else np.asarray(background, dtype=np.float64)
+    occluded = np.repeat(X, n_features, axis=0)
+    feature_index = np.tile(np.arange(n_features), n_rows)
+    occluded[np.arange(len(occluded)), feature_index] = background[feature_index]
+    scores = np.asarray(score(X), dtype=np.float64)
+    contributions = scores[:, None] - np.asarray(score(occluded), dtype=np.float64).reshape(n_rows, n_features)
+    return scores - contributions.sum(axis=1), contributions
+
+def explain_model_scores(ranker, rows):
+    """ScoreAttribution of the model score for rows of the data an IncrementalRanker was fitted on"""
+    X, _ = ranker.transform(rows)
+    model = ranker.model
+    if not ranker.supervised:
+        baseline, contributions = centroid_contributions(model, X)
+        method = 'centroid_distance'
+    elif len(getattr(model, 'classes_', [])) == 2 and all(hasattr(m, 'tree_') for m in getattr(model, 'estimators_', [model])):
+        baseline, contributions = tree_contributions(model, X)
+        method = 'tree_path'
+    else:
+        # Standardized features have mean 0, so the occlusion background is the zero vector
+        baseline, contributions = occlusion_contributions(lambda batch: ranker.score(batch)[1], X)
+        method = 'occlusion'
+    frame = pd.DataFrame(contributions, index=rows.index, columns=ranker.feature_names)
+    return ScoreAttribution(frame, baseline, baseline + contributions.sum(axis=1), method)
+
+def explain_criteria_scores(engine, weights, benefit, positions, scores=None, index=None, method='weighted_sum'):
+    """ScoreAttribution of ScoringEngine scores: weight times normalized value per criterion.
+
+    Pass the suppliers' scores when method is 'topsis'; weighted-sum scores are the row sums.
+    """
+    contributions = engine.contributions(weights, benefit, rows=positions)
+    frame = pd.DataFrame(contributions, index=index, columns=engine.criteria)
+    if scores is None:
+        scores = contributions.sum(axis=1)
+    return ScoreAttribution(frame, np.zeros(len(frame)), scores, method)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from core.filter_engine import FilterEngine
+
+HISTOGRAM_BINS = 20
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+QUANTILE_SAMPLE = 100_000
+
+class ColumnStatistics:
+    """Per-column statistics and filter indexes for one DataFrame, computed once and cached.
+
+    Numeric columns get count, nulls, min, max, mean, std, cardinality, a histogram and
+    quantiles estimated from a fixed-size sample. A sorted copy of a numeric column is built the
+    first time a range is counted, after which range counts are two binary searches.
+    Categorical value counts come from the FilterEngine's category codes, so membership counts
+    are a sum over the selected values.
+    """
+
+    def __init__(self, data, filter_engine=None):
+        self.data = data
+        self.filter_engine = filter_engine if filter_engine is not None else FilterEngine(data)
+        self._stats = {}
+        self._sorted = {}
+        self._value_counts = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def column(self, column):
+        """Statistics dict for one column"""
+        if column not in self._stats:
+            series = self.data[column]
+            nulls = int(series.isna().sum())
+            stats = {'count': len(series) - nulls, 'nulls': nulls}
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                stats.update(self._numeric_stats(series.to_numpy(dtype=np.float64, na_value=np.nan)))
+            else:
+                counts = self.value_counts(column)
+                stats['cardinality'] = int((counts > 0).sum())
+                if len(counts):
+                    stats['top'] = counts.idxmax()
+                    stats['top_count'] = int(counts.max())
+            self._stats[column] = stats
+        return self._stats[column]
+
+    def _numeric_stats(self, values):
+        valid = values[~np.isnan(values)]
+        if not len(valid):
+            return {'min': None, 'max': None, 'mean': None, 'std': None, 'cardinality': 0,
+                    'quantiles': {}, 'histogram': ([], [])}
+        sample = valid
+        if len(valid) > QUANTILE_SAMPLE:
+            sample = valid[np.random.default_rng(0).choice(len(valid), QUANTILE_SAMPLE, replace=False)]
+        counts, edges = np.histogram(valid, bins=HISTOGRAM_BINS)
+        return {
+            'min': float(valid.min()),
+            'max': float(valid.max()),
+            'mean': float(valid.mean()),
+            'std': float(valid.std()),
+            'cardinality': int(pd.unique(valid).size),
+            'quantiles': dict(zip(QUANTILES, np.quantile(sample, QUANTILES).tolist())),
+            'histogram': (counts.tolist(), edges.tolist()),
+        }
+
+    def value_counts(self, column):
+        """Rows per category (missing values excluded), indexed by the category values"""
+        if column not in self._value_counts:
+            codes, categories = self.filter_engine.category_codes(column)
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+            self._value_counts[column] = pd.Series(counts, index=categories)
+        return self._value_counts[column]
+
+    def sorted_values(self, column):
+        if column not in self._sorted:
+            values = self.data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            self._sorted[column] = np.sort(values[~np.isnan(values)])
+        return self._sorted[column]
+
+    def range_count(self, column, min_val=None, max_val=None):
+        """Rows with min_val <= value <= max_val; without bounds every row, as in FilterEngine"""
+        if min_val is None and max_val is None:
+            return len(self.data)
+        values = self.sorted_values(column)
+        start = 0 if min_val is None else np.searchsorted(values, min_val, side='left')
+        end = len(values) if max_val is None else np.searchsorted(values, max_val, side='right')
+        return int(max(end - start, 0))
+
+    def membership_count(self, column, selected_values):
+        """Rows whose value is one of selected_values; an empty selection does not filter, as in FilterEngine"""
+        if not len(selected_values):
+            return len(self.data)
+        counts = self.value_counts(column)
+        return int(counts.reindex(pd.Index(selected_values).unique()).fillna(0).sum())
+
+    def match_count(self, column, filter_info):
+        """Rows of this column alone that pass one filter condition"""
+        filter_type = filter_info['type']
+        if filter_type == 'numeric':
+            return self.range_count(column, filter_info.get('min'), filter_info.get('max'))
+        if filter_type in ('categorical', 'boolean'):
+            return self.membership_count(column, filter_info.get('values', []))
+        return int(self.filter_engine.mask({column: filter_info}).sum())
+
+    def summary(self, columns=None):
+        """One row per column, in place of data.describe().
+
+        By default covers numeric and category columns; free-text columns are left out
+        because counting their distinct values means hashing every string.
+        """
+        if columns is None:
+            columns = [col for col in self.data.columns
+                       if pd.api.types.is_numeric_dtype(self.data[col]) or isinstance(self.data[col].dtype, pd.CategoricalDtype)]
+        rows = {}
+        for column in columns:
+            stats = self.column(column)
+            row = {key: stats.get(key) for key in ('count', 'nulls', 'cardinality', 'min', 'mean', 'std', 'max')}
+            row['median'] = stats.get('quantiles', {}).get(0.5)
+            rows[column] = row
+        return pd.DataFrame.from_dict(rows, orient='index')
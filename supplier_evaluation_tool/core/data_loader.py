@@ -1,8 +1,235 @@
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+from core.data_preprocessor import ID_COLUMNS, analyze_dataset_columns
+from utils.instrumentation import instrument
 
+DEFAULT_CHUNKSIZE = 200_000
+ARROW_BLOCK_SIZE = 16 << 20
+CATEGORY_MAX_UNIQUE = 1000
+CATEGORY_MAX_RATIO = 0.5
+MAX_TRACKED_UNIQUES = 30
+# pandas' default missing-value markers, so the pyarrow engine reads the same nulls as read_csv
+PANDAS_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+@instrument()
 def load_data(uploaded_file):
     try:
         data = pd.read_csv(uploaded_file)
         return data
     except Exception as e:
-        raise ValueError(f"Error loading dataset: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Error loading dataset: {str(e)}")
+
+def infer_schema(sample, max_unique=CATEGORY_MAX_UNIQUE, max_ratio=CATEGORY_MAX_RATIO):
+    """Infer a compact dtype plan ('integer', 'float' or 'category') from a sample chunk"""
+    schema = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            schema[col] = 'integer'
+        elif pd.api.types.is_float_dtype(series):
+            schema[col] = 'float'
+        elif series.dtype == 'object':
+            n_unique = series.nunique(dropna=True)
+            if n_unique <= max_unique and n_unique <= max(len(series) * max_ratio, 1):
+                schema[col] = 'category'
+    return schema
+
+def _apply_schema(chunk, schema, downcast_floats=False):
+    for col, kind in schema.items():
+        if col not in chunk.columns:
+            continue
+        series = chunk[col]
+        if kind == 'category':
+            if series.dtype == 'object':
+                chunk[col] = series.astype('category')
+        elif kind == 'integer' and pd.api.types.is_integer_dtype(series):
+            chunk[col] = pd.to_numeric(series, downcast='integer')
+        elif downcast_floats and pd.api.types.is_float_dtype(series):
+            chunk[col] = series.astype(np.float32)
+    return chunk
+
+def _new_column_stats():
+    return {'min': np.inf, 'max': -np.inf, 'sum': 0.0, 'count': 0,
+            'uniques': {}, 'has_nan': False, 'overflow': False, 'kinds': set()}
+
+def _update_column_stats(stats, series):
+    """Fold one chunk of a column into its running statistics"""
+    if pd.api.types.is_numeric_dtype(series):
+        stats['kinds'].add('numeric')
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = values[~np.isnan(values)]
+        if len(valid):
+            stats['min'] = min(stats['min'], valid.min())
+            stats['max'] = max(stats['max'], valid.max())
+            stats['sum'] += valid.sum()
+            stats['count'] += len(valid)
+        return
+
+    stats['kinds'].add('other')
+    if stats['overflow']:
+        return
+    if series.isna().any():
+        stats['has_nan'] = True
+    for value in series.dropna().unique():
+        if value not in stats['uniques']:
+            stats['uniques'][value] = None
+            if len(stats['uniques']) > MAX_TRACKED_UNIQUES:
+                stats['overflow'] = True
+                return
+
+def _finalize_column_stats(series, stats):
+    """Turn running statistics into the column_info entry analyze_dataset_columns would build"""
+    if pd.api.types.is_numeric_dtype(series) and stats['kinds'] == {'numeric'}:
+        info = {'type': 'numeric'}
+        if stats['count']:
+            info['min'] = float(stats['min'])
+            info['max'] = float(stats['max'])
+            info['mean'] = float(stats['sum'] / stats['count'])
+        else:
+            info['min'] = info['max'] = info['mean'] = 0
+        return info
+
+    if stats['kinds'] != {'other'} or pd.api.types.is_numeric_dtype(series):
+        # Column changed dtype between chunks: fall back to a direct scan
+        return analyze_dataset_columns(series.to_frame())[series.name]
+    if stats['overflow']:
+        return {'type': 'text'}
+
+    unique_values = list(stats['uniques'])
+    n_unique = len(unique_values) + (1 if stats['has_nan'] else 0)
+    if n_unique <= 10:
+        return {'type': 'categorical', 'unique_values': unique_values, 'truncated': False}
+    return {'type': 'text'}
+
+def _arrow_column_types(schema):
+    """Column types for the whole file from the types Arrow inferred on its first block.
+
+    Integer columns are read as float64, so a later block with decimals or blanks cannot fail the
+    read, and all-null columns as strings; _iter_csv_chunks turns whole-number blocks back into
+    integers, as read_csv would for that chunk.
+    """
+    import pyarrow as pa
+
+    column_types, integer_columns = {}, []
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            column_types[field.name] = pa.float64()
+            integer_columns.append(field.name)
+        elif pa.types.is_null(field.type):
+            column_types[field.name] = pa.string()
+        else:
+            column_types[field.name] = field.type
+    return column_types, integer_columns
+
+def _open_arrow_csv(uploaded_file, usecols, column_types=None):
+    import pyarrow.csv as pacsv
+
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    read_options = pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE)
+    convert_options = pacsv.ConvertOptions(include_columns=usecols or [], strings_can_be_null=True,
+                                           null_values=PANDAS_NA_VALUES, column_types=column_types)
+    return pacsv.open_csv(uploaded_file, read_options=read_options, convert_options=convert_options)
+
+def _iter_csv_chunks(uploaded_file, chunksize, usecols, engine):
+    if engine == 'pyarrow':
+        # Arrow fixes the column types after the first block; open once to see them, then read
+        # the file with those types widened so later blocks always convert
+        column_types, integer_columns = _arrow_column_types(_open_arrow_csv(uploaded_file, usecols).schema)
+        reader = _open_arrow_csv(uploaded_file, usecols, column_types)
+        for batch in reader:
+            chunk = batch.to_pandas()
+            for col in integer_columns:
+                values = chunk[col].to_numpy()
+                if not np.isnan(values).any() and (values == np.round(values)).all():
+                    chunk[col] = values.astype(np.int64)
+            yield chunk
+    else:
+        yield from pd.read_csv(uploaded_file, chunksize=chunksize, usecols=usecols, low_memory=False)
+
+def _concat_chunks(chunks):
+    """pd.concat(chunks, ignore_index=True), filled column by column into preallocated arrays.
+
+    Each chunk is released once copied, so peak memory stays near the result plus one chunk
+    instead of twice the data. Categorical columns must already share their categories; columns
+    with extension dtypes fall back to pd.concat.
+    """
+    total = sum(len(chunk) for chunk in chunks)
+    plans = {}
+    for col in chunks[0].columns:
+        dtypes = [chunk[col].dtype for chunk in chunks]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            codes_dtype = np.result_type(*[chunk[col].cat.codes.dtype for chunk in chunks])
+            plans[col] = ('category', np.empty(total, dtype=codes_dtype), dtypes[0])
+        elif all(isinstance(dtype, np.dtype) for dtype in dtypes):
+            plans[col] = ('array', np.empty(total, dtype=np.result_type(*dtypes)), None)
+        else:
+            plans[col] = ('concat', [], None)
+
+    offset = 0
+    for i in range(len(chunks)):
+        chunk, chunks[i] = chunks[i], None
+        end = offset + len(chunk)
+        for col, (kind, target, _) in plans.items():
+            if kind == 'category':
+                target[offset:end] = chunk[col].cat.codes.to_numpy()
+            elif kind == 'array':
+                target[offset:end] = chunk[col].to_numpy()
+            else:
+                target.append(chunk[col].reset_index(drop=True))
+        offset = end
+        del chunk
+
+    columns = {}
+    for col, (kind, target, dtype) in plans.items():
+        if kind == 'category':
+            columns[col] = pd.Categorical.from_codes(target, dtype=dtype)
+        elif kind == 'array':
+            columns[col] = target
+        else:
+            columns[col] = pd.concat(target, ignore_index=True)
+    return pd.DataFrame(columns, copy=False)
+
+@instrument()
+def load_data_chunked(uploaded_file, chunksize=DEFAULT_CHUNKSIZE, usecols=None, engine=None,
+                      downcast_floats=False):
+    """Stream a CSV in chunks with a compact inferred schema.
+
+    The schema is inferred from the first chunk: integer columns are downcast, low-cardinality
+    string columns become categories and, if downcast_floats is set, floats are stored as float32.
+    Column statistics are collected while streaming, so the file is read exactly once.
+    Returns (data, column_info) where column_info matches analyze_dataset_columns.
+    """
+    try:
+        schema = None
+        chunks = []
+        stats = {}
+        for chunk in _iter_csv_chunks(uploaded_file, chunksize, usecols, engine):
+            if schema is None:
+                schema = infer_schema(chunk)
+            chunk = _apply_schema(chunk, schema, downcast_floats)
+            for col in chunk.columns:
+                _update_column_stats(stats.setdefault(col, _new_column_stats()), chunk[col])
+            chunks.append(chunk)
+
+        if not chunks:
+            raise ValueError("No columns to parse from file")
+
+        for col, kind in schema.items():
+            if kind != 'category' or not all(isinstance(c[col].dtype, pd.CategoricalDtype) for c in chunks):
+                continue
+            categories = union_categoricals([c[col] for c in chunks], sort_categories=True).categories
+            for c in chunks:
+                c[col] = c[col].cat.set_categories(categories)
+
+        data = _concat_chunks(chunks) if len(chunks) > 1 else chunks[0]
+        del chunks
+
+        column_info = {col: _finalize_column_stats(data[col], stats[col]) for col in data.columns}
+        return data, column_info
+    except Exception as e:
+        raise ValueError(f"Error loading dataset: {str(e)}")
@@ -1,5 +1,10 @@
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from utils.instrumentation import instrument
+
+ID_COLUMNS = ['Supplier_ID', 'SupplierID', 'ID', 'supplier_id']
+FREE_TEXT_SAMPLE = 10_000
+FREE_TEXT_RATIO = 0.5
 
 def get_column_type(series):
     """Detect column type and return an appropriate description"""
@@ -18,6 +23,7 @@ def get_unique_values(series):
         return unique_vals[:30].tolist(), True  
     return unique_vals.tolist(), False
 
+@instrument()
 def analyze_dataset_columns(data):
     column_info = {}
     for col in data.columns:
@@ -26,30 +32,88 @@ def analyze_dataset_columns(data):
             'type': col_type,
         }
         if col_type == 'numeric':
-            info['min'] = float(data[col].min()) if not pd.isna(data[col].min()) else 0
-            info['max'] = float(data[col].max()) if not pd.isna(data[col].max()) else 0
-            info['mean'] = float(data[col].mean()) if not pd.isna(data[col].mean()) else 0
+            for stat in ('min', 'max', 'mean'):
+                value = getattr(data[col], stat)()
+                info[stat] = float(value) if not pd.isna(value) else 0
         elif col_type in ['categorical', 'boolean']:
             info['unique_values'], info['truncated'] = get_unique_values(data[col])
         column_info[col] = info
     return column_info
 
-def preprocess_data(data):
-    if 'Label' in data.columns:
-        X = data.drop('Label', axis=1)
-        y = data['Label']
+def _label_codes(series):
+    """Codes and classes identical to LabelEncoder().fit_transform(series.astype(str)), without the string copy"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
     else:
-        X = data.copy()
-        y = None
+        codes, uniques = pd.factorize(series)
+    # A fixed-width string array sorts in C, far faster than Python string comparisons
+    labels = np.array([str(value) for value in uniques] + ['nan'], dtype=str)
+    if not (codes < 0).any():
+        labels = labels[:-1]
+    classes, remap = np.unique(labels, return_inverse=True)
+    # Missing values (code -1) land on the trailing 'nan' label
+    return remap[codes], classes.astype(object)
+
+def is_free_text(series, sample_size=FREE_TEXT_SAMPLE, max_ratio=FREE_TEXT_RATIO):
+    """Object column whose sampled values are mostly distinct (names, addresses, notes)"""
+    if series.dtype != 'object':
+        return False
+    sample = series.head(sample_size).dropna()
+    return len(sample) > 0 and sample.nunique() > max_ratio * len(sample)
+
+def feature_columns(data, exclude_columns=None, drop_identifiers=False):
+    excluded = set(exclude_columns or [])
+    if drop_identifiers:
+        excluded.update(col for col in data.columns if col in ID_COLUMNS or is_free_text(data[col]))
+    return [col for col in data.columns if col != 'Label' and col not in excluded]
 
-    for col in X.columns:
-        if X[col].dtype == 'object':
+@instrument()
+def preprocess_data(data, return_transformers=False, exclude_columns=None, drop_identifiers=False, dtype=np.float32):
+    """Label-encode, mean-impute and standardize the feature columns into one preallocated matrix.
+
+    Works one column at a time, so peak memory is the output matrix plus one column. Text and
+    category columns are encoded from their codes exactly as LabelEncoder on their string form
+    would. With drop_identifiers, ID columns and free-text columns are left out.
+    """
+    from sklearn.preprocessing import StandardScaler, LabelEncoder
+    y = data['Label'] if 'Label' in data.columns else None
+    columns = feature_columns(data, exclude_columns, drop_identifiers)
+
+    X_scaled = np.empty((len(data), len(columns)), dtype=dtype)
+    means = np.zeros(len(columns))
+    variances = np.zeros(len(columns))
+    encoders = {}
+    for j, col in enumerate(columns):
+        series = data[col]
+        if series.dtype == 'object' or isinstance(series.dtype, pd.CategoricalDtype):
+            codes, classes = _label_codes(series)
             le = LabelEncoder()
-            X[col] = le.fit_transform(X[col].astype(str))
+            le.classes_ = classes
+            encoders[col] = le
+            values = codes.astype(np.float64)
+        else:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
 
-    X = X.fillna(X.mean(numeric_only=True))
+        missing = np.isnan(values)
+        valid = values[~missing] if missing.any() else values
+        if len(valid):
+            means[j] = valid.mean()
+            # Imputed values sit exactly on the mean, so they add nothing to the squared deviations
+            variances[j] = ((valid - means[j]) ** 2).sum() / len(values)
+        scale = np.sqrt(variances[j]) or 1.0
+        values -= means[j]
+        values /= scale
+        values[missing] = 0.0
+        X_scaled[:, j] = values
 
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
-    return X_scaled, y, X.columns.tolist()
\ No newline at end of file
+    scaler.mean_ = means
+    scaler.var_ = variances
+    scaler.scale_ = np.where(variances > 0, np.sqrt(variances), 1.0)
+    scaler.n_samples_seen_ = len(data)
+    scaler.n_features_in_ = len(columns)
+    scaler.feature_names_in_ = np.array(columns, dtype=object)
+
+    if return_transformers:
+        return X_scaled, y, columns, encoders, scaler
+    return X_scaled, y, columns
@@ -0,0 +1,225 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.data_loader import ID_COLUMNS, _finalize_column_stats, _new_column_stats, _update_column_stats
+from core.filter_engine import REGEX_METACHARACTERS, FilterEngine
+from core.model_handler import _sort_key, top_k_positions
+
+DEFAULT_BATCH_SIZE = 262_144
+DEFAULT_TOP_K = 25
+FORMAT_EXTENSIONS = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'ipc', '.feather': 'ipc', '.ipc': 'ipc'}
+
+def _detect_format(path):
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                extension = os.path.splitext(name)[1].lower()
+                if extension in FORMAT_EXTENSIONS:
+                    return FORMAT_EXTENSIONS[extension]
+        raise ValueError(f"No Parquet or Arrow files found in {path}")
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported dataset format: {extension or path}")
+    return FORMAT_EXTENSIONS[extension]
+
+def _stream_sort_key(series, ascending):
+    # Arrow dictionaries are not sorted, so category codes are not comparable across batches
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return _sort_key(series.reset_index(drop=True), ascending)
+
+class DatasetSource:
+    """Out-of-core view of a local Parquet or Arrow (Feather/IPC) dataset.
+
+    path is a single file or a directory of files, optionally hive-partitioned (for example
+    region=North/part-0.parquet). Filters that Arrow can evaluate are pushed down to the scan,
+    so partitions and row groups that cannot match are skipped; the rest (regex searches,
+    type mismatches) run on each batch with FilterEngine. Arrow files are memory-mapped.
+    """
+
+    def __init__(self, path, format=None, partitioning='hive', batch_size=DEFAULT_BATCH_SIZE):
+        try:
+            import pyarrow.dataset as ds
+            from pyarrow import fs
+        except ImportError:
+            raise ValueError("Reading Parquet/Arrow datasets requires pyarrow (pip install pyarrow)")
+
+        self.path = path
+        self.format = format or _detect_format(path)
+        self.batch_size = batch_size
+        try:
+            self.dataset = ds.dataset(path, format=self.format, partitioning=partitioning,
+                                      filesystem=fs.LocalFileSystem(use_mmap=True))
+        except Exception as e:
+            raise ValueError(f"Error loading dataset: {str(e)}")
+
+    @property
+    def columns(self):
+        return list(self.dataset.schema.names)
+
+    def __len__(self):
+        return self.dataset.count_rows()
+
+    def _field_kind(self, column):
+        import pyarrow.types as pat
+        arrow_type = self.dataset.schema.field(column).type
+        if pat.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        if pat.is_integer(arrow_type) or pat.is_floating(arrow_type):
+            return 'numeric'
+        if pat.is_string(arrow_type) or pat.is_large_string(arrow_type):
+            return 'string'
+        if pat.is_boolean(arrow_type):
+            return 'boolean'
+        return 'other'
+
+    def compile_filters(self, filter_conditions):
+        """Split filter_conditions into an Arrow expression (or None) and the residual conditions"""
+        import pyarrow.compute as pc
+
+        expression = None
+        residual = {}
+        for column, filter_info in (filter_conditions or {}).items():
+            if column not in self.columns:
+                raise KeyError(column)
+            kind = self._field_kind(column)
+            filter_type = filter_info['type']
+            field = pc.field(column)
+            condition = None
+            if filter_type == 'numeric' and kind == 'numeric':
+                if filter_info.get('min') is not None:
+                    condition = field >= filter_info['min']
+                if filter_info.get('max') is not None:
+                    upper = field <= filter_info['max']
+                    condition = upper if condition is None else condition & upper
+                if condition is None:
+                    continue
+            elif filter_type in ('categorical', 'boolean'):
+                values = filter_info.get('values', [])
+                if not values:
+                    continue
+                if kind == 'string' and all(isinstance(v, str) for v in values):
+                    condition = field.isin(values)
+                elif kind == 'boolean' and all(isinstance(v, (bool, np.bool_)) for v in values):
+                    condition = field.isin([bool(v) for v in values])
+            elif filter_type == 'text':
+                search_text = filter_info.get('search', '')
+                if not search_text:
+                    continue
+                # Regexes stay residual: Arrow uses RE2, whose syntax differs from Python's re
+                if kind == 'string' and not REGEX_METACHARACTERS.search(search_text):
+                    condition = pc.match_substring(field, search_text, ignore_case=True)
+
+            if condition is None:
+                residual[column] = filter_info
+            else:
+                expression = condition if expression is None else expression & condition
+        return expression, residual
+
+    def iter_batches(self, columns=None, filter_conditions=None, batch_size=None):
+        """Yield pandas DataFrames of the matching rows, reading only the requested columns"""
+        expression, residual = self.compile_filters(filter_conditions)
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + list(residual)))
+        scanner = self.dataset.scanner(columns=read_columns, filter=expression,
+                                       batch_size=batch_size or self.batch_size, use_threads=True)
+        for record_batch in scanner.to_batches():
+            if record_batch.num_rows == 0:
+                continue
+            batch = record_batch.to_pandas()
+            if residual:
+                batch = batch[FilterEngine(batch).mask(residual)]
+                if batch.empty:
+                    continue
+            yield batch[list(columns)] if columns is not None else batch
+
+    def count_rows(self, filter_conditions=None):
+        expression, residual = self.compile_filters(filter_conditions)
+        if not residual:
+            return self.dataset.count_rows(filter=expression)
+        return sum(len(batch) for batch in self.iter_batches(list(residual), filter_conditions))
+
+    def to_pandas(self, columns=None, filter_conditions=None):
+        batches = list(self.iter_batches(columns, filter_conditions))
+        if not batches:
+            return pd.DataFrame(columns=columns if columns is not None else self.columns)
+        return pd.concat(batches, ignore_index=True)
+
+    def column_info(self, columns=None):
+        """column_info in the analyze_dataset_columns format, from one streaming pass"""
+        stats = {}
+        sample = None
+        for batch in self.iter_batches(columns):
+            if sample is None:
+                sample = batch.head(1)
+            for col in batch.columns:
+                _update_column_stats(stats.setdefault(col, _new_column_stats()), batch[col])
+        if sample is None:
+            return {}
+        return {col: _finalize_column_stats(sample[col], stats[col]) for col in sample.columns}
+
+    def default_output_columns(self, selected_criteria=None, score_column=None):
+        id_columns = [c for c in ID_COLUMNS if c in self.columns][:1]
+        return list(dict.fromkeys(id_columns + list(selected_criteria or []) + ([score_column] if score_column else [])))
+
+    def _rank_all(self, read_columns, filter_conditions, keys):
+        batches = list(self.iter_batches(read_columns, filter_conditions))
+        if not batches:
+            return None
+        matches = pd.concat(batches, ignore_index=True)
+        sort_keys = [_stream_sort_key(matches[col], ascending) for col, ascending in keys]
+        return matches.take(top_k_positions(sort_keys, len(matches))).reset_index(drop=True)
+
+    def rank(self, filter_conditions=None, selected_criteria=None, sort_directions=None, top_k=DEFAULT_TOP_K,
+             columns=None, score_column='Supplier_Score'):
+        """Stream the matching rows through a bounded top-K buffer.
+
+        Ranks by selected_criteria like rank_suppliers, or by score_column (descending) when
+        no criteria are given. Only the criteria, residual filter columns and the output
+        columns (by default the supplier ID and the criteria) are read, and at most
+        top_k + batch_size rows are held at once. With top_k=None every matching row is
+        ranked, as in rank_suppliers; those rows (read columns only) are then all held in
+        memory and sorted once. Returns (ranked_data, error).
+        """
+        if selected_criteria:
+            missing_columns = [col for col in selected_criteria if col not in self.columns]
+            if missing_columns:
+                return None, f"Error: {KeyError(missing_columns[0])}. One or more columns do not exist in the dataset."
+            if sort_directions is None or isinstance(sort_directions, bool):
+                sort_directions = [True if sort_directions is None else sort_directions] * len(selected_criteria)
+            keys = list(zip(selected_criteria, sort_directions))
+        elif score_column in self.columns:
+            keys = [(score_column, False)]
+        else:
+            return None, "Select ranking criteria: this dataset has no model scores to rank by."
+
+        output_columns = list(columns) if columns is not None else self.default_output_columns(selected_criteria, score_column if not selected_criteria else None)
+        read_columns = list(dict.fromkeys(output_columns + [col for col, _ in keys]))
+
+        try:
+            if top_k is None:
+                best = self._rank_all(read_columns, filter_conditions, keys)
+            else:
+                best = None
+                for batch in self.iter_batches(read_columns, filter_conditions):
+                    if best is not None and len(best) >= top_k:
+                        # Cheap pre-cut on the primary key: rows worse than the current k-th row cannot enter
+                        primary, ascending = keys[0]
+                        if pd.api.types.is_numeric_dtype(batch[primary]) and pd.api.types.is_numeric_dtype(best[primary]):
+                            _, batch_key = _stream_sort_key(batch[primary], ascending)
+                            _, best_key = _stream_sort_key(best[primary], ascending)
+                            batch = batch[batch_key <= best_key.max()]
+                            if batch.empty:
+                                continue
+                    candidates = batch if best is None else pd.concat([best, batch], ignore_index=True)
+                    sort_keys = [_stream_sort_key(candidates[col], ascending) for col, ascending in keys]
+                    best = candidates.take(top_k_positions(sort_keys, top_k)).reset_index(drop=True)
+        except KeyError as e:
+            return None, f"Error: {e}. One or more columns do not exist in the dataset."
+
+        if best is None or best.empty:
+            return None, "No suppliers match all selected filters. Please adjust your criteria."
+        return best[output_columns], None
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from core.column_stats import ColumnStatistics
+from core.filter_engine import FilterEngine
+from core.pipeline_cache import dataframe_fingerprint, row_hashes
+
+DEFAULT_STORE_BUDGET = 4 * 1024 * 1024 * 1024
+SESSION_TTL = 3600
+
+def dataset_key(raw_bytes, **options):
+    """Content hash of an uploaded file plus the load options applied to it"""
+    hasher = hashlib.sha1(raw_bytes)
+    hasher.update(repr(sorted(options.items())).encode())
+    return hasher.hexdigest()
+
+def _map_from_disk(data, path):
+    """Write data as an Arrow IPC file and return a DataFrame whose numeric columns are views of it.
+
+    Numeric columns without missing values are zero-copy views of the memory-mapped file and
+    therefore read-only; other columns are converted into process memory.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(temp_path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+    mapped = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return mapped.to_pandas(split_blocks=True)
+
+class SharedDataset:
+    """One loaded dataset and everything derived from it that sessions can share.
+
+    The data, row hashes, fingerprint, filter engine and column statistics are treated as
+    immutable: sessions keep their own filters and rankings and never write into the data.
+    """
+
+    def __init__(self, key, data, column_info):
+        self.key = key
+        self.data = data
+        self.column_info = column_info
+        self.row_hashes = row_hashes(data)
+        self.fingerprint = dataframe_fingerprint(data, self.row_hashes)
+        self.filter_engine = FilterEngine(data)
+        self.column_stats = ColumnStatistics(data, self.filter_engine)
+        self.nbytes = int(data.memory_usage(deep=True).sum())
+
+class DatasetStore:
+    """Process-wide store holding one copy of each dataset, shared by every session that opens it.
+
+    Datasets are keyed by dataset_key, so two sessions uploading the same file get the same
+    SharedDataset and the file is only parsed once. Each session references at most one dataset;
+    a session that opens another file, or has not been seen for session_ttl seconds, drops its
+    reference. Datasets nobody references are evicted, least recently used first, once the
+    store exceeds memory_budget. With spill_dir, datasets are kept in Arrow IPC files there and
+    memory-mapped instead of being held in process memory.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_STORE_BUDGET, session_ttl=SESSION_TTL, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.session_ttl = session_ttl
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()
+        self._sessions = {}
+        self._last_seen = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        if spill_dir:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Memory-mapping datasets requires pyarrow (pip install pyarrow)")
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def memory_used(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def references(self, key):
+        """Number of live sessions holding a dataset"""
+        with self._lock:
+            self._expire_sessions()
+            return sum(1 for held in self._sessions.values() if held == key)
+
+    def acquire(self, key, session_id, loader):
+        """The SharedDataset for key, referenced by session_id.
+
+        loader() returns (data, column_info) and only runs if no session has loaded this key;
+        concurrent first requests for the same key wait for a single load.
+        """
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                data, column_info = loader()
+                if self.spill_dir:
+                    data = _map_from_disk(data, os.path.join(self.spill_dir, f"{key}.arrow"))
+                entry = SharedDataset(key, data, column_info)
+        with self._lock:
+            self._loading.pop(key, None)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._sessions[session_id] = key
+            self._last_seen[session_id] = time.time()
+            self._evict()
+        return entry
+
+    def touch(self, session_id):
+        """Mark a session as alive; call on every rerun"""
+        with self._lock:
+            if session_id in self._sessions:
+                self._last_seen[session_id] = time.time()
+                self._entries.move_to_end(self._sessions[session_id])
+
+    def release(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+            self._evict()
+
+    def _expire_sessions(self):
+        cutoff = time.time() - self.session_ttl
+        for session_id in [s for s, seen in self._last_seen.items() if seen < cutoff]:
+            self._sessions.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+
+    def _evict(self):
+        self._expire_sessions()
+        held = set(self._sessions.values())
+        for key in list(self._entries):
+            if self.memory_used <= self.memory_budget:
+                break
+            if key not in held:
+                self._drop(key)
+
+    def _drop(self, key):
+        self._entries.pop(key)
+        if self.spill_dir:
+            try:
+                os.remove(os.path.join(self.spill_dir, f"{key}.arrow"))
+            except OSError:
+                # Still mapped on platforms that refuse to delete open files; the next spill of this key replaces it
+                pass
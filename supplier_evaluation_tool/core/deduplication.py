@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from core.data_preprocessor import ID_COLUMNS
+
+NAME_COLUMNS = ['Supplier_Name', 'Vendor_Name', 'Name', 'supplier_name']
+ADDRESS_COLUMNS = ['Address', 'Supplier_Address', 'address']
+LEGAL_SUFFIXES = r"\b(inc|incorporated|ltd|limited|llc|llp|plc|corp|corporation|co|company|gmbh|ag|sa|srl|bv|pvt|pty)\b"
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_WINDOW = 5
+NAME_WEIGHT = 0.7
+PAIR_CHUNK = 500_000
+
+def _first_present(data, candidates):
+    return next((col for col in candidates if col in data.columns), None)
+
+def normalize_text(series):
+    """Lower-cased text with punctuation, legal suffixes and repeated spaces removed"""
+    codes, uniques = pd.factorize(series.astype(object).where(series.notna(), ''))
+    cleaned = (pd.Series(uniques, dtype=object).astype(str).str.lower()
+               .str.replace(r"[^\w\s]", ' ', regex=True)
+               .str.replace(LEGAL_SUFFIXES, ' ', regex=True)
+               .str.replace(r"\s+", ' ', regex=True)
+               .str.strip())
+    # Normalization runs on the distinct values only; rows pick up the result through their codes
+    return cleaned.to_numpy()[codes]
+
+def _ngram_vectors(texts):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 3), n_features=2 ** 20,
+                                   alternate_sign=False, norm='l2')
+    return vectorizer.transform(texts)
+
+def _pair_similarity(vectors, left, right):
+    """Cosine similarity of the character 3-gram vectors of each (left, right) pair"""
+    similarity = np.empty(len(left))
+    for start in range(0, len(left), PAIR_CHUNK):
+        end = start + PAIR_CHUNK
+        products = vectors[left[start:end]].multiply(vectors[right[start:end]])
+        similarity[start:end] = np.asarray(products.sum(axis=1)).ravel()
+    return similarity
+
+def _sorted_neighbourhood(keys, window):
+    """Candidate pairs: each entity against the next window-1 entities in key order"""
+    order = np.argsort(keys, kind='stable')
+    left, right = [], []
+    for offset in range(1, window):
+        left.append(order[:-offset])
+        right.append(order[offset:])
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+def find_duplicate_clusters(data, name_column=None, address_column=None, threshold=DEFAULT_THRESHOLD,
+                            window=DEFAULT_WINDOW):
+    """Cluster id per row; rows judged to be the same supplier share an id.
+
+    Rows with the same normalized name and address are merged outright. Remaining candidates
+    come from sorted-neighbourhood blocking on the name, on the name with its words reversed
+    and on the address, so the work grows as n log n rather than n squared. Candidate pairs are
+    scored with the cosine similarity of character 3-gram vectors (name weighted 0.7 and
+    address 0.3 when there is an address) and pairs at or above threshold are linked.
+    Cluster ids are numbered in order of first appearance.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    name_column = name_column or _first_present(data, NAME_COLUMNS)
+    if name_column is None:
+        raise ValueError("No supplier name column found for deduplication")
+    address_column = address_column or _first_present(data, ADDRESS_COLUMNS)
+
+    names = normalize_text(data[name_column])
+    addresses = normalize_text(data[address_column]) if address_column else np.full(len(data), '', dtype=object)
+    entity_codes, entities = pd.factorize(pd.MultiIndex.from_arrays([names, addresses]))
+    entity_names = np.array([name for name, _ in entities], dtype=object)
+    entity_addresses = np.array([address for _, address in entities], dtype=object)
+    n_entities = len(entities)
+
+    reversed_names = np.array([' '.join(reversed(name.split())) for name in entity_names], dtype=object)
+    blocks = [_sorted_neighbourhood(entity_names, window), _sorted_neighbourhood(reversed_names, window)]
+    if address_column:
+        blocks.append(_sorted_neighbourhood(entity_addresses, window))
+    left = np.concatenate([b[0] for b in blocks])
+    right = np.concatenate([b[1] for b in blocks])
+    pair_keys = np.unique(np.minimum(left, right).astype(np.int64) * n_entities + np.maximum(left, right))
+    left, right = np.divmod(pair_keys, n_entities)
+    # Entities with an empty name are never matched on name alone
+    named = (entity_names[left] != '') & (entity_names[right] != '')
+    left, right = left[named], right[named]
+
+    similarity = _pair_similarity(_ngram_vectors(entity_names), left, right)
+    if address_column:
+        address_similarity = _pair_similarity(_ngram_vectors(entity_addresses), left, right)
+        similarity = NAME_WEIGHT * similarity + (1 - NAME_WEIGHT) * address_similarity
+    linked = similarity >= threshold
+
+    graph = coo_matrix((np.ones(linked.sum()), (left[linked], right[linked])), shape=(n_entities, n_entities))
+    _, entity_clusters = connected_components(graph, directed=False)
+    clusters = entity_clusters[entity_codes]
+    # Renumber by first appearance so merged output keeps the original row order
+    _, first_seen = np.unique(clusters, return_index=True)
+    order = np.empty(len(first_seen), dtype=np.int64)
+    order[np.argsort(first_seen)] = np.arange(len(first_seen))
+    return order[clusters]
+
+def default_aggregations(data):
+    """Mean for numeric columns, first value for ID, label, boolean and text columns"""
+    def is_measure(col):
+        series = data[col]
+        return (col not in ID_COLUMNS and col != 'Label' and pd.api.types.is_numeric_dtype(series)
+                and not pd.api.types.is_bool_dtype(series))
+    return {col: 'mean' if is_measure(col) else 'first' for col in data.columns}
+
+def deduplicate_suppliers(data, name_column=None, address_column=None, threshold=DEFAULT_THRESHOLD,
+                          window=DEFAULT_WINDOW, aggregations=None):
+    """Merge duplicate suppliers into one row each.
+
+    aggregations maps columns to any pandas groupby aggregation ('first', 'mean', 'max', ...);
+    columns not listed use default_aggregations. A Duplicate_Count column records how many rows
+    were merged. Returns (deduplicated data, cluster id per original row).
+    """
+    clusters = find_duplicate_clusters(data, name_column, address_column, threshold, window)
+    if clusters.max(initial=-1) + 1 == len(data):
+        return data, clusters
+
+    plan = default_aggregations(data)
+    plan.update(aggregations or {})
+    grouped = data.groupby(clusters, sort=True)
+    merged = grouped.agg(plan)
+    merged['Duplicate_Count'] = grouped.size().to_numpy()
+    return merged.reset_index(drop=True), clusters
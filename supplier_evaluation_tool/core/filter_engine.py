@@ -0,0 +1,103 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+REGEX_METACHARACTERS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+class FilterEngine:
+    """Compile filter_conditions into a single boolean mask over one DataFrame.
+
+    Category codes and lower-cased text values are computed lazily per column and kept,
+    so repeated filtering of the same data only pays for the comparisons.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._codes = {}
+        self._lowered = {}
+
+    def category_codes(self, column):
+        if column not in self._codes:
+            series = self.data[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                categories = series.cat.categories
+            else:
+                codes, categories = pd.factorize(series, use_na_sentinel=True)
+            self._codes[column] = (codes, pd.Index(categories))
+        return self._codes[column]
+
+    def _lowered_text(self, column):
+        """Factorized, lower-cased string form of a column: (codes, lowered unique values).
+
+        Missing values get code -1 rather than the text 'nan' or 'None'.
+        """
+        if column not in self._lowered:
+            codes, uniques = pd.factorize(self.data[column], use_na_sentinel=True)
+            lowered = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.lower()
+            self._lowered[column] = (codes, lowered)
+        return self._lowered[column]
+
+    def _numeric_mask(self, column, filter_info):
+        values = self.data[column].to_numpy()
+        mask = np.ones(len(values), dtype=bool)
+        min_val = filter_info.get('min')
+        max_val = filter_info.get('max')
+        if min_val is not None:
+            mask &= values >= min_val
+        if max_val is not None:
+            mask &= values <= max_val
+        return mask
+
+    def _membership_mask(self, column, selected_values):
+        codes, categories = self.category_codes(column)
+        selected = categories.get_indexer(pd.Index(selected_values).unique())
+        lookup = np.zeros(len(categories) + 1, dtype=bool)
+        lookup[selected[selected >= 0]] = True
+        # Missing values have code -1, which lands on the trailing False slot
+        return lookup[codes]
+
+    def _text_mask(self, column, search_text):
+        codes, lowered = self._lowered_text(column)
+        pattern = search_text.lower()
+        if not REGEX_METACHARACTERS.search(pattern):
+            matches = lowered.str.contains(pattern, regex=False)
+        else:
+            matches = lowered.str.contains(search_text, case=False, regex=True)
+        # Only the distinct values are searched; rows pick up the result through their codes.
+        # Missing values (code -1) land on the trailing False slot, so they never match, as in
+        # the Arrow pushdown of DatasetSource
+        return np.append(matches.to_numpy(dtype=bool, na_value=False), False)[codes]
+
+    def condition_mask(self, column, filter_info):
+        """Mask of a single filter condition, or None when it does not restrict any rows"""
+        filter_type = filter_info['type']
+        if filter_type == 'numeric':
+            return self._numeric_mask(column, filter_info)
+        elif filter_type == 'categorical' or filter_type == 'boolean':
+            selected_values = filter_info.get('values', [])
+            if selected_values:
+                return self._membership_mask(column, selected_values)
+        elif filter_type == 'text':
+            search_text = filter_info.get('search', '')
+            if search_text:
+                return self._text_mask(column, search_text)
+        return None
+
+    def mask(self, filter_conditions):
+        """Boolean NumPy mask of the rows that satisfy every filter condition"""
+        mask = np.ones(len(self.data), dtype=bool)
+        for column, filter_info in (filter_conditions or {}).items():
+            condition = self.condition_mask(column, filter_info)
+            if condition is not None:
+                mask &= condition
+        return mask
+
+    def positions(self, filter_conditions):
+        """Integer positions of the matching rows"""
+        return np.flatnonzero(self.mask(filter_conditions))
+
+    def apply(self, filter_conditions):
+        """Materialize the matching rows as a new DataFrame in a single take"""
+        return self.data.take(self.positions(filter_conditions))
@@ -0,0 +1,205 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.data_loader import CATEGORY_MAX_RATIO, CATEGORY_MAX_UNIQUE, ID_COLUMNS
+from core.pipeline_cache import _fit_pipeline, dataframe_fingerprint, preprocess_and_train, row_hashes
+
+DRIFT_THRESHOLD = 0.5
+UNSEEN_CATEGORY_THRESHOLD = 0.05
+MAX_INCREMENTAL_SHARE = 0.3
+MIN_DRIFT_ROWS = 200
+OCCURRENCE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+def find_id_column(data):
+    """First known supplier ID column whose values are unique, or None"""
+    for col in ID_COLUMNS:
+        if col in data.columns and not data[col].isna().any() and data[col].is_unique:
+            return col
+    return None
+
+class IncrementalRanker:
+    """Keeps the fitted preprocessing and model of a dataset and re-scores only what changed.
+
+    Rows are matched by supplier ID (or by content when there is no unique ID column) and
+    compared by row hash. New and changed rows are transformed with the stored encoders and
+    scaler and scored with the stored model; unchanged rows keep their previous scores.
+    Unseen categories get fresh codes after the known ones instead of forcing a refit. The
+    model is refit from scratch once the incrementally scored rows drift too far from the
+    training distribution, bring too many unseen categories, or make up too much of the data.
+    update and transform hold a lock, since ranking jobs of one session can run concurrently.
+    """
+
+    def __init__(self, data, cache=None, fingerprint=None, id_column=None, registry=None, hashes=None,
+                 model_search=None):
+        self.cache = cache
+        self.registry = registry
+        self.model_search = model_search
+        self.id_column = id_column
+        self._lock = threading.RLock()
+        self._fit(data, fingerprint, hashes)
+
+    def _fit(self, data, fingerprint=None, hashes=None):
+        hashes = row_hashes(data) if hashes is None else hashes
+        if self.cache is not None or self.registry is not None:
+            if fingerprint is None:
+                fingerprint = dataframe_fingerprint(data, hashes)
+            pipeline = preprocess_and_train(data, cache=self.cache, fingerprint=fingerprint, registry=self.registry,
+                                            model_search=self.model_search)
+        else:
+            pipeline = _fit_pipeline(data, self.model_search)
+        # Encoders, scaler and model are looked up on first use, so a registry hit can rank
+        # without unpickling them
+        self.pipeline = pipeline
+        self.columns = list(data.columns)
+        self.feature_names = pipeline['feature_names']
+        self.accuracy = pipeline['accuracy']
+        self.leaderboard = pipeline.get('leaderboard')
+        self.supervised = pipeline['y'] is not None
+        self.predictions = np.asarray(pipeline['predictions'])
+        self.prediction_probs = np.asarray(pipeline['prediction_probs'], dtype=np.float64)
+        self.id_column = self.id_column if self.id_column in data.columns else find_id_column(data)
+        self.hashes = hashes
+        self.keys = self._row_keys(data, self.hashes)
+        self.categories = None
+        self.tracked = None
+        self.fit_rows = len(data)
+        self.incremental_rows = 0
+        self.unseen_rows = 0
+        self._delta_sum = np.zeros(len(self.feature_names))
+
+    @property
+    def scaler(self):
+        return self.pipeline['scaler']
+
+    @property
+    def model(self):
+        return self.pipeline['model']
+
+    def _load_transformers(self):
+        if self.categories is not None:
+            return
+        encoders = self.pipeline['encoders']
+        self.categories = {col: pd.Index(encoder.classes_) for col, encoder in encoders.items()}
+        limit = min(CATEGORY_MAX_UNIQUE, CATEGORY_MAX_RATIO * self.fit_rows)
+        # High-cardinality encoded columns (names, IDs) see new values on every update by
+        # design, so only numeric and categorical-like features count towards drift
+        self.tracked = np.array([col not in encoders or len(encoders[col].classes_) <= limit
+                                 for col in self.feature_names])
+
+    def _row_keys(self, data, hashes):
+        if self.id_column is not None:
+            return pd.Index(data[self.id_column])
+        keys = pd.Index(hashes)
+        if keys.is_unique:
+            return keys
+        # Identical rows are told apart by occurrence: the n-th copy of a row keeps its key across versions
+        occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy().astype(np.uint64)
+        return pd.Index(hashes ^ (occurrence * OCCURRENCE_MIX))
+
+    def compatible(self, data):
+        return list(data.columns) == self.columns
+
+    def transform(self, data):
+        """Scaled feature matrix for rows of the fitted layout, plus a mask of rows with unseen categories"""
+        with self._lock:
+            return self._transform(data)
+
+    def _transform(self, data):
+        self._load_transformers()
+        X = data[self.feature_names].copy()
+        unseen = np.zeros(len(X), dtype=bool)
+        for col, categories in self.categories.items():
+            values = X[col].astype(str).to_numpy()
+            codes = categories.get_indexer(values)
+            missing = codes < 0
+            if missing.any():
+                categories = categories.append(pd.Index(pd.unique(values[missing])))
+                self.categories[col] = categories
+                codes = categories.get_indexer(values)
+                if self.tracked[self.feature_names.index(col)]:
+                    unseen |= missing
+            X[col] = codes
+        X = X.fillna(pd.Series(self.scaler.mean_, index=self.feature_names))
+        return self.scaler.transform(X), unseen
+
+    def score(self, X):
+        if self.supervised:
+            predictions = self.model.predict(X)
+            if len(self.model.classes_) > 1:
+                return predictions, self.model.predict_proba(X)[:, 1]
+            return predictions, predictions.astype(np.float64)
+        return self.model.predict(X), self.model.score(X)
+
+    def drift(self):
+        """Largest mean shift, in training standard deviations, of the incrementally scored rows"""
+        if not self.incremental_rows or self.tracked is None or not self.tracked.any():
+            return 0.0
+        return float(np.abs(self._delta_sum[self.tracked] / self.incremental_rows).max())
+
+    def needs_refit(self):
+        if self.incremental_rows > MAX_INCREMENTAL_SHARE * max(self.fit_rows, 1):
+            return 'incremental rows exceed {:.0%} of the fitted data'.format(MAX_INCREMENTAL_SHARE)
+        if self.incremental_rows >= MIN_DRIFT_ROWS:
+            if self.drift() > DRIFT_THRESHOLD:
+                return f'feature drift {self.drift():.2f} above {DRIFT_THRESHOLD}'
+            if self.unseen_rows / self.incremental_rows > UNSEEN_CATEGORY_THRESHOLD:
+                return 'too many rows with unseen categories'
+        return None
+
+    def update(self, data, fingerprint=None, hashes=None):
+        """Bring the scores in line with a new version of the dataset.
+
+        Returns a summary dict with the added, changed and removed row counts, whether a full
+        refit happened and why, and the current drift statistic.
+        """
+        with self._lock:
+            return self._update(data, fingerprint, hashes)
+
+    def _update(self, data, fingerprint=None, hashes=None):
+        summary = {'added': 0, 'changed': 0, 'removed': 0, 'refit': False, 'reason': None, 'drift': 0.0}
+        hashes = row_hashes(data) if hashes is None else hashes
+        if not self.compatible(data):
+            self._fit(data, fingerprint, hashes)
+            summary.update(added=len(data), refit=True, reason='columns changed')
+            return summary
+
+        keys = self._row_keys(data, hashes)
+        if not keys.is_unique or not self.keys.is_unique:
+            self._fit(data, fingerprint, hashes)
+            reason = 'supplier IDs are not unique' if self.id_column is not None else 'row keys are not unique'
+            summary.update(added=len(data), refit=True, reason=reason)
+            return summary
+
+        positions = self.keys.get_indexer(keys)
+        found = positions >= 0
+        same = np.zeros(len(data), dtype=bool)
+        same[found] = self.hashes[positions[found]] == hashes[found]
+        delta = np.flatnonzero(~same)
+        summary['added'] = int((~found).sum())
+        summary['changed'] = int(len(delta) - summary['added'])
+        summary['removed'] = int(len(self.keys) - found.sum())
+
+        predictions = np.empty(len(data), dtype=self.predictions.dtype)
+        prediction_probs = np.empty(len(data), dtype=np.float64)
+        predictions[same] = self.predictions[positions[same]]
+        prediction_probs[same] = self.prediction_probs[positions[same]]
+        if len(delta):
+            X, unseen = self._transform(data.iloc[delta])
+            predictions[delta], prediction_probs[delta] = self.score(X)
+            self.incremental_rows += len(delta)
+            self.unseen_rows += int(unseen.sum())
+            self._delta_sum += X.sum(axis=0)
+
+        self.predictions = predictions
+        self.prediction_probs = prediction_probs
+        self.hashes = hashes
+        self.keys = keys
+
+        reason = self.needs_refit()
+        if reason:
+            self._fit(data, fingerprint, hashes)
+            summary.update(refit=True, reason=reason)
+        summary['drift'] = self.drift()
+        return summary
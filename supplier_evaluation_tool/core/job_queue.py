@@ -0,0 +1,187 @@
+import contextvars
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.instrumentation import StageRecorder, current_recorder, use_recorder
+
+DEFAULT_WORKERS = 4
+JOB_TTL = 3600
+JOB_STATES = ['queued', 'running', 'done', 'failed', 'cancelled']
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested"""
+
+def job_key(*parts):
+    """Stable key for deduplicating jobs built from the inputs that determine their result"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+class Job:
+    """One unit of background work and its progress, result or error"""
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = ''
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.recorder = StageRecorder()
+        self._subscribers = {}
+        self._subscribers_lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+
+    def update(self, progress=None, message=None, partial=None):
+        """Report progress from inside the job; also a cancellation checkpoint"""
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+        self.check_cancelled()
+
+    def subscribe(self, subscriber, stage_recorder):
+        """Register a session waiting for this job; its stage timings go to stage_recorder"""
+        with self._subscribers_lock:
+            self._subscribers[subscriber] = stage_recorder
+            self.recorder.track_memory = any(r.track_memory for r in self._subscribers.values())
+
+    def unsubscribe(self, subscriber):
+        """Drop a subscriber; returns how many are left"""
+        with self._subscribers_lock:
+            self._subscribers.pop(subscriber, None)
+            return len(self._subscribers)
+
+    def publish_records(self):
+        """Copy the stages recorded while running to the recorder of every subscriber"""
+        with self._subscribers_lock:
+            recorders = list(self._subscribers.values())
+        for stage_recorder in recorders:
+            for record in self.recorder.records:
+                stage_recorder.add(record)
+
+    def cancel(self):
+        """Cancel a queued job at once, or ask a running job to stop at its next checkpoint"""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = 'cancelled'
+            self.finished_at = time.time()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class JobQueue:
+    """Thread pool with an in-process job store, shared by every session.
+
+    submit(key, func, ...) runs func(job, ...) in a worker thread, so the work survives Streamlit
+    reruns and sessions only poll the job. A job whose key matches one that is queued, running or
+    finished successfully within job_ttl seconds is not submitted again; the existing job is
+    returned instead, and the caller is added to its subscribers. A shared job is only cancelled
+    once every subscriber has asked to cancel it, and its stage timings are copied to the
+    recorder of every subscriber when it finishes. Cancellation is cooperative: jobs call
+    job.update() or job.check_cancelled() between steps.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, job_ttl=JOB_TTL):
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='supplier-job')
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def get(self, job_id):
+        return self._jobs.get(job_id) if job_id else None
+
+    def jobs(self):
+        """All stored jobs, newest first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def submit(self, key, func, *args, name=None, subscriber=None, **kwargs):
+        with self._lock:
+            self._expire()
+            existing = self._jobs.get(self._by_key.get(key))
+            if existing is not None and existing.status not in ('failed', 'cancelled') and not existing.cancel_requested:
+                existing.subscribe(subscriber, current_recorder())
+                return existing
+            job = Job(key, name or getattr(func, '__name__', 'job'))
+            job.subscribe(subscriber, current_recorder())
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            # Run in a copy of the submitter's context; stages go to the job's own recorder and are
+            # copied to every subscriber's when it finishes
+            context = contextvars.copy_context()
+            job.future = self._executor.submit(context.run, self._run, job, func, args, kwargs)
+        return job
+
+    def cancel(self, job_id, subscriber=None):
+        """Withdraw subscriber from a job, cancelling it when nobody else is waiting for it"""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            if not job.unsubscribe(subscriber):
+                job.cancel()
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        use_recorder(job.recorder)
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.check_cancelled()
+            job.progress = 1.0
+            job.status = 'done'
+        except JobCancelled:
+            job.result = None
+            job.status = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            job.publish_records()
+
+    def _expire(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) == job_id:
+                self._by_key.pop(job.key)
+
+    def shutdown(self, wait=False):
+        for job in list(self._jobs.values()):
+            if not job.finished:
+                job.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,145 @@
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from core.attribution import explain_criteria_scores, explain_model_scores
+from core.data_preprocessor import ID_COLUMNS
+from core.incremental import IncrementalRanker
+from core.model_handler import rank_suppliers
+from core.scenarios import run_scenarios
+from core.scoring_engine import ScoringEngine
+from utils.instrumentation import profile_run
+from utils.ranking_export import ranking_fingerprint
+
+RANKING_TOP_K = 25
+
+def run_ranking_job(job, request):
+    """Train or update the model, rank, chart and explain, as one background job.
+
+    request carries everything read from the session (data, indexes, ranker, inputs), since
+    worker threads cannot touch st.session_state. Returns the values to store back in it;
+    messages for the UI are (kind, payload) pairs.
+    """
+    with (profile_run() if request['profile'] else nullcontext()) as profile:
+        result = _rank(job, request)
+    result['profile'] = profile
+    return result
+
+def _rank(job, request):
+    data = request['data']
+    messages = []
+    ranker = request['ranker']
+    model_search = request['model_search']
+
+    # Re-uploads of a grown or edited dataset only re-score the new and changed rows
+    if ranker is not None and ranker.compatible(data) and ranker.model_search == model_search:
+        job.update(0.05, "Updating the model with new and changed suppliers...")
+        update = ranker.update(data, fingerprint=request['fingerprint'], hashes=request['hashes'])
+        if update['refit']:
+            messages.append(('info', f"Model refit on the full dataset ({update['reason']})."))
+        elif update['added'] or update['changed'] or update['removed']:
+            messages.append(('info', f"Incremental update: {update['added']} new, {update['changed']} changed and "
+                                     f"{update['removed']} removed suppliers re-scored without retraining."))
+    else:
+        job.update(0.05, "Preprocessing data and training the model...")
+        ranker = IncrementalRanker(data, cache=request['cache'], fingerprint=request['fingerprint'],
+                                   registry=request['registry'], hashes=request['hashes'], model_search=model_search)
+        manifest = getattr(ranker.pipeline, 'manifest', None)
+        if manifest is not None:
+            trained_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['created_at']))
+            messages.append(('info', f"Using saved model version {manifest['version']} trained on {trained_at}; no retraining needed."))
+
+    if ranker.supervised and ranker.accuracy is not None:
+        messages.append(('metric', ("Model Accuracy" if not ranker.leaderboard else "Cross-validated Accuracy",
+                                    f"{ranker.accuracy * 100:.2f}%")))
+    if ranker.leaderboard:
+        leaderboard = pd.DataFrame(ranker.leaderboard)
+        leaderboard['params'] = leaderboard['params'].astype(str)
+        messages.append(('leaderboard', leaderboard[['family', 'params', 'roc_auc', 'accuracy', 'accuracy_std',
+                                                     'folds', 'seconds', 'status']].round(4)))
+
+    job.update(0.7, "Ranking suppliers...")
+    selected_criteria = request['selected_criteria']
+    scoring_method = request['scoring_method']
+    ranking_inputs = {
+        'filter_conditions': request['filter_conditions'],
+        'predictions': ranker.predictions,
+        'prediction_probs': ranker.prediction_probs,
+        'selected_criteria': selected_criteria,
+        'sort_directions': request['sort_directions'],
+    }
+    engine = request['scoring_engine']
+    if scoring_method:
+        criteria_weights = request['criteria_weights']
+        weighted_criteria = list(criteria_weights)
+        if engine is None or engine.criteria != weighted_criteria:
+            engine = ScoringEngine(data, weighted_criteria)
+        directions = dict(zip(selected_criteria, request['sort_directions']))
+        weights = [criteria_weights[c] for c in weighted_criteria]
+        benefit = [not directions[c] for c in weighted_criteria]
+        ranking_inputs['prediction_probs'] = engine.score(weights, benefit, method=scoring_method)
+        ranking_inputs['selected_criteria'] = None
+        ranking_inputs['sort_directions'] = None
+    ranked_data, error = rank_suppliers(data, filter_engine=request['filter_engine'],
+                                        top_k=request.get('top_k', RANKING_TOP_K), **ranking_inputs)
+    if error:
+        raise ValueError(error)
+
+    job.update(0.85, "Drawing charts and explaining scores...")
+    from utils.chart_generator import generate_attribution_chart, generate_chart_png, render_chart_png
+    chart_png = generate_chart_png(ranked_data, selected_criteria, top_n=10)
+
+    # Explain the top-K scores locally, so the report needs no extra LLM calls
+    attribution = None
+    if scoring_method:
+        attribution = explain_criteria_scores(engine, weights, benefit, data.index.get_indexer(ranked_data.index),
+                                              scores=ranked_data['Supplier_Score'].to_numpy(),
+                                              index=ranked_data.index, method=scoring_method)
+    elif not selected_criteria:
+        attribution = explain_model_scores(ranker, data.loc[ranked_data.index])
+    drivers_table = attribution_chart_png = None
+    if attribution is not None:
+        id_column = next((c for c in ID_COLUMNS if c in ranked_data.columns), None)
+        labels = ranked_data[id_column].astype(str).to_numpy() if id_column else np.arange(1, len(ranked_data) + 1)
+        drivers_table = attribution.table(labels)
+        drivers_table.attrs['method'] = attribution.method
+        attribution_chart_png = render_chart_png(generate_attribution_chart(attribution.contributions, labels, top_n=10))
+
+    return {
+        'ranker': ranker,
+        'scoring_engine': engine,
+        'ranked_data': ranked_data,
+        'ranking_inputs': ranking_inputs,
+        'ranking_fingerprint': ranking_fingerprint(request['fingerprint'], ranking_inputs),
+        'chart_png': chart_png,
+        'attribution_table': drivers_table,
+        'attribution_chart_png': attribution_chart_png,
+        'ranking_messages': messages,
+    }
+
+def run_report_job(job, ranked_data, selected_criteria, top_n, token_budget, drivers_table=None):
+    """generate_supplier_report as a job; the text streamed so far is kept in job.partial"""
+    from utils.report_generator import generate_supplier_report
+    job.update(0.1, "Waiting for the model...")
+    report = generate_supplier_report(ranked_data, selected_criteria, top_n=top_n, token_budget=token_budget,
+                                      on_token=lambda text: job.update(message="Writing the report...", partial=text),
+                                      drivers_table=drivers_table)
+    job.check_cancelled()
+    return report
+
+def run_pdf_job(job, report, selected_criteria, chart_png):
+    """create_pdf as a job, returning the PDF bytes"""
+    from utils.pdf_exporter import create_pdf
+    job.update(0.1, "Creating PDF report...")
+    pdf_buffer = create_pdf(report, selected_criteria, chart_png=chart_png)
+    if pdf_buffer is None:
+        raise ValueError("PDF export failed")
+    return pdf_buffer.getvalue()
+
+def run_scenario_job(job, data, scenarios, model_scores, filter_engine, scoring_engine=None, top_k=RANKING_TOP_K):
+    """run_scenarios as a job, returning its ScenarioResults"""
+    job.update(0.1, f"Ranking {len(scenarios)} scenarios...")
+    return run_scenarios(data, scenarios, model_scores=model_scores, top_k=top_k, filter_engine=filter_engine,
+                         scoring_engine=scoring_engine)
@@ -1,10 +1,106 @@
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.cluster import KMeans
+import numpy as np
 import pandas as pd
+from core.data_preprocessor import ID_COLUMNS
+from core.filter_engine import FilterEngine
+from utils.instrumentation import instrument
 
-def train_model(X, y):
+CLUSTER_FIT_SAMPLE = 200_000
+DEFAULT_N_CLUSTERS = 3
+K_SELECTION_SAMPLE = 5_000
+K_CANDIDATES = range(2, 7)
+SCORE_CHUNK_ROWS = 262_144
+COST_KEYWORDS = ('cost', 'price', 'lead_time', 'delivery_time', 'defect', 'delay', 'lateness', 'risk')
+
+def feature_directions(feature_names, encoders=None):
+    """+1 for higher-is-better features, -1 for cost-type ones (cost, price, lead or delivery time,
+    defects, delays, risk) and 0 for ID columns and label-encoded columns, whose codes have no order"""
+    encoders = encoders or {}
+    directions = np.ones(len(feature_names))
+    for j, name in enumerate(feature_names):
+        key = str(name).lower().replace(' ', '_')
+        if name in ID_COLUMNS or name in encoders:
+            directions[j] = 0.0
+        elif any(keyword in key for keyword in COST_KEYWORDS):
+            directions[j] = -1.0
+    return directions
+
+class ClusterScoringModel:
+    """MiniBatchKMeans clustering with a continuous, rankable supplier score.
+
+    The best cluster is the one whose centroid has the highest direction-weighted mean of the
+    standardized features, weighted by feature_directions (see feature_directions; without
+    them every feature counts as higher-is-better). A supplier's score is 1 / (1 + distance to that centroid), so 1 means
+    sitting exactly on the best centroid.
+    """
+
+    def __init__(self, kmeans, feature_directions=None):
+        self.kmeans = kmeans
+        centers = kmeans.cluster_centers_
+        directions = np.ones(centers.shape[1]) if feature_directions is None else np.asarray(feature_directions, dtype=np.float64)
+        self.feature_directions = directions
+        self.best_cluster = int(np.argmax(centers @ directions / centers.shape[1]))
+
+    @property
+    def n_clusters(self):
+        return self.kmeans.n_clusters
+
+    def _chunks(self, X):
+        for start in range(0, X.shape[0], SCORE_CHUNK_ROWS):
+            yield np.asarray(X[start:start + SCORE_CHUNK_ROWS], dtype=np.float32)
+
+    def predict(self, X):
+        return np.concatenate([self.kmeans.predict(chunk) for chunk in self._chunks(X)]) if X.shape[0] else np.empty(0, dtype=np.int32)
+
+    def score(self, X):
+        if not X.shape[0]:
+            return np.empty(0)
+        best_center = self.kmeans.cluster_centers_[self.best_cluster].astype(np.float32)
+        distances = np.concatenate([np.sqrt(((chunk - best_center) ** 2).sum(axis=1)) for chunk in self._chunks(X)])
+        return 1.0 / (1.0 + distances.astype(np.float64))
+
+def _subsample(X, size, rng):
+    if X.shape[0] <= size:
+        return np.asarray(X, dtype=np.float32)
+    return np.asarray(X[np.sort(rng.choice(X.shape[0], size, replace=False))], dtype=np.float32)
+
+def select_n_clusters(X, candidates=K_CANDIDATES, sample_size=K_SELECTION_SAMPLE, random_state=42):
+    """Pick k by silhouette score on a subsample, so the cost does not grow with the dataset"""
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+    rng = np.random.default_rng(random_state)
+    sample = _subsample(X, sample_size, rng)
+    candidates = [k for k in candidates if 2 <= k < sample.shape[0]]
+    if not candidates:
+        return 1
+
+    best_k, best_score = candidates[0], -np.inf
+    for k in candidates:
+        labels = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=1, batch_size=4096).fit_predict(sample)
+        if len(np.unique(labels)) < 2:
+            continue
+        score = silhouette_score(sample, labels)
+        if score > best_score:
+            best_k, best_score = k, score
+    return best_k
+
+def fit_cluster_model(X, n_clusters=DEFAULT_N_CLUSTERS, feature_directions=None, fit_sample=CLUSTER_FIT_SAMPLE,
+                      random_state=42):
+    """Fit MiniBatchKMeans on at most fit_sample rows; n_clusters='auto' picks k with select_n_clusters"""
+    from sklearn.cluster import MiniBatchKMeans
+    if n_clusters == 'auto':
+        n_clusters = select_n_clusters(X, random_state=random_state)
+    n_clusters = max(1, min(n_clusters, X.shape[0]))
+    sample = _subsample(X, fit_sample, np.random.default_rng(random_state))
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3, batch_size=4096)
+    kmeans.fit(sample)
+    return ClusterScoringModel(kmeans, feature_directions)
+
+@instrument()
+def train_model(X, y, return_model=False, n_clusters=DEFAULT_N_CLUSTERS, feature_directions=None):
     if y is not None:
+        # scikit-learn is imported on first use so ranking from a registered model skips it
+        from sklearn.model_selection import train_test_split
+        from sklearn.tree import DecisionTreeClassifier
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         model = DecisionTreeClassifier(random_state=42)
         model.fit(X_train, y_train)
@@ -12,52 +108,112 @@ def train_model(X, y):
         predictions = model.predict(X)
         prediction_probs = model.predict_proba(X)[:, 1] if len(model.classes_) > 1 else predictions
         
+        if return_model:
+            return predictions, prediction_probs, accuracy, model
         return predictions, prediction_probs, accuracy
     else:
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        clusters = kmeans.fit_predict(X)
-        return clusters, clusters, None
-
-def apply_filters_to_data(data, filter_conditions):
-    filtered_data = data.copy()
-    for column, filter_info in filter_conditions.items():
-        filter_type = filter_info['type']
-        if filter_type == 'numeric':
-            min_val = filter_info.get('min')
-            max_val = filter_info.get('max')
-            if min_val is not None:
-                filtered_data = filtered_data[filtered_data[column] >= min_val]
-            if max_val is not None:
-                filtered_data = filtered_data[filtered_data[column] <= max_val]
-        elif filter_type == 'categorical' or filter_type == 'boolean':
-            selected_values = filter_info.get('values', [])
-            if selected_values:
-                filtered_data = filtered_data[filtered_data[column].isin(selected_values)]
-        elif filter_type == 'text':
-            search_text = filter_info.get('search', '')
-            if search_text:
-                filtered_data = filtered_data[filtered_data[column].astype(str).str.contains(search_text, case=False, na=False)]
-    return filtered_data
-
-def rank_suppliers(data, filter_conditions, predictions=None, prediction_probs=None, selected_criteria=None, sort_directions=None):
-    filtered_data = apply_filters_to_data(data, filter_conditions) if filter_conditions else data.copy()
-    
-    if len(filtered_data) == 0:
-        return None, "No suppliers match all selected filters. Please adjust your criteria."
-    
-    if selected_criteria:
-        try:
-            ranked_data = filtered_data.sort_values(by=selected_criteria, ascending=sort_directions)
-        except KeyError as e:
-            return None, f"Error: {e}. One or more columns do not exist in the dataset."
+        model = fit_cluster_model(X, n_clusters=n_clusters, feature_directions=feature_directions)
+        clusters = model.predict(X)
+        scores = model.score(X)
+        if return_model:
+            return clusters, scores, None, model
+        return clusters, scores, None
+
+def apply_filters_to_data(data, filter_conditions, filter_engine=None):
+    engine = filter_engine if filter_engine is not None else FilterEngine(data)
+    return engine.apply(filter_conditions)
+
+def _sort_key(values, ascending=True):
+    """Return (is_missing, float key) arrays that order values like sort_values with NaNs last"""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        key = values.cat.codes.to_numpy().astype(np.float64)
+        key[key < 0] = np.nan
+    elif pd.api.types.is_numeric_dtype(values):
+        key = values.to_numpy(dtype=np.float64, na_value=np.nan)
     else:
-        if prediction_probs is not None:
-            score_mapping = dict(zip(data.index, prediction_probs))
-            filtered_data['Supplier_Score'] = filtered_data.index.map(score_mapping)
-        else:
-            score_mapping = dict(zip(data.index, predictions)) if predictions is not None else {}
-            filtered_data['Supplier_Score'] = filtered_data.index.map(score_mapping)
-        
-        ranked_data = filtered_data.sort_values(by='Supplier_Score', ascending=False)
-    
-    return ranked_data, None
\ No newline at end of file
+        codes, _ = pd.factorize(values.astype(object), sort=True)
+        key = codes.astype(np.float64)
+        key[codes < 0] = np.nan
+    missing = np.isnan(key)
+    if not ascending:
+        key = -key
+    key[missing] = np.inf
+    return missing, key
+
+def top_k_positions(sort_keys, k):
+    """Positions of the k smallest rows under lexicographic (is_missing, key) pairs, in order.
+
+    Uses np.partition on the first key to cut the candidates down to rows that can still make
+    the top k (ties at the boundary included), then lexsorts only those candidates.
+    """
+    n = len(sort_keys[0][1])
+    primary = sort_keys[0][1]
+    if k < n:
+        kth = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= kth)
+    else:
+        candidates = np.arange(n)
+
+    lex_keys = [candidates]
+    for missing, key in reversed(sort_keys):
+        lex_keys.append(key[candidates])
+        lex_keys.append(missing[candidates])
+    order = np.lexsort(lex_keys)
+    return candidates[order[:k]]
+
+def _score_array(data, predictions, prediction_probs):
+    scores = prediction_probs if prediction_probs is not None else predictions
+    if scores is None:
+        return np.full(len(data), np.nan)
+    scores = np.asarray(scores)
+    return scores.astype(np.float64) if scores.dtype.kind in 'biuf' else scores
+
+def rank_positions(data, filter_conditions, predictions=None, prediction_probs=None, selected_criteria=None,
+                   sort_directions=None, filter_engine=None, top_k=None):
+    """Ranking as row positions instead of a DataFrame, limited to the best top_k rows if given.
+
+    Returns (positions, scores, error) where scores is the Supplier_Score of each ranked row, or
+    None when ranking by criteria.
+    """
+    if filter_conditions:
+        engine = filter_engine if filter_engine is not None else FilterEngine(data)
+        positions = engine.positions(filter_conditions)
+    else:
+        positions = np.arange(len(data))
+    if len(positions) == 0:
+        return None, None, "No suppliers match all selected filters. Please adjust your criteria."
+    k = len(positions) if top_k is None else top_k
+
+    if selected_criteria:
+        missing_columns = [col for col in selected_criteria if col not in data.columns]
+        if missing_columns:
+            return None, None, f"Error: {KeyError(missing_columns[0])}. One or more columns do not exist in the dataset."
+        if sort_directions is None or isinstance(sort_directions, bool):
+            sort_directions = [True if sort_directions is None else sort_directions] * len(selected_criteria)
+        sort_keys = [_sort_key(data[col].take(positions).reset_index(drop=True), ascending)
+                     for col, ascending in zip(selected_criteria, sort_directions)]
+        return positions[top_k_positions(sort_keys, k)], None, None
+
+    scores = _score_array(data, predictions, prediction_probs)[positions]
+    order = top_k_positions([_sort_key(scores, ascending=False)], k)
+    return positions[order], scores[order], None
+
+@instrument()
+def rank_suppliers(data, filter_conditions, predictions=None, prediction_probs=None, selected_criteria=None, sort_directions=None, filter_engine=None, top_k=None):
+    """Filter and rank suppliers. With top_k, only the best top_k rows are selected and returned."""
+    if not isinstance(data, pd.DataFrame):
+        # Out-of-core sources (core.data_source.DatasetSource) stream through a bounded top-K instead
+        if predictions is not None or prediction_probs is not None:
+            return None, ("Model scores cannot be attached to an out-of-core dataset. Store them in its "
+                          "Supplier_Score column or rank by criteria.")
+        return data.rank(filter_conditions, selected_criteria, sort_directions, top_k=top_k)
+
+    positions, scores, error = rank_positions(data, filter_conditions, predictions, prediction_probs, selected_criteria,
+                                              sort_directions, filter_engine, top_k)
+    if error:
+        return None, error
+    ranked_data = data.take(positions)
+    if scores is not None:
+        ranked_data['Supplier_Score'] = scores
+    return ranked_data, None
@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+ARRAY_KEYS = ['predictions', 'prediction_probs', 'y']
+ARTIFACT_KEYS = ['encoders', 'scaler', 'model']
+
+def _sklearn_version():
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version('scikit-learn')
+    except PackageNotFoundError:
+        return None
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # Object arrays (string labels) cannot be memory-mapped
+        return np.load(path, allow_pickle=True)
+
+class RegistryEntry(dict):
+    """Pipeline entry loaded from the registry.
+
+    Score arrays are memory-mapped and the fitted encoders, scaler and model are only unpickled
+    (importing scikit-learn) the first time one of them is looked up.
+    """
+
+    def __init__(self, path, manifest, arrays):
+        super().__init__(arrays)
+        self.path = path
+        self.manifest = manifest
+        self['X_scaled'] = None
+        self['feature_names'] = manifest['feature_names']
+        self['accuracy'] = manifest['accuracy']
+        self['leaderboard'] = manifest.get('leaderboard')
+
+    def __missing__(self, key):
+        if key not in ARTIFACT_KEYS:
+            raise KeyError(key)
+        import joblib
+        self.update(joblib.load(os.path.join(self.path, 'artifacts.joblib')))
+        return self[key]
+
+class ModelRegistry:
+    """Versioned on-disk store of fitted pipelines, keyed by dataset fingerprint.
+
+    Each version lives in <root>/<fingerprint>/v<N>/ as a manifest.json, the score arrays as
+    .npy files that load memory-mapped, and the encoders, scaler and model in artifacts.joblib.
+    Versions written with another scikit-learn release, or with different pipeline parameters,
+    are never loaded.
+    """
+
+    def __init__(self, root, keep_versions=3):
+        self.root = root
+        self.keep_versions = keep_versions
+        os.makedirs(root, exist_ok=True)
+
+    def _fingerprint_dir(self, fingerprint):
+        return os.path.join(self.root, fingerprint)
+
+    def versions(self, fingerprint):
+        """Manifests of every stored version of a dataset, newest first"""
+        directory = self._fingerprint_dir(fingerprint)
+        if not os.path.isdir(directory):
+            return []
+        manifests = []
+        for name in os.listdir(directory):
+            manifest_path = os.path.join(directory, name, 'manifest.json')
+            if name.startswith('v') and os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda m: m['version'], reverse=True)
+
+    def latest(self):
+        """Manifest of the most recently saved version across all datasets, or None"""
+        manifests = [m for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))
+                     for m in self.versions(name)[:1]]
+        return max(manifests, key=lambda m: m['created_at'], default=None)
+
+    def save(self, fingerprint, entry, params=None, rows=None):
+        """Store a pipeline entry as the next version of this dataset. Returns the manifest."""
+        import joblib
+        directory = self._fingerprint_dir(fingerprint)
+        os.makedirs(directory, exist_ok=True)
+        existing = self.versions(fingerprint)
+        version = existing[0]['version'] + 1 if existing else 1
+        manifest = {
+            'fingerprint': fingerprint,
+            'version': version,
+            'created_at': time.time(),
+            'params': params or {},
+            'rows': rows,
+            'feature_names': list(entry['feature_names']),
+            'accuracy': None if entry['accuracy'] is None else float(entry['accuracy']),
+            'supervised': entry['y'] is not None,
+            'leaderboard': entry.get('leaderboard'),
+            'sklearn_version': _sklearn_version(),
+        }
+
+        temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=directory)
+        try:
+            for key in ARRAY_KEYS:
+                if entry.get(key) is not None:
+                    np.save(os.path.join(temp_dir, f'{key}.npy'), np.asarray(entry[key]))
+            joblib.dump({key: entry[key] for key in ARTIFACT_KEYS}, os.path.join(temp_dir, 'artifacts.joblib'))
+            with open(os.path.join(temp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(temp_dir, os.path.join(directory, f'v{version}'))
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        for old in existing[self.keep_versions - 1:]:
+            shutil.rmtree(os.path.join(directory, f"v{old['version']}"), ignore_errors=True)
+        return manifest
+
+    def load(self, fingerprint, params=None, version=None):
+        """Newest compatible version of a dataset's pipeline as a RegistryEntry, or None"""
+        sklearn_version = _sklearn_version()
+        for manifest in self.versions(fingerprint):
+            if version is not None and manifest['version'] != version:
+                continue
+            if manifest['params'] != (params or {}) or manifest['sklearn_version'] != sklearn_version:
+                continue
+            path = os.path.join(self._fingerprint_dir(fingerprint), f"v{manifest['version']}")
+            arrays = {}
+            for key in ARRAY_KEYS:
+                array_path = os.path.join(path, f'{key}.npy')
+                arrays[key] = _load_array(array_path) if os.path.exists(array_path) else None
+            return RegistryEntry(path, manifest, arrays)
+        return None
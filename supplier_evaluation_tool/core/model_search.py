@@ -0,0 +1,179 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from core.model_handler import train_model
+
+DEFAULT_TIME_BUDGET = 60
+DEFAULT_FOLDS = 5
+CANDIDATES_PER_FAMILY = 4
+SEARCH_SAMPLE = 100_000
+
+SEARCH_SPACE = {
+    'decision_tree': {'max_depth': [4, 8, 12, None], 'min_samples_leaf': [1, 20, 100]},
+    'random_forest': {'n_estimators': [100, 200], 'max_depth': [8, 16, None], 'min_samples_leaf': [1, 5]},
+    'gradient_boosting': {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [15, 31, 63], 'l2_regularization': [0.0, 1.0]},
+    'logistic_regression': {'C': [0.01, 0.1, 1.0, 10.0]},
+}
+MODEL_FAMILIES = list(SEARCH_SPACE)
+
+def make_model(family, params, random_state=42):
+    if family == 'decision_tree':
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(random_state=random_state, **params)
+    if family == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    if family == 'gradient_boosting':
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        # Built-in early stopping on a held-out tenth of each training fold
+        return HistGradientBoostingClassifier(random_state=random_state, early_stopping=True, max_iter=300, **params)
+    if family == 'logistic_regression':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(max_iter=1000, **params)
+    raise ValueError(f"Unknown model family: {family}")
+
+def candidate_grid(families=None, per_family=CANDIDATES_PER_FAMILY, random_state=42):
+    """At most per_family randomly drawn parameter sets for each model family"""
+    from sklearn.model_selection import ParameterSampler
+    candidates = []
+    for family in families or MODEL_FAMILIES:
+        space = SEARCH_SPACE[family]
+        n_combinations = int(np.prod([len(values) for values in space.values()]))
+        for params in ParameterSampler(space, n_iter=min(per_family, n_combinations), random_state=random_state):
+            candidates.append((family, params))
+    return candidates
+
+def evaluate_candidate(X, y, family, params, n_folds, deadline, random_state=42):
+    """Cross-validate one candidate; folds that would start after the deadline are skipped"""
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+
+    binary = len(np.unique(y)) == 2
+    accuracies, aucs = [], []
+    start = time.perf_counter()
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    for train_idx, test_idx in folds.split(X, y):
+        if time.time() > deadline:
+            break
+        model = make_model(family, params, random_state)
+        model.fit(X[train_idx], y[train_idx])
+        accuracies.append(accuracy_score(y[test_idx], model.predict(X[test_idx])))
+        if binary:
+            aucs.append(roc_auc_score(y[test_idx], model.predict_proba(X[test_idx])[:, 1]))
+
+    result = {
+        'family': family,
+        'params': params,
+        'folds': len(accuracies),
+        'seconds': round(time.perf_counter() - start, 3),
+        'accuracy': float(np.mean(accuracies)) if accuracies else None,
+        'accuracy_std': float(np.std(accuracies)) if accuracies else None,
+        'roc_auc': float(np.mean(aucs)) if aucs else None,
+        'status': 'ok' if len(accuracies) == n_folds else 'partial' if accuracies else 'skipped',
+    }
+    result['score'] = result['roc_auc'] if binary else result['accuracy']
+    return result
+
+def _error_result(family, params, error):
+    """Leaderboard entry of a candidate whose evaluation raised, so the search can go on without it"""
+    return {'family': family, 'params': params, 'folds': 0, 'seconds': None, 'accuracy': None,
+            'accuracy_std': None, 'roc_auc': None, 'status': 'error', 'score': None, 'error': str(error)}
+
+_worker_data = None
+
+def _init_worker(X, y):
+    global _worker_data
+    _worker_data = (X, y)
+
+def _evaluate_in_worker(family, params, n_folds, deadline, random_state):
+    X, y = _worker_data
+    return evaluate_candidate(X, y, family, params, n_folds, deadline, random_state)
+
+def _stratified_sample(y, size, random_state):
+    from sklearn.model_selection import train_test_split
+    if len(y) <= size:
+        return np.arange(len(y))
+    positions, _ = train_test_split(np.arange(len(y)), train_size=size, stratify=y, random_state=random_state)
+    return np.sort(positions)
+
+def search_models(X, y, families=None, n_folds=DEFAULT_FOLDS, time_budget=DEFAULT_TIME_BUDGET, n_jobs=None,
+                  per_family=CANDIDATES_PER_FAMILY, sample_size=SEARCH_SAMPLE, random_state=42):
+    """Cross-validated search over the model families within a wall-clock budget.
+
+    Candidates are evaluated in parallel worker processes on a stratified sample of at most
+    sample_size rows; candidates not finished when the budget runs out are dropped or kept
+    with the folds they completed. Worker processes are not killed at the deadline: a candidate
+    already running finishes its current fold in the background before it stops. A candidate
+    that fails, or whose worker dies, is listed with status 'error' and no score. Binary labels
+    are ranked by ROC AUC, since the ranking uses the predicted probabilities; other labels by
+    accuracy. Returns the leaderboard, best first and failed candidates last.
+    """
+    y = np.asarray(y)
+    positions = _stratified_sample(y, sample_size, random_state)
+    X_sample, y_sample = np.asarray(X)[positions], y[positions]
+    deadline = time.time() + time_budget
+    candidates = candidate_grid(families, per_family, random_state)
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    results = []
+    if n_jobs == 1:
+        for family, params in candidates:
+            if time.time() > deadline:
+                break
+            try:
+                results.append(evaluate_candidate(X_sample, y_sample, family, params, n_folds, deadline, random_state))
+            except Exception as e:
+                results.append(_error_result(family, params, e))
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X_sample, y_sample))
+        try:
+            submitted = {executor.submit(_evaluate_in_worker, family, params, n_folds, deadline, random_state): (family, params)
+                         for family, params in candidates}
+            pending = set(submitted)
+            while pending:
+                done, pending = wait(pending, timeout=max(deadline - time.time(), 0) + 1, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        # Includes BrokenProcessPool when a worker dies, e.g. out of memory
+                        results.append(_error_result(*submitted[future], e))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    scored = [r for r in results if r['score'] is not None]
+    failed = [r for r in results if r['status'] == 'error']
+    return sorted(scored, key=lambda r: (r['status'] != 'ok', -r['score'], r['seconds'])) + failed
+
+def train_best_model(X, y, leaderboard, random_state=42):
+    """Refit the leaderboard winner on all rows"""
+    best = leaderboard[0]
+    model = make_model(best['family'], best['params'], random_state)
+    model.fit(X, y)
+    return model
+
+def train_searched_model(X, y, **search_options):
+    """Supervised counterpart of train_model with a cross-validated model search.
+
+    Returns (predictions, prediction_probs, accuracy, model, leaderboard) where accuracy is the
+    winner's cross-validated accuracy. Falls back to train_model when a class has too few rows
+    to cross-validate or nothing finished within the budget.
+    """
+    y_array = np.asarray(y)
+    _, class_counts = np.unique(y_array, return_counts=True)
+    n_folds = search_options.get('n_folds', DEFAULT_FOLDS)
+    leaderboard = []
+    if len(class_counts) > 1 and class_counts.min() >= n_folds:
+        leaderboard = search_models(X, y_array, **search_options)
+    if not leaderboard or leaderboard[0]['score'] is None:
+        return train_model(X, y, return_model=True) + (leaderboard,)
+
+    model = train_best_model(X, y_array, leaderboard)
+    predictions = model.predict(X)
+    prediction_probs = model.predict_proba(X)[:, 1]
+    return predictions, prediction_probs, leaderboard[0]['accuracy'], model, leaderboard
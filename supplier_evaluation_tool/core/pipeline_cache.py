@@ -0,0 +1,191 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.data_preprocessor import feature_columns, preprocess_data
+from core.model_handler import feature_directions, train_model
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+def row_hashes(data):
+    """64-bit content hash of every row, ignoring the index"""
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+def dataframe_fingerprint(data, hashes=None):
+    """Content hash of a DataFrame: column names, dtypes, index and every cell value.
+
+    Pass the result of row_hashes to avoid hashing the cells twice.
+    """
+    if hashes is None:
+        hashes = row_hashes(data)
+    hasher = hashlib.sha1()
+    hasher.update(repr(list(data.columns)).encode())
+    hasher.update(repr([str(dtype) for dtype in data.dtypes]).encode())
+    hasher.update(pd.util.hash_pandas_object(data.index).to_numpy().tobytes())
+    hasher.update(hashes.tobytes())
+    return hasher.hexdigest()
+
+def pipeline_key(fingerprint, **params):
+    """Combine a dataset fingerprint with preprocessing/model parameters into one cache key"""
+    param_text = repr(sorted(params.items()))
+    return hashlib.sha1(f"{fingerprint}|{param_text}".encode()).hexdigest()
+
+def _estimate_size(entry):
+    size = 0
+    for value in entry.values():
+        if isinstance(value, np.ndarray):
+            size += value.nbytes
+        elif isinstance(value, pd.Series):
+            size += int(value.memory_usage(deep=True))
+        elif value is not None:
+            size += len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return size
+
+class PipelineCache:
+    """LRU cache of preprocessing and training results with a memory budget.
+
+    Entries hold X_scaled, y, feature_names, the fitted encoders and scaler, the fitted model
+    and its predictions. If cache_dir is given, entries are also written there with joblib and
+    reloaded on a memory miss, so they survive restarts.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, cache_dir=None):
+        self.memory_budget = memory_budget
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def memory_used(self):
+        return sum(self._sizes.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.cache_dir is not None and os.path.exists(self._disk_path(key)))
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            import joblib
+            try:
+                entry = joblib.load(self._disk_path(key))
+            except Exception:
+                entry = None
+            if entry is not None:
+                self._store(key, entry)
+                with self._lock:
+                    self.hits += 1
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._store(key, entry)
+        if self.cache_dir:
+            import joblib
+            temp_path = self._disk_path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            joblib.dump(entry, temp_path)
+            os.replace(temp_path, self._disk_path(key))
+
+    def _store(self, key, entry):
+        size = _estimate_size(entry)
+        with self._lock:
+            if key in self._entries:
+                self._sizes.pop(key)
+                self._entries.pop(key)
+            if size > self.memory_budget:
+                return
+            self._entries[key] = entry
+            self._sizes[key] = size
+            while self.memory_used > self.memory_budget:
+                oldest, _ = self._entries.popitem(last=False)
+                self._sizes.pop(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+PIPELINE_PARAMS = {'preprocess': 'label_encode+standard_scale', 'features': 'drop_identifiers',
+                   'model': 'decision_tree|minibatch_kmeans_k3_directed'}
+
+def _pipeline_params(model_search):
+    if not model_search:
+        return PIPELINE_PARAMS
+    return dict(PIPELINE_PARAMS, search=repr(sorted(model_search.items())))
+
+def preprocess_and_train(data, cache=None, fingerprint=None, registry=None, model_search=None):
+    """Run preprocess_data and train_model, reusing a cached or registered result for unchanged data.
+
+    Returns a dict with X_scaled, y, feature_names, encoders, scaler, model, predictions,
+    prediction_probs, accuracy and leaderboard. Entries loaded from a ModelRegistry have no
+    X_scaled. model_search is a dict of search_models options; when given, labelled data is
+    trained with a cross-validated model search and leaderboard lists the candidates.
+    """
+    if cache is None and registry is None:
+        return _fit_pipeline(data, model_search)
+
+    if fingerprint is None:
+        fingerprint = dataframe_fingerprint(data)
+    params = _pipeline_params(model_search)
+    key = pipeline_key(fingerprint, **params)
+    entry = cache.get(key) if cache is not None else None
+    if entry is None and registry is not None:
+        entry = registry.load(fingerprint, params=params)
+    if entry is None:
+        entry = _fit_pipeline(data, model_search)
+        if registry is not None:
+            registry.save(fingerprint, entry, params=params, rows=len(data))
+    if cache is not None and key not in cache:
+        cache.put(key, entry)
+    return entry
+
+def _fit_pipeline(data, model_search=None):
+    # IDs, names and addresses identify a supplier rather than describe it, so they are not
+    # features unless nothing else is left
+    drop_identifiers = bool(feature_columns(data, drop_identifiers=True))
+    X_scaled, y, feature_names, encoders, scaler = preprocess_data(data, return_transformers=True,
+                                                                   drop_identifiers=drop_identifiers)
+    leaderboard = None
+    if model_search is not None and y is not None:
+        from core.model_search import train_searched_model
+        predictions, prediction_probs, accuracy, model, leaderboard = train_searched_model(X_scaled, y, **model_search)
+    else:
+        # Cost-type features pull the best cluster towards low values; encoded columns are ignored
+        directions = feature_directions(feature_names, encoders)
+        predictions, prediction_probs, accuracy, model = train_model(X_scaled, y, return_model=True,
+                                                                     feature_directions=directions)
+    return {
+        'X_scaled': X_scaled,
+        'y': y,
+        'feature_names': feature_names,
+        'encoders': encoders,
+        'scaler': scaler,
+        'model': model,
+        'predictions': predictions,
+        'prediction_probs': prediction_probs,
+        'accuracy': accuracy,
+        'leaderboard': leaderboard,
+    }
@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+
+from core.data_preprocessor import ID_COLUMNS
+from core.filter_engine import FilterEngine
+from core.scoring_engine import SCORING_METHODS, ScoringEngine
+from utils.instrumentation import instrument
+
+SCENARIO_TOP_K = 25
+SWEEP_BLOCK_BYTES = 256 * 1024 * 1024
+
+def weight_perturbations(scenario, n, spread=0.25, random_state=42):
+    """n copies of a weighted scenario with every weight scaled by a random factor in [1 - spread, 1 + spread]"""
+    rng = np.random.default_rng(random_state)
+    criteria = list(scenario['weights'])
+    base = np.array([scenario['weights'][c] for c in criteria], dtype=np.float64)
+    factors = rng.uniform(1 - spread, 1 + spread, size=(n, len(criteria)))
+    name = scenario.get('name', 'Scenario')
+    return [dict(scenario, name=f"{name} #{i + 1}", weights=dict(zip(criteria, (base * row).round(4).tolist())))
+            for i, row in enumerate(factors)]
+
+class ScenarioResults:
+    """Top-K rankings of a scenario sweep, with rank-stability statistics across scenarios.
+
+    positions[i] holds the row positions of scenario i's top K in rank order (empty when no
+    supplier matches its filters) and scores[i] their Supplier_Score.
+    """
+
+    def __init__(self, data, names, positions, scores, match_counts):
+        self.data = data
+        self.names = names
+        self.positions = positions
+        self.scores = scores
+        self.match_counts = match_counts
+
+    def __len__(self):
+        return len(self.names)
+
+    def labels(self, positions):
+        id_column = next((c for c in ID_COLUMNS if c in self.data.columns), None)
+        if id_column is None:
+            return self.data.index.take(positions).to_numpy()
+        return self.data[id_column].take(positions).astype(str).to_numpy()
+
+    def ranked(self, i):
+        """Scenario i's top K as a DataFrame, like rank_suppliers with top_k"""
+        ranked_data = self.data.take(self.positions[i])
+        ranked_data['Supplier_Score'] = self.scores[i]
+        return ranked_data
+
+    def overlap(self):
+        """Share of each scenario's top K that also appears in another's (scenarios x scenarios)"""
+        from scipy.sparse import csr_matrix
+        lengths = np.array([len(p) for p in self.positions])
+        incidence = csr_matrix((np.ones(lengths.sum()), (np.repeat(np.arange(len(self)), lengths),
+                                np.concatenate(self.positions) if lengths.sum() else np.zeros(0, dtype=np.int64))),
+                               shape=(len(self), len(self.data)))
+        shared = (incidence @ incidence.T).toarray()
+        share = np.divide(shared, lengths[:, None], out=np.zeros_like(shared), where=lengths[:, None] > 0)
+        return pd.DataFrame(share.round(3), index=self.names, columns=self.names)
+
+    def stability(self):
+        """Per supplier in any top K: how often it appears and how much its rank moves"""
+        lengths = [len(p) for p in self.positions]
+        frame = pd.DataFrame({
+            'position': np.concatenate(self.positions) if sum(lengths) else np.zeros(0, dtype=np.int64),
+            'rank': np.concatenate([np.arange(1, n + 1) for n in lengths]) if sum(lengths) else np.zeros(0, dtype=np.int64),
+        })
+        stats = frame.groupby('position')['rank'].agg(['count', 'min', 'mean', 'max', 'std'])
+        stats = stats.sort_values(['count', 'mean'], ascending=[False, True], kind='stable')
+        table = pd.DataFrame({
+            'Supplier': self.labels(stats.index.to_numpy()),
+            'Appearances': stats['count'].to_numpy(),
+            'Share': (stats['count'] / len(self)).round(3).to_numpy(),
+            'Best rank': stats['min'].to_numpy(),
+            'Mean rank': stats['mean'].round(2).to_numpy(),
+            'Worst rank': stats['max'].to_numpy(),
+            'Rank std': stats['std'].fillna(0.0).round(2).to_numpy(),
+        }, index=stats.index)
+        return table
+
+    def summary(self):
+        """One row per scenario: matching suppliers, its leader and overlap with the first scenario"""
+        first_overlap = self.overlap().iloc[:, 0].to_numpy() if len(self) else []
+        leaders = [p[0] for p in self.positions if len(p)]
+        leader_labels = iter(self.labels(np.array(leaders, dtype=np.int64)))
+        return pd.DataFrame({
+            'Scenario': self.names,
+            'Matches': self.match_counts,
+            'Top supplier': [next(leader_labels) if len(p) else None for p in self.positions],
+            'Top score': [round(float(s[0]), 4) if len(s) else None for s in self.scores],
+            'Overlap with first': first_overlap,
+        })
+
+class _CriteriaMatrix:
+    """Per-criterion terms shared by every scenario, so each block of scenarios is scored with matrix products"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._scaled = None
+        self._topsis = None
+
+    def scaled(self, rows):
+        """Min-max scaled criteria with every criterion treated as a benefit"""
+        if self._scaled is None:
+            self._scaled = self.engine.normalized(np.ones(len(self.engine.criteria), dtype=bool))
+        return self._scaled[rows]
+
+    def topsis_terms(self, rows):
+        """[centered ** 2, centered]: squared distances to any point are one product with these"""
+        if self._topsis is None:
+            matrix = self.engine.matrix
+            self.center = matrix.mean(axis=0) if len(matrix) else np.zeros(matrix.shape[1])
+            centered = matrix - self.center
+            self._topsis = np.hstack([centered ** 2, centered])
+        return self._topsis[rows]
+
+    def weighted_sum(self, weights, benefit, rows):
+        # A cost criterion scores 1 - scaled, so flip its weight and add it back as a constant
+        signed = np.where(benefit, weights, -weights)
+        constant = np.where(benefit, 0.0, weights).sum(axis=1)
+        return signed @ self.scaled(rows).T + constant[:, None]
+
+    def topsis(self, weights, benefit, rows):
+        # Matches ScoringEngine.topsis; sum_j (c_j * (x_j - p_j)) ** 2 expands into one product per block
+        terms = self.topsis_terms(rows)
+        engine = self.engine
+        safe_norm = np.where(engine.col_norm > 0, engine.col_norm, 1.0)
+        scale = (weights / safe_norm) ** 2
+        best = np.where(benefit, engine.col_max, engine.col_min) - self.center
+        worst = np.where(benefit, engine.col_min, engine.col_max) - self.center
+        coefficients = np.vstack([np.hstack([scale, -2 * scale * best]), np.hstack([scale, -2 * scale * worst])])
+        constants = np.concatenate([(scale * best ** 2).sum(axis=1), (scale * worst ** 2).sum(axis=1)])
+        squared = coefficients @ terms.T + constants[:, None]
+        distance_best, distance_worst = np.sqrt(np.maximum(squared, 0.0)).reshape(2, len(weights), -1)
+        total = distance_best + distance_worst
+        return np.divide(distance_worst, total, out=np.ones_like(total), where=total > 0)
+
+def _scenario_criteria(scenarios, engine):
+    criteria = list(engine.criteria) if engine is not None else []
+    for scenario in scenarios:
+        criteria.extend(c for c in scenario.get('weights') or {} if c not in criteria)
+    return criteria
+
+def _weight_vectors(scenario, criteria):
+    weights = np.zeros(len(criteria))
+    benefit = np.ones(len(criteria), dtype=bool)
+    directions = scenario.get('benefit') or {}
+    for criterion, weight in scenario['weights'].items():
+        weights[criteria.index(criterion)] = weight
+    for criterion, is_benefit in directions.items():
+        if criterion in criteria:
+            benefit[criteria.index(criterion)] = is_benefit
+    if (weights < 0).any():
+        raise ValueError(f"Criterion weights must be non-negative ({scenario.get('name', 'scenario')})")
+    total = weights.sum()
+    if total <= 0:
+        raise ValueError(f"Scenario '{scenario.get('name', 'scenario')}' needs at least one positive weight")
+    return weights / total, benefit
+
+def _top_k(keys, masks, k):
+    """Row positions of the k smallest keys per row of a block, among masked columns; ties by position"""
+    k = min(k, keys.shape[1])
+    kth = np.partition(keys, k - 1, axis=1)[:, k - 1]
+    candidates = (keys <= kth[:, None]) & masks
+    selected = []
+    for row, row_keys in zip(candidates, keys):
+        positions = np.flatnonzero(row)
+        order = np.lexsort((positions, row_keys[positions]))
+        selected.append(positions[order[:k]])
+    return selected
+
+@instrument()
+def run_scenarios(data, scenarios, model_scores=None, top_k=SCENARIO_TOP_K, filter_engine=None, scoring_engine=None,
+                  block_bytes=SWEEP_BLOCK_BYTES):
+    """Rank the same data under many what-if scenarios in batched passes.
+
+    Each scenario is a dict with optional 'name' and 'filter_conditions' (as built by the app),
+    plus 'weights' ({criterion: weight}), 'benefit' ({criterion: higher is better}, default
+    True) and 'method' (one of SCORING_METHODS, default 'topsis') for weighted scoring. A scenario
+    without weights ranks by model_scores. Filter conditions shared between scenarios are
+    evaluated once; scenarios are then processed in blocks that fit block_bytes, with their masks
+    stacked into a 2D array and their scores computed as one matrix product per block. Rankings
+    match rank_suppliers with top_k, ties broken by row position. Returns ScenarioResults.
+    """
+    engine = filter_engine if filter_engine is not None else FilterEngine(data)
+    n_rows = len(data)
+    criteria = _scenario_criteria(scenarios, scoring_engine)
+    if scoring_engine is None or list(scoring_engine.criteria) != criteria:
+        scoring_engine = ScoringEngine(data, criteria) if criteria else None
+    matrix = _CriteriaMatrix(scoring_engine) if scoring_engine is not None else None
+    if model_scores is not None:
+        model_scores = np.asarray(model_scores, dtype=np.float64)
+
+    names, plans = [], []
+    for i, scenario in enumerate(scenarios):
+        names.append(scenario.get('name') or f"Scenario {i + 1}")
+        if scenario.get('weights'):
+            method = scenario.get('method', 'topsis')
+            if method not in SCORING_METHODS:
+                raise ValueError(f"Unknown scoring method '{method}'. Choose from: {', '.join(SCORING_METHODS)}")
+            plans.append((method,) + _weight_vectors(scenario, criteria))
+        elif model_scores is None:
+            raise ValueError(f"Scenario '{names[-1]}' has no weights and no model scores were given")
+        else:
+            plans.append(('model', None, None))
+
+    condition_masks = {}
+
+    def scenario_mask(filter_conditions):
+        mask = np.ones(n_rows, dtype=bool)
+        for column, filter_info in (filter_conditions or {}).items():
+            key = (column, repr(sorted(filter_info.items())))
+            if key not in condition_masks:
+                condition_masks[key] = engine.condition_mask(column, filter_info)
+            if condition_masks[key] is not None:
+                mask &= condition_masks[key]
+        return mask
+
+    # Per scenario row: float64 scores plus the mask and candidate flags
+    block_size = max(1, block_bytes // max(1, n_rows * 10))
+    positions, scores, match_counts = [], [], []
+    for start in range(0, len(scenarios), block_size):
+        block = range(start, min(start + block_size, len(scenarios)))
+        masks = np.vstack([scenario_mask(scenarios[i].get('filter_conditions')) for i in block])
+        # Only rows that pass at least one scenario's filters in this block are scored
+        rows = np.flatnonzero(masks.any(axis=0))
+        masks = masks[:, rows]
+        block_scores = np.empty((len(block), len(rows)))
+        for method in ('weighted_sum', 'topsis'):
+            members = [j for j, i in enumerate(block) if plans[i][0] == method]
+            if members:
+                weights = np.vstack([plans[block[j]][1] for j in members])
+                benefit = np.vstack([plans[block[j]][2] for j in members])
+                block_scores[members] = getattr(matrix, method)(weights, benefit, rows)
+        for j, i in enumerate(block):
+            if plans[i][0] == 'model':
+                block_scores[j] = model_scores[rows]
+
+        # Sort keys as in rank_suppliers: descending score, missing scores last
+        keys = np.where(masks, -block_scores, np.inf)
+        keys[np.isnan(keys)] = np.inf
+        counts = masks.sum(axis=1)
+        selected = _top_k(keys, masks, top_k) if len(rows) else [np.zeros(0, dtype=np.int64)] * len(block)
+        for j, row_positions in enumerate(selected):
+            positions.append(rows[row_positions])
+            scores.append(block_scores[j, row_positions])
+            match_counts.append(int(counts[j]))
+    return ScenarioResults(data, names, positions, scores, np.array(match_counts, dtype=np.int64))
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+SCORING_METHODS = ['topsis', 'weighted_sum']
+
+class ScoringEngine:
+    """Weighted multi-criteria scoring over a fixed set of numeric criteria.
+
+    The criteria matrix (rows x criteria, missing values imputed with the column mean) and its
+    column statistics are built once; scoring with new weights or directions is pure matrix work.
+    """
+
+    def __init__(self, data, criteria):
+        non_numeric = [col for col in criteria if not pd.api.types.is_numeric_dtype(data[col])]
+        if non_numeric:
+            raise ValueError(f"Weighted scoring needs numeric criteria, got: {', '.join(non_numeric)}")
+        self.criteria = list(criteria)
+        matrix = data[self.criteria].to_numpy(dtype=np.float64, na_value=np.nan)
+        means = np.nanmean(matrix, axis=0) if len(matrix) else np.zeros(len(self.criteria))
+        means = np.where(np.isnan(means), 0.0, means)
+        missing = np.isnan(matrix)
+        if missing.any():
+            matrix[missing] = np.take(means, np.nonzero(missing)[1])
+        self.matrix = matrix
+        self.col_min = matrix.min(axis=0) if len(matrix) else np.zeros(len(self.criteria))
+        self.col_max = matrix.max(axis=0) if len(matrix) else np.zeros(len(self.criteria))
+        self.col_norm = np.sqrt(np.einsum('ij,ij->j', matrix, matrix))
+
+    def _weights(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (len(self.criteria),):
+            raise ValueError("Expected one weight per criterion")
+        if (weights < 0).any():
+            raise ValueError("Criterion weights must be non-negative")
+        total = weights.sum()
+        return weights / total if total > 0 else np.full(len(weights), 1.0 / len(weights))
+
+    def _benefit(self, benefit):
+        benefit = np.asarray(benefit, dtype=bool)
+        if benefit.shape != (len(self.criteria),):
+            raise ValueError("Expected one benefit/cost flag per criterion")
+        return benefit
+
+    def normalized(self, benefit, rows=None):
+        """Min-max normalized criterion scores in [0, 1], where 1 is always the best value.
+
+        rows limits the result to those row positions.
+        """
+        benefit = self._benefit(benefit)
+        span = self.col_max - self.col_min
+        safe_span = np.where(span > 0, span, 1.0)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        scaled = (matrix - self.col_min) / safe_span
+        scaled[:, span == 0] = 1.0
+        scaled[:, ~benefit] = 1.0 - scaled[:, ~benefit]
+        return scaled
+
+    def contributions(self, weights, benefit, rows=None):
+        """Weight times normalized value per criterion; rows sum to their weighted_sum score"""
+        return self.normalized(benefit, rows) * self._weights(weights)
+
+    def weighted_sum(self, weights, benefit):
+        """Weighted sum of min-max normalized criteria, in [0, 1]"""
+        return self.normalized(benefit) @ self._weights(weights)
+
+    def topsis(self, weights, benefit):
+        """TOPSIS closeness to the ideal solution, in [0, 1]"""
+        weights = self._weights(weights)
+        benefit = self._benefit(benefit)
+        safe_norm = np.where(self.col_norm > 0, self.col_norm, 1.0)
+        column_scale = weights / safe_norm
+        weighted = self.matrix * column_scale
+
+        best = np.where(benefit, self.col_max, self.col_min) * column_scale
+        worst = np.where(benefit, self.col_min, self.col_max) * column_scale
+        distance_best = np.sqrt(((weighted - best) ** 2).sum(axis=1))
+        distance_worst = np.sqrt(((weighted - worst) ** 2).sum(axis=1))
+        total = distance_best + distance_worst
+        return np.divide(distance_worst, total, out=np.ones_like(total), where=total > 0)
+
+    def score(self, weights, benefit, method='topsis'):
+        if method == 'topsis':
+            return self.topsis(weights, benefit)
+        if method == 'weighted_sum':
+            return self.weighted_sum(weights, benefit)
+        raise ValueError(f"Unknown scoring method '{method}'. Choose from: {', '.join(SCORING_METHODS)}")
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.attribution import explain_model_scores
+from core.incremental import IncrementalRanker
+
+IDENTIFIER_COLUMNS = ['Supplier_ID', 'Supplier_Name', 'Address']
+
+@pytest.mark.parametrize('labelled', [False, True])
+def test_identifier_columns_are_never_drivers(labelled):
+    rng = np.random.default_rng(0)
+    n = 400
+    data = pd.DataFrame({
+        'Supplier_ID': np.arange(n),
+        'Supplier_Name': [f'Supplier {i}' for i in range(n)],
+        'Address': [f'{i} Main Street' for i in rng.permutation(n)],
+        'Quality': rng.normal(7, 1, n),
+        'Cost': rng.normal(100, 20, n),
+        'Region': rng.choice(['North', 'South', 'East'], n),
+    })
+    if labelled:
+        data['Label'] = (data['Supplier_ID'] % 2 == 0).astype(int)
+
+    ranker = IncrementalRanker(data)
+    assert not set(IDENTIFIER_COLUMNS) & set(ranker.feature_names)
+
+    attribution = explain_model_scores(ranker, data.head(25))
+    drivers = ' '.join(attribution.top_drivers(n=len(ranker.feature_names)))
+    assert not any(column in drivers for column in IDENTIFIER_COLUMNS)
@@ -0,0 +1,14 @@
+from benchmarks.run_benchmarks import NOISE_FLOOR_SECONDS, compare_to_baseline
+
+def _results(**timings):
+    return {'results': {key: {'min': seconds} for key, seconds in timings.items()}}
+
+def test_compare_to_baseline_reports_every_shared_benchmark():
+    baseline = _results(rank=0.10, load=0.20, tiny=NOISE_FLOOR_SECONDS / 2)
+    current = _results(rank=0.14, load=0.21, tiny=NOISE_FLOOR_SECONDS, new=1.0)
+    comparisons = {c['benchmark']: c for c in compare_to_baseline(current, baseline, threshold=0.25)}
+
+    assert set(comparisons) == {'rank', 'load', 'tiny'}
+    assert comparisons['rank']['regression'] and comparisons['rank']['ratio'] == 1.4
+    assert not comparisons['load']['regression']
+    assert not comparisons['tiny']['regression']
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.column_stats import ColumnStatistics
+from core.filter_engine import FilterEngine
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    quality = rng.normal(7, 1, 400)
+    quality[::25] = np.nan
+    return pd.DataFrame({
+        'Quality': quality,
+        'Region': rng.choice(['North', 'South', 'East', None], 400),
+        'Certified': rng.choice([True, False], 400),
+        'Supplier_Name': [f"Supplier {i}" for i in range(400)],
+    })
+
+@pytest.mark.parametrize('column, filter_info', [
+    ('Quality', {'type': 'numeric', 'min': 6.5, 'max': 8.0}),
+    ('Quality', {'type': 'numeric', 'min': 7.0, 'max': None}),
+    ('Quality', {'type': 'numeric', 'min': None, 'max': None}),
+    ('Region', {'type': 'categorical', 'values': ['North', 'East']}),
+    ('Region', {'type': 'categorical', 'values': []}),
+    ('Certified', {'type': 'boolean', 'values': [True]}),
+    ('Certified', {'type': 'boolean', 'values': []}),
+    ('Supplier_Name', {'type': 'text', 'search': 'supplier 1'}),
+    ('Supplier_Name', {'type': 'text', 'search': ''}),
+])
+def test_match_count_agrees_with_filter_engine(data, column, filter_info):
+    engine = FilterEngine(data)
+    stats = ColumnStatistics(data, engine)
+    assert stats.match_count(column, filter_info) == engine.mask({column: filter_info}).sum()
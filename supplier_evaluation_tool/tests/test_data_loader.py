@@ -0,0 +1,43 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import data_loader
+from core.data_loader import load_data_chunked
+
+def make_csv(n=3000):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'Supplier_ID': np.arange(n),
+        'Quality': rng.integers(1, 10, n),
+        'Cost': rng.normal(100, 20, n).round(2),
+        'Region': rng.choice(['North', 'South', 'None', 'NA'], n),
+        'Notes': '',
+    })
+    # Only later rows bring decimals to an integer column and text to an empty one
+    frame.loc[n - 10:, 'Quality'] = 7.5
+    frame.loc[n - 5:, 'Notes'] = 'late delivery'
+    return frame.to_csv(index=False).encode()
+
+@pytest.mark.parametrize('engine', [None, 'pyarrow'])
+def test_chunked_load_matches_read_csv(engine, monkeypatch):
+    monkeypatch.setattr(data_loader, 'ARROW_BLOCK_SIZE', 16 << 10)
+    raw = make_csv()
+    expected = pd.read_csv(io.BytesIO(raw))
+    data, _ = load_data_chunked(io.BytesIO(raw), chunksize=500, engine=engine)
+
+    assert list(data.columns) == list(expected.columns)
+    assert data['Region'].isna().sum() == expected['Region'].isna().sum() > 0
+    for col in expected.columns:
+        pd.testing.assert_series_equal(data[col].astype(object), expected[col].astype(object))
+    assert data['Supplier_ID'].dtype.kind == 'i'
+    assert data['Quality'].dtype.kind == 'f'
+
+def test_concat_chunks_matches_pd_concat():
+    frame = pd.read_csv(io.BytesIO(make_csv()))
+    frame['Region'] = frame['Region'].astype(pd.CategoricalDtype(['North', 'South']))
+    chunks = [frame.iloc[i:i + 700].reset_index(drop=True) for i in range(0, len(frame), 700)]
+    expected = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(data_loader._concat_chunks(list(chunks)), expected)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data_source import DatasetSource
+from core.filter_engine import FilterEngine
+from core.model_handler import rank_suppliers
+
+def test_rank_without_top_k_returns_full_ranking(tmp_path):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'Supplier_ID': [f"S{i}" for i in range(500)],
+        'Quality': rng.normal(7, 1, 500).round(2),
+        'Region': rng.choice(['North', 'South'], 500),
+    })
+    path = tmp_path / 'suppliers.parquet'
+    data.to_parquet(path, index=False)
+    filters = {'Region': {'type': 'categorical', 'values': ['North']}}
+
+    ranked, error = rank_suppliers(DatasetSource(str(path)), filters, selected_criteria=['Quality'],
+                                   sort_directions=[False])
+
+    expected, _ = rank_suppliers(data, filters, selected_criteria=['Quality'], sort_directions=[False])
+    assert error is None
+    assert ranked['Supplier_ID'].tolist() == expected['Supplier_ID'].tolist()
+
+@pytest.mark.parametrize('search', ['on', 'n.n', 'late'])
+def test_text_filter_pushdown_matches_filter_engine(tmp_path, search):
+    rng = np.random.default_rng(1)
+    notes = rng.choice(['On time', 'Late delivery', 'nan bread', None], 400)
+    data = pd.DataFrame({'Supplier_ID': [f"S{i}" for i in range(400)], 'Notes': notes,
+                         'Quality': rng.normal(7, 1, 400)})
+    path = tmp_path / 'suppliers.parquet'
+    data.to_parquet(path, index=False)
+    filters = {'Notes': {'type': 'text', 'search': search}}
+
+    source = DatasetSource(str(path))
+    expected = FilterEngine(data).mask(filters)
+    assert source.count_rows(filters) == expected.sum()
+    # Missing notes never match, whether they are None or NaN in memory
+    assert FilterEngine(data.fillna(np.nan)).mask(filters).sum() == expected.sum()
+    assert not expected[data['Notes'].isna().to_numpy()].any()
+
+def test_rank_rejects_model_scores_for_a_dataset(tmp_path):
+    path = tmp_path / 'suppliers.parquet'
+    pd.DataFrame({'Quality': [1.0, 2.0]}).to_parquet(path, index=False)
+    ranked, error = rank_suppliers(DatasetSource(str(path)), {}, prediction_probs=np.array([0.2, 0.8]))
+    assert ranked is None
+    assert 'out-of-core' in error
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from core.deduplication import deduplicate_suppliers
+
+def test_merged_rows_average_every_numeric_measure():
+    data = pd.DataFrame({
+        'Supplier_ID': [101, 102, 200],
+        'Supplier_Name': ['Acme Industries Inc.', 'ACME Industries', 'Globex Corp'],
+        'Address': ['1 Main St', '1 Main Street', '9 Elm Rd'],
+        'Quality': [8, 9, 5],
+        'Cost': [100.0, 110.0, 90.0],
+        'Certified': [True, False, True],
+        'Label': [1, 0, 0],
+    })
+    merged, clusters = deduplicate_suppliers(data)
+
+    assert len(merged) == 2
+    acme = merged.iloc[0]
+    assert acme['Quality'] == 8.5
+    assert acme['Cost'] == 105.0
+    assert acme['Supplier_ID'] == 101
+    assert acme['Label'] == 1
+    assert bool(acme['Certified'])
+    assert acme['Duplicate_Count'] == 2
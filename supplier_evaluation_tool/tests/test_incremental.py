@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.incremental import IncrementalRanker
+
+def make_suppliers(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Quality': rng.normal(7, 1, n).round(1),
+        'Cost': rng.normal(100, 20, n).round(0),
+        'Region': rng.choice(['North', 'South', 'East'], n),
+        'Label': rng.integers(0, 2, n),
+    })
+
+def test_update_with_duplicate_rows_and_no_id_column():
+    data = make_suppliers()
+    data = pd.concat([data, data.iloc[:20]], ignore_index=True)
+    ranker = IncrementalRanker(data)
+    assert ranker.id_column is None
+    assert ranker.keys.is_unique
+
+    summary = ranker.update(data.iloc[:-5])
+    assert not summary['refit']
+    assert summary['removed'] == 5
+    assert summary['added'] == summary['changed'] == 0
+
+    summary = ranker.update(data)
+    assert not summary['refit']
+    assert summary['added'] == 5
+    np.testing.assert_allclose(ranker.prediction_probs, IncrementalRanker(data).prediction_probs)
+
+def test_concurrent_updates_leave_a_consistent_ranker():
+    data = make_suppliers(n=2000)
+    grown = pd.concat([data, make_suppliers(n=100, seed=1)], ignore_index=True)
+    ranker = IncrementalRanker(data)
+    errors = []
+
+    def work(version):
+        try:
+            for _ in range(5):
+                ranker.update(version)
+                ranker.transform(version.head(50))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(grown if i % 2 else data,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(ranker.keys) == len(ranker.hashes) == len(ranker.predictions) == len(ranker.prediction_probs)
+    ranker.update(grown)
+    assert len(ranker.prediction_probs) == len(grown)
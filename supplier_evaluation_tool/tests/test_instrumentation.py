@@ -0,0 +1,68 @@
+import threading
+
+from core.job_queue import JobQueue
+from utils.instrumentation import StageRecorder, current_recorder, instrument, recorder, use_recorder
+
+@instrument('double')
+def double(values):
+    return [v * 2 for v in values]
+
+def _in_session(stage_recorder, calls):
+    use_recorder(stage_recorder)
+    for _ in range(calls):
+        double([1, 2, 3])
+
+def test_stages_are_recorded_per_session():
+    first, second = StageRecorder(), StageRecorder()
+    threads = [threading.Thread(target=_in_session, args=(first, 2)),
+               threading.Thread(target=_in_session, args=(second, 3))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert first.totals['double']['calls'] == 2
+    assert second.totals['double']['calls'] == 3
+    assert current_recorder() is recorder
+
+def test_jobs_record_into_the_submitting_session():
+    session = StageRecorder()
+    queue = JobQueue(max_workers=1)
+
+    def submit():
+        use_recorder(session)
+        queue.submit('double', lambda job: double([1])).future.result()
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    thread.join()
+    queue.shutdown()
+    assert session.totals['double']['calls'] == 1
+
+@instrument('allocate')
+def allocate(barrier):
+    barrier.wait()
+    values = [bytes(1024) for _ in range(200)]
+    barrier.wait()
+    return len(values)
+
+def test_overlapping_stages_get_no_allocation_peak():
+    session = StageRecorder()
+    session.enable_memory_tracking(True)
+    try:
+        use_recorder(session)
+        allocate(threading.Barrier(1))
+        assert session.latest()['allocate']['peak_alloc_bytes'] > 0
+
+        session.clear()
+        barrier = threading.Barrier(2)
+        threads = [threading.Thread(target=lambda: (use_recorder(session), allocate(barrier))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        session.enable_memory_tracking(False)
+        use_recorder(None)
+    assert session.totals['allocate']['calls'] == 2
+    assert all(record['peak_alloc_bytes'] is None for record in session.records)
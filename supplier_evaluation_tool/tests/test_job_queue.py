@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+
+from core.job_queue import JobCancelled, JobQueue
+from utils import report_generator
+from utils.instrumentation import StageRecorder, instrument, use_recorder
+
+@instrument('shared_stage')
+def shared_stage(values):
+    return values
+
+def _wait_for(release):
+    def run(job):
+        while not release.wait(0.01):
+            job.update()
+        shared_stage([1, 2])
+        return 'done'
+    return run
+
+def test_shared_job_runs_until_every_subscriber_cancels():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    job = queue.submit('report', _wait_for(release), subscriber='first')
+    assert queue.submit('report', _wait_for(release), subscriber='second') is job
+
+    queue.cancel(job.id, subscriber='first')
+    assert not job.cancel_requested
+    queue.cancel(job.id, subscriber='second')
+    assert job.cancel_requested
+    job.future.result()
+    queue.shutdown()
+    assert job.status == 'cancelled'
+
+def test_shared_job_records_stages_for_every_subscriber():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    sessions = {'first': StageRecorder(), 'second': StageRecorder()}
+    jobs = []
+
+    def submit(session_id):
+        use_recorder(sessions[session_id])
+        jobs.append(queue.submit('report', _wait_for(release), subscriber=session_id))
+
+    for session_id in sessions:
+        thread = threading.Thread(target=submit, args=(session_id,))
+        thread.start()
+        thread.join()
+    release.set()
+    jobs[0].future.result()
+    queue.shutdown()
+    assert jobs[0] is jobs[1]
+    assert all(r.totals['shared_stage']['calls'] == 1 for r in sessions.values())
+
+class EndlessClient:
+    model_name = 'endless'
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    async def stream(self, prompt):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield 'more '
+        finally:
+            self.closed.set()
+
+def test_cancelled_report_stops_the_stream(monkeypatch):
+    client = EndlessClient()
+    monkeypatch.setattr(report_generator, '_llm_client', client)
+
+    def on_token(text):
+        raise JobCancelled('report')
+
+    ranked = pd.DataFrame({'Quality': [9, 8], 'Supplier_Score': [0.9, 0.8]})
+    with pytest.raises(JobCancelled):
+        report_generator.generate_supplier_report(ranked, ['Quality'], top_n=2, on_token=on_token)
+    assert client.closed.wait(2)
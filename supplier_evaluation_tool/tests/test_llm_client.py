@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from utils.llm_client import stream_with_retries
+
+class FlakyStream:
+    """Fails to start the first `failures` times, then streams chunks, optionally failing midway"""
+
+    def __init__(self, failures, fail_after=None):
+        self.failures = failures
+        self.fail_after = fail_after
+        self.attempts = 0
+
+    async def stream(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("connection reset")
+        for i, chunk in enumerate(['Top ', 'suppliers ', 'are...']):
+            if self.fail_after is not None and i == self.fail_after:
+                raise ConnectionError("stream cut")
+            yield chunk
+
+async def collect(stream, retries=3):
+    return [chunk async for chunk in stream_with_retries(stream, retries=retries, base_delay=0)]
+
+def test_stream_retries_until_the_first_chunk():
+    client = FlakyStream(failures=2)
+    assert asyncio.run(collect(client.stream)) == ['Top ', 'suppliers ', 'are...']
+    assert client.attempts == 3
+
+def test_stream_gives_up_after_the_retry_budget():
+    client = FlakyStream(failures=5)
+    with pytest.raises(ConnectionError):
+        asyncio.run(collect(client.stream, retries=2))
+    assert client.attempts == 3
+
+def test_stream_does_not_retry_after_chunks_were_sent():
+    client = FlakyStream(failures=0, fail_after=1)
+    with pytest.raises(ConnectionError):
+        asyncio.run(collect(client.stream))
+    assert client.attempts == 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.model_handler import rank_positions, rank_suppliers
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    quality = rng.integers(1, 10, 300).astype(float)
+    quality[::17] = np.nan
+    return pd.DataFrame({
+        'Quality': quality,
+        'Cost': rng.integers(50, 60, 300),
+        'Region': rng.choice(['North', 'South', 'East'], 300),
+    })
+
+@pytest.mark.parametrize('top_k', [None, 20])
+def test_rank_suppliers_matches_stable_sort(data, top_k):
+    filters = {'Region': {'type': 'categorical', 'values': ['North', 'East']}}
+    ranked, error = rank_suppliers(data, filters, selected_criteria=['Quality', 'Cost'],
+                                   sort_directions=[False, True], top_k=top_k)
+
+    expected = data[data['Region'].isin(['North', 'East'])].sort_values(['Quality', 'Cost'], ascending=[False, True],
+                                                                       kind='stable')
+    assert error is None
+    assert list(ranked.index) == list(expected.index[:top_k])
+
+def test_rank_suppliers_takes_rank_positions(data):
+    scores = np.random.default_rng(1).random(len(data)).round(1)
+    positions, ranked_scores, _ = rank_positions(data, {}, prediction_probs=scores, top_k=30)
+    ranked, _ = rank_suppliers(data, {}, prediction_probs=scores, top_k=30)
+    assert list(ranked.index) == list(data.index[positions])
+    np.testing.assert_array_equal(ranked['Supplier_Score'], ranked_scores)
+
+def test_cluster_score_ranks_cheap_high_quality_supplier_first():
+    rng = np.random.default_rng(2)
+    groups = [(50, 9.0, 5), (150, 9.5, 30), (200, 5.0, 40)]
+    frames = [pd.DataFrame({'Cost': rng.normal(cost, 5, 100), 'Quality': rng.normal(quality, 0.2, 100),
+                            'Lead_Time': rng.normal(lead, 2, 100)}) for cost, quality, lead in groups]
+    data = pd.concat(frames, ignore_index=True)
+    # Identifier codes grow towards the expensive suppliers and must not count as a benefit
+    data.insert(0, 'Supplier_ID', np.arange(len(data)) * 1000)
+    data['Supplier_Name'] = [f'Supplier {i}' for i in range(len(data))]
+
+    from core.pipeline_cache import preprocess_and_train
+    entry = preprocess_and_train(data)
+    top = data.iloc[np.argsort(-entry['prediction_probs'], kind='stable')[:10]]
+    assert (top['Cost'] < 100).all() and (top['Quality'] > 8).all()
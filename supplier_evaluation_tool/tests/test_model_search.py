@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from core import model_search
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_failing_candidate_does_not_abort_search(monkeypatch, n_jobs):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=200) > 0).astype(int)
+    monkeypatch.setattr(model_search, 'candidate_grid', lambda *args: [
+        ('decision_tree', {'max_depth': -1}),
+        ('decision_tree', {'max_depth': 3}),
+    ])
+
+    leaderboard = model_search.search_models(X, y, n_folds=3, time_budget=60, n_jobs=n_jobs)
+
+    assert [r['status'] for r in leaderboard] == ['ok', 'error']
+    assert leaderboard[0]['params'] == {'max_depth': 3}
+    assert leaderboard[1]['score'] is None and leaderboard[1]['error']
@@ -0,0 +1,23 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ranking_export import RankingExport
+
+def test_excel_export_matches_ranked_rows():
+    pytest.importorskip('openpyxl')
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'Supplier_ID': [f"S{i}" for i in range(250)],
+        'Quality': rng.normal(7, 1, 250).round(2),
+        'Region': pd.Categorical(rng.choice(['North', 'South', None], 250)),
+    })
+    scores = rng.random(250)
+    positions = np.argsort(-scores, kind='stable')
+    export = RankingExport(data, positions, scores[positions], chunk_rows=64)
+
+    exported = pd.read_excel(io.BytesIO(export.to_bytes('xlsx')), sheet_name='Rankings')
+    expected = pd.concat(export.iter_chunks(), ignore_index=True)
+    pd.testing.assert_frame_equal(exported, expected.astype({'Region': object}))
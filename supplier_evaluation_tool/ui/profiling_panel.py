@@ -0,0 +1,39 @@
+import pandas as pd
+import streamlit as st
+from utils.instrumentation import current_recorder
+
+def render_profiling_panel():
+    with st.expander("⏱️ Performance Profile"):
+        recorder = current_recorder()
+        track_memory = st.checkbox(
+            "Track allocation peaks (tracemalloc)",
+            value=recorder.track_memory,
+            help="Records peak Python allocations per stage. Slows allocation-heavy stages while enabled. "
+                 "Stages that overlap work in another session show no peak."
+        )
+        if track_memory != recorder.track_memory:
+            recorder.enable_memory_tracking(track_memory)
+
+        latest = recorder.latest()
+        if not latest:
+            st.markdown("<p class='info-text'>No pipeline stages recorded yet.</p>", unsafe_allow_html=True)
+        else:
+            table = pd.DataFrame(latest.values())[['stage', 'seconds', 'rows', 'peak_alloc_bytes', 'max_rss_bytes', 'ok']]
+            table['peak_alloc_mb'] = (pd.to_numeric(table.pop('peak_alloc_bytes')) / 2**20).round(1)
+            table['max_rss_mb'] = (pd.to_numeric(table.pop('max_rss_bytes')) / 2**20).round(1)
+            st.dataframe(table.sort_values('seconds', ascending=False), use_container_width=True)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("Export JSON", recorder.to_json(), file_name="pipeline_profile.json", mime="application/json")
+        with col2:
+            st.download_button("Export Prometheus", recorder.to_prometheus(), file_name="pipeline_metrics.prom", mime="text/plain")
+        with col3:
+            if st.button("Reset"):
+                recorder.clear()
+
+        profile = st.session_state.get('cprofile_result')
+        if profile is not None:
+            st.markdown("<p class='info-text'><b>cProfile of the last profiled run:</b></p>", unsafe_allow_html=True)
+            st.code(profile.stats_text)
+            st.download_button("Download .prof", profile.prof_bytes, file_name="process_and_rank.prof")
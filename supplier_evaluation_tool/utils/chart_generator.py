@@ -1,113 +1,216 @@
-import matplotlib.pyplot as plt
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-def generate_chart(data, selected_criteria=None, top_n=10):
-    """Generate a comparison chart of the top N suppliers"""
-    data_to_plot = data.head(top_n).copy()
-    
-    # Find an ID column to use for labels
-    id_columns = ['Supplier_ID', 'SupplierID', 'ID', 'supplier_id']
-    id_col = None
-    for col in id_columns:
-        if col in data_to_plot.columns:
-            id_col = col
-            break
-    
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from core.data_preprocessor import ID_COLUMNS
+from utils.instrumentation import instrument
+
+DEFAULT_CHART_DPI = 200
+CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+EXCLUDED_PLOT_COLUMNS = ['Supplier_Score', 'index', 'Label']
+
+class ChartCache:
+    """LRU cache of rendered chart PNG bytes, bounded by total size"""
+
+    def __init__(self, max_bytes=CHART_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            if len(png) > self.max_bytes:
+                return
+            self._entries[key] = png
+            self._size += len(png)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+_chart_cache = ChartCache()
+
+def _new_figure(figsize=(12, 6)):
+    """Create a figure on its own Agg canvas, outside pyplot's global figure registry"""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+def _finish_axes(fig, ax, x_positions, labels, title, xlabel='Suppliers', ylabel=None):
+    ax.set_title(title, fontsize=14, pad=20)
+    ax.set_xlabel(xlabel, fontsize=12, labelpad=10)
+    if ylabel:
+        ax.set_ylabel(ylabel, fontsize=12, labelpad=10)
+    ax.set_xticks(x_positions)
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=10)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.tight_layout(pad=3.0)
+
+def _short_label(label):
+    label = str(label)
+    return label[:10] + '...' if len(label) > 10 else label
+
+def _supplier_labels(data_to_plot):
+    id_col = next((col for col in ID_COLUMNS if col in data_to_plot.columns), None)
+
     if id_col:
         labels = data_to_plot[id_col].astype(str).tolist()
     else:
         labels = [f"Supplier {i+1}" for i in range(len(data_to_plot))]
-    
-    # Truncate long labels
-    labels = [str(label)[:10] + '...' if len(str(label)) > 10 else str(label) for label in labels]
-    
-    x_positions = list(range(len(labels)))
-    
+
+    return [_short_label(label) for label in labels]
+
+def _plot_columns(data_to_plot):
+    numeric_cols = data_to_plot.select_dtypes(include=['number']).columns.tolist()
+    return [col for col in numeric_cols if col not in EXCLUDED_PLOT_COLUMNS]
+
+@instrument()
+def generate_chart(data, selected_criteria=None, top_n=10):
+    """Generate a comparison chart of the top N suppliers"""
+    data_to_plot = data.head(top_n)
+    labels = _supplier_labels(data_to_plot)
+    x_positions = np.arange(len(labels))
+
     if selected_criteria and len(selected_criteria) > 0:
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
+        fig, ax = _new_figure()
+
         # Filter criteria to only include numeric columns present in the data
-        valid_criteria = [c for c in selected_criteria if c in data_to_plot.columns and 
+        valid_criteria = [c for c in selected_criteria if c in data_to_plot.columns and
                          pd.api.types.is_numeric_dtype(data_to_plot[c])]
-        
+
         if not valid_criteria:
             # If no valid numeric criteria, find some numeric columns to plot
-            numeric_cols = data_to_plot.select_dtypes(include=['int64', 'float64']).columns.tolist()
-            cols_to_exclude = ['Supplier_Score', 'index', 'Label']
-            valid_criteria = [col for col in numeric_cols if col not in cols_to_exclude][:3]
-        
+            valid_criteria = _plot_columns(data_to_plot)[:3]
+
         bar_width = 0.8 / len(valid_criteria) if len(valid_criteria) > 0 else 0.8
-        
+
         for i, criterion in enumerate(valid_criteria):
-            values = data_to_plot[criterion].values
             offset = i * bar_width - (len(valid_criteria) - 1) * bar_width / 2
-            bar_positions = [pos + offset for pos in x_positions]
-            ax.bar(bar_positions, values, width=bar_width, label=criterion)
-        
-        plt.title('Supplier Comparison Based on Selected Criteria', fontsize=14, pad=20)
-        plt.xlabel('Suppliers', fontsize=12, labelpad=10)
-        plt.ylabel('Value', fontsize=12, labelpad=10)
-        plt.legend(fontsize=10, loc='best')
-        plt.xticks(x_positions, labels, rotation=45, ha='right', fontsize=10)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        plt.tight_layout(pad=3.0)
+            ax.bar(x_positions + offset, data_to_plot[criterion].to_numpy(), width=bar_width, label=criterion)
+
+        if valid_criteria:
+            ax.legend(fontsize=10, loc='best')
+        _finish_axes(fig, ax, x_positions, labels, 'Supplier Comparison Based on Selected Criteria', ylabel='Value')
         return fig
-    
-    else:
-        try:
-            if 'Supplier_Score' in data_to_plot.columns:
-                fig, ax = plt.subplots(figsize=(12, 6))
-                values = data_to_plot['Supplier_Score'].values
-                ax.bar(x_positions, values, color='cornflowerblue')
-                plt.title('Supplier Comparison: Model Score', fontsize=14, pad=20)
-                plt.xlabel('Suppliers', fontsize=12, labelpad=10)
-                plt.ylabel('Score', fontsize=12, labelpad=10)
-                plt.xticks(x_positions, labels, rotation=45, ha='right', fontsize=10)
-                plt.grid(axis='y', linestyle='--', alpha=0.7)
-                plt.tight_layout(pad=3.0)
-                return fig
-            
-            numeric_cols = data_to_plot.select_dtypes(include=['int64', 'float64']).columns.tolist()
-            cols_to_exclude = ['Supplier_Score', 'index', 'Label']
-            plot_cols = [col for col in numeric_cols if col not in cols_to_exclude]
-            
-            if not plot_cols:
-                plot_cols = [col for col in data_to_plot.columns if col not in cols_to_exclude]
-            
-            if len(plot_cols) > 0:
-                best_chart_col = plot_cols[0]
-                
-                if len(plot_cols) > 1:
-                    best_variance = data_to_plot[plot_cols[0]].var()
-                    for col in plot_cols[1:]:
-                        if data_to_plot[col].var() > best_variance:
-                            best_variance = data_to_plot[col].var()
-                            best_chart_col = col
-                
-                fig, ax = plt.subplots(figsize=(12, 6))
-                values = data_to_plot[best_chart_col].values
-                ax.bar(x_positions, values, color='cornflowerblue')
-                plt.title(f'Supplier Comparison: {best_chart_col}', fontsize=14, pad=20)
-                plt.xlabel('Suppliers', fontsize=12, labelpad=10)
-                plt.ylabel(best_chart_col, fontsize=12, labelpad=10)
-                plt.xticks(x_positions, labels, rotation=45, ha='right', fontsize=10)
-                plt.grid(axis='y', linestyle='--', alpha=0.7)
-                plt.tight_layout(pad=3.0)
-                return fig
-            
-            else:
-                fig, ax = plt.subplots(figsize=(12, 6))
-                ax.bar(x_positions, [1] * len(x_positions))
-                plt.title('Supplier Comparison', fontsize=14)
-                plt.xlabel('Suppliers', fontsize=12)
-                plt.xticks(x_positions, labels, rotation=45)
-                plt.tight_layout()
-                return fig
-        
-        except Exception as e:
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(x_positions, [1] * len(x_positions))
-            plt.title('Supplier Comparison (Error in data processing)', fontsize=14)
-            plt.xlabel('Suppliers', fontsize=12)
-            plt.xticks(x_positions, labels, rotation=45)
-            plt.tight_layout()
-            return fig
\ No newline at end of file
+
+    try:
+        if 'Supplier_Score' in data_to_plot.columns:
+            fig, ax = _new_figure()
+            ax.bar(x_positions, data_to_plot['Supplier_Score'].to_numpy(), color='cornflowerblue')
+            _finish_axes(fig, ax, x_positions, labels, 'Supplier Comparison: Model Score', ylabel='Score')
+            return fig
+
+        plot_cols = _plot_columns(data_to_plot)
+        if plot_cols:
+            # Plot the column that varies most across the suppliers shown
+            best_chart_col = data_to_plot[plot_cols].var().fillna(-np.inf).idxmax()
+
+            fig, ax = _new_figure()
+            ax.bar(x_positions, data_to_plot[best_chart_col].to_numpy(), color='cornflowerblue')
+            _finish_axes(fig, ax, x_positions, labels, f'Supplier Comparison: {best_chart_col}', ylabel=best_chart_col)
+            return fig
+
+        fig, ax = _new_figure()
+        ax.bar(x_positions, np.ones(len(x_positions)))
+        _finish_axes(fig, ax, x_positions, labels, 'Supplier Comparison')
+        return fig
+
+    except Exception as e:
+        fig, ax = _new_figure()
+        ax.bar(x_positions, np.ones(len(x_positions)))
+        _finish_axes(fig, ax, x_positions, labels, 'Supplier Comparison (Error in data processing)')
+        return fig
+
+def generate_distribution_chart(values, top_k=10, bins=50, label='Supplier_Score', higher_is_better=True):
+    """Chart the full distribution of a ranking column for any number of suppliers.
+
+    Values are binned with np.histogram, so drawing cost depends on bins, not on row count.
+    The cutoff for the top_k suppliers is marked on the histogram.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    fig, ax = _new_figure()
+    if len(values) == 0:
+        ax.set_title(f'Distribution of {label} (no values)', fontsize=14, pad=20)
+        return fig
+
+    counts, edges = np.histogram(values, bins=bins)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='cornflowerblue', edgecolor='white')
+
+    if 0 < top_k < len(values):
+        kth = len(values) - top_k if higher_is_better else top_k - 1
+        cutoff = np.partition(values, kth)[kth]
+        ax.axvline(cutoff, color='darkorange', linestyle='--', linewidth=2, label=f'Top {top_k} cutoff ({cutoff:.3g})')
+        ax.legend(fontsize=10, loc='best')
+
+    ax.set_title(f'Distribution of {label} across {len(values):,} suppliers', fontsize=14, pad=20)
+    ax.set_xlabel(label, fontsize=12, labelpad=10)
+    ax.set_ylabel('Suppliers', fontsize=12, labelpad=10)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.tight_layout(pad=3.0)
+    return fig
+
+def generate_attribution_chart(contributions, labels=None, top_n=10, max_features=6):
+    """Stacked bars of each supplier's per-feature score contributions.
+
+    contributions is a suppliers x features DataFrame such as ScoreAttribution.contributions.
+    The max_features features with the largest mean absolute contribution are drawn; the rest
+    are summed into 'Other'. Positive and negative contributions stack away from zero.
+    """
+    frame = contributions.head(top_n)
+    labels = [_short_label(label) for label in (list(labels)[:top_n] if labels is not None else
+                                                 [f"Supplier {i+1}" for i in range(len(frame))])]
+    ranked_features = frame.abs().mean().sort_values(ascending=False).index
+    shown = frame[ranked_features[:max_features]]
+    if len(ranked_features) > max_features:
+        shown = shown.assign(Other=frame[ranked_features[max_features:]].sum(axis=1))
+
+    fig, ax = _new_figure()
+    x_positions = np.arange(len(frame))
+    positive_base = np.zeros(len(frame))
+    negative_base = np.zeros(len(frame))
+    for col in shown.columns:
+        values = shown[col].to_numpy(dtype=np.float64)
+        base = np.where(values >= 0, positive_base, negative_base)
+        ax.bar(x_positions, values, bottom=base, label=str(col))
+        positive_base += np.clip(values, 0, None)
+        negative_base += np.clip(values, None, 0)
+    ax.axhline(0, color='black', linewidth=0.8)
+    ax.legend(fontsize=10, loc='upper left', bbox_to_anchor=(1.01, 1))
+    _finish_axes(fig, ax, x_positions, labels, 'What Drives Each Supplier\'s Score', ylabel='Contribution to score')
+    return fig
+
+def render_chart_png(chart_fig, dpi=DEFAULT_CHART_DPI):
+    """Render a matplotlib figure to PNG bytes in memory"""
+    png_buffer = io.BytesIO()
+    chart_fig.savefig(png_buffer, format='png', dpi=dpi, bbox_inches='tight', facecolor='white')
+    return png_buffer.getvalue()
+
+def generate_chart_png(data, selected_criteria=None, top_n=10, dpi=DEFAULT_CHART_DPI, cache=_chart_cache):
+    """PNG bytes of generate_chart, cached by the content of the plotted rows, criteria and dpi"""
+    data_to_plot = data.head(top_n)
+    hasher = hashlib.sha1()
+    hasher.update(repr((list(data_to_plot.columns), selected_criteria, top_n, dpi)).encode())
+    hasher.update(pd.util.hash_pandas_object(data_to_plot, index=False).values.tobytes())
+    key = hasher.hexdigest()
+
+    png = cache.get(key) if cache is not None else None
+    if png is None:
+        png = render_chart_png(generate_chart(data_to_plot, selected_criteria, top_n), dpi)
+        if cache is not None:
+            cache.put(key, png)
+    return png
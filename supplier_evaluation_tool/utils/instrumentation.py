@@ -0,0 +1,222 @@
+import cProfile
+import contextvars
+import functools
+import io
+import json
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MAX_RECORDS = 500
+
+class StageRecorder:
+    """Record of pipeline stage timings, allocation peaks and row counts.
+
+    Stages are recorded into the recorder made current with use_recorder (the app keeps one per
+    session), or into the process-wide recorder otherwise.
+    """
+
+    _memory_trackers = set()
+    _trackers_lock = threading.Lock()
+
+    def __init__(self, max_records=MAX_RECORDS):
+        self.records = deque(maxlen=max_records)
+        self.totals = {}
+        self.track_memory = False
+        self._lock = threading.Lock()
+
+    def enable_memory_tracking(self, enabled=True):
+        """Turn tracemalloc peak tracking on or off; it slows allocation-heavy code while on.
+
+        tracemalloc is process-wide, so it keeps running while any recorder still tracks memory.
+        """
+        self.track_memory = enabled
+        with StageRecorder._trackers_lock:
+            if enabled:
+                StageRecorder._memory_trackers.add(id(self))
+            else:
+                StageRecorder._memory_trackers.discard(id(self))
+            if StageRecorder._memory_trackers and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif not StageRecorder._memory_trackers and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0, 'errors': 0})
+            totals['calls'] += 1
+            totals['seconds'] += record['seconds']
+            totals['errors'] += 0 if record['ok'] else 1
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self.totals.clear()
+
+    def latest(self):
+        """Most recent record per stage"""
+        with self._lock:
+            latest = {}
+            for record in self.records:
+                latest[record['stage']] = record
+            return latest
+
+    def to_json(self):
+        with self._lock:
+            payload = {'records': list(self.records), 'totals': dict(self.totals), 'max_rss_bytes': max_rss_bytes()}
+        return json.dumps(payload, indent=2, default=str)
+
+    def to_prometheus(self, prefix='supplier'):
+        """Metrics in the Prometheus text exposition format"""
+        latest = self.latest()
+        with self._lock:
+            totals = dict(self.totals)
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            for stage, value in samples:
+                lines.append(f'{prefix}_{name}{{stage="{stage}"}} {value}')
+
+        metric('stage_calls_total', 'counter', "Calls per pipeline stage",
+               [(stage, t['calls']) for stage, t in totals.items()])
+        metric('stage_errors_total', 'counter', "Failed calls per pipeline stage",
+               [(stage, t['errors']) for stage, t in totals.items()])
+        metric('stage_duration_seconds_total', 'counter', "Total wall time per pipeline stage",
+               [(stage, round(t['seconds'], 6)) for stage, t in totals.items()])
+        metric('stage_last_duration_seconds', 'gauge', "Wall time of the latest call per stage",
+               [(stage, r['seconds']) for stage, r in latest.items()])
+        metric('stage_last_rows', 'gauge', "Rows handled by the latest call per stage",
+               [(stage, r['rows']) for stage, r in latest.items() if r['rows'] is not None])
+        metric('stage_last_peak_alloc_bytes', 'gauge', "Peak traced allocation of the latest call per stage",
+               [(stage, r['peak_alloc_bytes']) for stage, r in latest.items() if r['peak_alloc_bytes'] is not None])
+        rss = max_rss_bytes()
+        if rss is not None:
+            lines.append(f"# HELP {prefix}_process_max_rss_bytes Peak resident set size of the process")
+            lines.append(f"# TYPE {prefix}_process_max_rss_bytes gauge")
+            lines.append(f"{prefix}_process_max_rss_bytes {rss}")
+        return '\n'.join(lines) + '\n'
+
+recorder = StageRecorder()
+_current_recorder = contextvars.ContextVar('stage_recorder', default=None)
+# Stages running while tracemalloc traces; its peak is process-wide, so a stage that overlaps
+# one in another thread cannot tell its own peak apart
+_traced_stages = {}
+_traced_lock = threading.Lock()
+
+def use_recorder(stage_recorder):
+    """Record stages of the current thread (and of jobs it submits) into stage_recorder"""
+    _current_recorder.set(stage_recorder)
+
+def current_recorder():
+    stage_recorder = _current_recorder.get()
+    return stage_recorder if stage_recorder is not None else recorder
+
+def max_rss_bytes():
+    """Peak RSS of this process, or None where the resource module is unavailable"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+def _count_rows(value):
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    return None
+
+@contextmanager
+def stage(name, rows=None):
+    """Record wall time, traced allocation peak and peak RSS for the enclosed block.
+
+    Yields the record dict, so the block can fill in 'rows' once it knows them. Allocation peaks
+    of nested stages are reset by the inner stage, so the outer peak only covers what follows it.
+    tracemalloc's peak is process-wide, so a stage that overlaps a stage of another thread gets
+    no peak (None) rather than one mixed with the other thread's allocations.
+    """
+    record = {'stage': name, 'started_at': time.time(), 'rows': rows, 'ok': True,
+              'seconds': None, 'peak_alloc_bytes': None, 'max_rss_bytes': None}
+    stage_recorder = current_recorder()
+    traced = tracemalloc.is_tracing()
+    tracing = stage_recorder.track_memory and traced
+    if traced:
+        state = {'thread': threading.get_ident(), 'overlapped': False}
+        with _traced_lock:
+            for other in _traced_stages.values():
+                if other['thread'] != state['thread']:
+                    other['overlapped'] = state['overlapped'] = True
+            _traced_stages[id(state)] = state
+    if tracing:
+        start_alloc = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record['ok'] = False
+        raise
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 6)
+        if traced:
+            with _traced_lock:
+                _traced_stages.pop(id(state), None)
+        if tracing and not state['overlapped']:
+            record['peak_alloc_bytes'] = max(tracemalloc.get_traced_memory()[1] - start_alloc, 0)
+        record['max_rss_bytes'] = max_rss_bytes()
+        stage_recorder.add(record)
+
+def instrument(name=None):
+    """Decorator recording every call of a function as a stage named after it.
+
+    Rows are taken from the first argument with a shape (DataFrame or array), else from the result.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, rows=_count_rows(args[0]) if args else None) as record:
+                result = func(*args, **kwargs)
+                if record['rows'] is None:
+                    record['rows'] = _count_rows(result)
+                return result
+        return wrapper
+    return decorator
+
+class ProfileRun:
+    """Result of profile_run: printable stats and the raw .prof bytes for snakeviz/pstats"""
+
+    def __init__(self):
+        self.stats_text = ''
+        self.prof_bytes = b''
+
+@contextmanager
+def profile_run(top=30, sort_by='cumulative'):
+    """Profile the enclosed block with cProfile, entirely in memory"""
+    result = ProfileRun()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        profiler.create_stats()
+        result.prof_bytes = marshal.dumps(profiler.stats)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats(sort_by).print_stats(top)
+        result.stats_text = text.getvalue()
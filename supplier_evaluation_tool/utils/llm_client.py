@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+DEFAULT_MODEL_NAME = 'gemini-1.5-flash'
+STUB_URL_ENV = 'SUPPLIER_LLM_URL'
+
+class ResponseCache:
+    """Thread-safe LLM response cache keyed by a hash of model and prompt, with TTL and size eviction"""
+
+    def __init__(self, max_entries=128, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name, prompt):
+        return hashlib.sha256(f"{model_name}\n{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, text = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class GeminiClient:
+    """One reusable Gemini model handle; genai is configured on first use"""
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, api_key=None):
+        self.model_name = model_name
+        self._api_key = api_key
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as genai
+
+            api_key = self._api_key
+            if api_key is None:
+                from config.secrets import GEMINI_API_KEY
+                api_key = GEMINI_API_KEY
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt):
+        response = await self._get_model().generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt):
+        response = await self._get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+class StubLLMClient:
+    """Client for the local stub server in utils/llm_stub_server.py, speaking newline-delimited JSON"""
+
+    def __init__(self, base_url, model_name='stub'):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 80
+        self.model_name = model_name
+
+    async def _request(self, prompt, stream):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps({'prompt': prompt, 'stream': stream}).encode('utf-8')
+        writer.write(
+            b"POST /generate HTTP/1.0\r\n"
+            + f"Host: {self.host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        if status != 200:
+            writer.close()
+            raise RuntimeError(f"Stub LLM server returned HTTP {status}")
+        return reader, writer
+
+    async def generate(self, prompt):
+        reader, writer = await self._request(prompt, stream=False)
+        try:
+            return json.loads(await reader.read())['text']
+        finally:
+            writer.close()
+
+    async def stream(self, prompt):
+        reader, writer = await self._request(prompt, stream=True)
+        try:
+            async for line in reader:
+                if line.strip():
+                    yield json.loads(line)['text']
+        finally:
+            writer.close()
+
+def create_llm_client():
+    """Use the stub server when SUPPLIER_LLM_URL is set, Gemini otherwise"""
+    stub_url = os.environ.get(STUB_URL_ENV)
+    if stub_url:
+        return StubLLMClient(stub_url)
+    return GeminiClient()
+
+def _backoff_delay(attempt, base_delay, max_delay):
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+async def with_retries(make_call, retries=3, base_delay=1.0, max_delay=16.0):
+    """Await make_call(), retrying failures with exponential backoff and jitter"""
+    for attempt in range(retries + 1):
+        try:
+            return await make_call()
+        except Exception:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(_backoff_delay(attempt, base_delay, max_delay))
+
+async def stream_with_retries(make_stream, retries=3, base_delay=1.0, max_delay=16.0):
+    """Iterate make_stream(), retrying like with_retries until the first chunk arrives.
+
+    Failures after that propagate: chunks already passed on cannot be taken back.
+    """
+    for attempt in range(retries + 1):
+        stream = make_stream()
+        try:
+            first = await stream.__anext__()
+            break
+        except StopAsyncIteration:
+            return
+        except Exception:
+            if hasattr(stream, 'aclose'):
+                await stream.aclose()
+            if attempt == retries:
+                raise
+            await asyncio.sleep(_backoff_delay(attempt, base_delay, max_delay))
+    yield first
+    async for chunk in stream:
+        yield chunk
+
+class BackgroundLoop:
+    """A single long-lived event loop thread, so async clients survive across Streamlit reruns"""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='llm-event-loop', daemon=True).start()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block the caller until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    def iterate(self, async_iterable):
+        """Consume an async iterable on the loop, yielding its items in the calling thread"""
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    items.put(item)
+            except Exception as e:
+                items.put(e)
+            finally:
+                items.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._ensure_loop())
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # A consumer that stops early (a cancelled job) also stops the request on the loop
+            future.cancel()
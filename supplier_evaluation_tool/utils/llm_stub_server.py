@@ -0,0 +1,71 @@
+"""Local stand-in for the Gemini API, used to measure report latency without real calls.
+
+Run with `python -m utils.llm_stub_server --port 8765` and start the app with
+SUPPLIER_LLM_URL=http://127.0.0.1:8765 so utils.llm_client talks to this server instead.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_RESPONSE = """## Comparison Table
+| Supplier | Quality | Delivery | Cost | Score |
+|---|---|---|---|---|
+| Supplier 1 | 5/5 | 4/5 | 3/5 | 4.0 |
+| Supplier 2 | 4/5 | 4/5 | 4/5 | 4.0 |
+| Supplier 3 | 3/5 | 5/5 | 4/5 | 4.0 |
+
+## Final Recommendation
+Supplier 1 offers the best balance of quality and reliability."""
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.0'
+    latency = 0.5
+    chunk_count = 10
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson' if payload.get('stream') else 'application/json')
+        self.end_headers()
+
+        if not payload.get('stream'):
+            self.wfile.write(json.dumps({'text': STUB_RESPONSE}).encode('utf-8'))
+            return
+        step = max(1, len(STUB_RESPONSE) // self.chunk_count)
+        for start in range(0, len(STUB_RESPONSE), step):
+            self.wfile.write(json.dumps({'text': STUB_RESPONSE[start:start + step]}).encode('utf-8') + b"\n")
+            self.wfile.flush()
+            time.sleep(self.latency / self.chunk_count)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.5, chunk_count=10):
+    """Start the stub server on a daemon thread and return it; server.server_address has the bound port"""
+    handler = type('ConfiguredStubLLMHandler', (StubLLMHandler,), {'latency': latency, 'chunk_count': chunk_count})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub LLM server for supplier report latency testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument('--chunks', type=int, default=10, help="Number of streamed chunks per response")
+    args = parser.parse_args()
+
+    handler = type('ConfiguredStubLLMHandler', (StubLLMHandler,), {'latency': args.latency, 'chunk_count': args.chunks})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Stub LLM server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
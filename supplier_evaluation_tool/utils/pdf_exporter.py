@@ -1,56 +1,105 @@
 from fpdf import FPDF
-import os
+import hashlib
 import io
-import matplotlib.pyplot as plt
+import zlib
+from PIL import Image
+from utils.chart_generator import DEFAULT_CHART_DPI, render_chart_png
 
-def create_pdf(text_content, selected_criteria, chart_fig=None):
+def _register_png(pdf, png_bytes):
+    """Add a PNG to the PDF's image table without a file on disk and return its image name.
+
+    FPDF 1.7 only parses images from paths, but it skips parsing for names already in
+    pdf.images, so the decoded RGB pixels are registered there directly.
+    """
+    name = f"chart-{hashlib.sha1(png_bytes).hexdigest()}.png"
+    if name not in pdf.images:
+        with Image.open(io.BytesIO(png_bytes)) as image:
+            rgb = image.convert('RGB')
+            width, height = rgb.size
+            pixels = rgb.tobytes()
+        pdf.images[name] = {
+            'w': width,
+            'h': height,
+            'cs': 'DeviceRGB',
+            'bpc': 8,
+            'f': 'FlateDecode',
+            'data': zlib.compress(pixels),
+            'i': len(pdf.images) + 1,
+        }
+    return name
+
+def _add_report_pages(pdf, text_content, selected_criteria, chart_png=None, title=None):
+    pdf.add_page()
+    if title:
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, title.encode('latin-1', 'ignore').decode('latin-1'), ln=True)
+    pdf.set_font("Arial", size=12)
+
+    # Add text content to PDF
+    for line in text_content.split('\n'):
+        try:
+            pdf.multi_cell(0, 10, line.encode('latin-1', 'ignore').decode('latin-1'))
+        except UnicodeEncodeError:
+            continue
+
+    # Add chart if available
+    if chart_png is not None:
+        image_name = _register_png(pdf, chart_png)
+
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 14)
+
+        if selected_criteria:
+            pdf.cell(0, 10, "Supplier Comparison Chart", ln=True, align='C')
+        else:
+            pdf.cell(0, 10, "Primary Attribute Comparison", ln=True, align='C')
+
+        pdf.ln(5)
+        available_width = pdf.w - 20
+        pdf.image(image_name, x=10, y=pdf.get_y(), w=available_width)
+
+def _pdf_bytes(pdf):
+    return pdf.output(dest='S').encode('latin-1')
+
+def create_pdf(text_content, selected_criteria, chart_fig=None, dpi=DEFAULT_CHART_DPI, chart_png=None):
+    """Build the report PDF entirely in memory and return it as a BytesIO.
+
+    The chart can be given as a figure (rendered at dpi) or as PNG bytes that were already rendered.
+    """
     try:
         pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        # Add text content to PDF
-        for line in text_content.split('\n'):
-            try:
-                pdf.multi_cell(0, 10, line.encode('latin-1', 'ignore').decode('latin-1'))
-            except UnicodeEncodeError:
-                continue
-        
-        # Add chart if available
-        if chart_fig is not None:
-            temp_chart_path = "temp_chart.png"
-            chart_fig.savefig(temp_chart_path, dpi=200, bbox_inches='tight')
-            
-            pdf.add_page()
-            pdf.set_font("Arial", "B", 14)
-            
-            if selected_criteria:
-                pdf.cell(0, 10, "Supplier Comparison Chart", ln=True, align='C')
-            else:
-                pdf.cell(0, 10, "Primary Attribute Comparison", ln=True, align='C')
-            
-            pdf.ln(5)
-            available_width = pdf.w - 20
-            pdf.image(temp_chart_path, x=10, y=pdf.get_y(), w=available_width)
-            
-            # Clean up temporary file
-            if os.path.exists(temp_chart_path):
-                os.remove(temp_chart_path)
-        
-        # Save PDF to buffer
-        pdf_buffer = io.BytesIO()
-        temp_pdf_path = "temp_report.pdf"
-        pdf.output(temp_pdf_path)
-        
-        with open(temp_pdf_path, "rb") as f:
-            pdf_buffer.write(f.read())
-        
-        # Clean up temporary PDF
-        if os.path.exists(temp_pdf_path):
-            os.remove(temp_pdf_path)
-        
+        if chart_png is None and chart_fig is not None:
+            chart_png = render_chart_png(chart_fig, dpi)
+        _add_report_pages(pdf, text_content, selected_criteria, chart_png)
+
+        pdf_buffer = io.BytesIO(_pdf_bytes(pdf))
+        pdf_buffer.seek(0)
+        return pdf_buffer
+
+    except Exception as e:
+        return None
+
+def create_batch_pdf(reports, dpi=DEFAULT_CHART_DPI):
+    """Combine many supplier reports into one multi-page PDF returned as a BytesIO.
+
+    Each report is a dict with 'text' and optional 'title', 'selected_criteria', 'chart_fig'
+    or 'chart_png'. Identical charts are embedded once and shared between pages.
+    """
+    try:
+        pdf = FPDF()
+        rendered = {}
+        for report in reports:
+            chart_png = report.get('chart_png')
+            chart_fig = report.get('chart_fig')
+            if chart_png is None and chart_fig is not None:
+                if id(chart_fig) not in rendered:
+                    rendered[id(chart_fig)] = render_chart_png(chart_fig, dpi)
+                chart_png = rendered[id(chart_fig)]
+            _add_report_pages(pdf, report['text'], report.get('selected_criteria'), chart_png, report.get('title'))
+
+        pdf_buffer = io.BytesIO(_pdf_bytes(pdf))
         pdf_buffer.seek(0)
         return pdf_buffer
-    
+
     except Exception as e:
         return None
@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'csv.gz': ('CSV (gzip)', 'csv.gz', 'application/gzip'),
+    'parquet': ('Parquet', 'parquet', 'application/octet-stream'),
+    'xlsx': ('Excel', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+EXPORT_CHUNK_ROWS = 100_000
+EXCEL_MAX_ROWS = 1_048_575
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024
+
+def ranking_fingerprint(data_fingerprint, ranking_inputs):
+    """Hash of a dataset fingerprint and the inputs that determine its ranking"""
+    hasher = hashlib.sha1(str(data_fingerprint).encode())
+    for key in sorted(ranking_inputs):
+        value = ranking_inputs[key]
+        hasher.update(key.encode())
+        if isinstance(value, np.ndarray):
+            hasher.update(str(value.dtype).encode())
+            hasher.update(np.ascontiguousarray(value).tobytes())
+        else:
+            hasher.update(repr(value).encode())
+    return hasher.hexdigest()
+
+class RankingExport:
+    """A full ranking held as row positions into the data, serialized on request in chunks.
+
+    Only EXPORT_CHUNK_ROWS rows of the ranked table exist as a DataFrame at any time; the
+    score column, if any, is attached chunk by chunk.
+    """
+
+    def __init__(self, data, positions, scores=None, score_column='Supplier_Score', chunk_rows=EXPORT_CHUNK_ROWS):
+        self.data = data
+        self.positions = positions
+        self.scores = scores
+        self.score_column = score_column
+        self.chunk_rows = chunk_rows
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def columns(self):
+        columns = list(self.data.columns)
+        if self.scores is not None and self.score_column not in columns:
+            columns.append(self.score_column)
+        return columns
+
+    def iter_chunks(self, columns=None):
+        """Yield the ranked rows as DataFrames of at most chunk_rows rows"""
+        columns = list(columns) if columns else self.columns
+        unknown = [col for col in columns if col not in self.columns]
+        if unknown:
+            raise KeyError(unknown[0])
+        data_columns = [col for col in columns if col in self.data.columns]
+        with_score = self.scores is not None and self.score_column in columns
+        for start in range(0, len(self.positions), self.chunk_rows):
+            end = start + self.chunk_rows
+            chunk = self.data.iloc[self.positions[start:end]][data_columns]
+            if with_score:
+                chunk = chunk.assign(**{self.score_column: self.scores[start:end]})
+            yield chunk[columns]
+
+    def write(self, fileobj, fmt, columns=None):
+        """Write the ranking to a binary file object in one of EXPORT_FORMATS"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if fmt == 'csv':
+            self._write_csv(fileobj, columns)
+        elif fmt == 'csv.gz':
+            with gzip.GzipFile(fileobj=fileobj, mode='wb', mtime=0) as gz:
+                self._write_csv(gz, columns)
+        elif fmt == 'parquet':
+            self._write_parquet(fileobj, columns)
+        else:
+            self._write_excel(fileobj, columns)
+
+    def to_bytes(self, fmt, columns=None):
+        buffer = io.BytesIO()
+        self.write(buffer, fmt, columns)
+        return buffer.getvalue()
+
+    def _write_csv(self, fileobj, columns):
+        for index, chunk in enumerate(self.iter_chunks(columns)):
+            fileobj.write(chunk.to_csv(index=False, header=index == 0).encode('utf-8'))
+
+    def _write_parquet(self, fileobj, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for chunk in self.iter_chunks(columns):
+                table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(fileobj, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _write_excel(self, fileobj, columns):
+        if len(self) > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS:,} rows; use CSV or Parquet for {len(self):,} suppliers")
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ValueError("Excel export requires openpyxl (pip install openpyxl)")
+        # A write-only workbook streams rows to disk as they are appended instead of keeping
+        # a cell object per value, so memory stays at one chunk
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Rankings')
+        sheet.append(list(columns) if columns else self.columns)
+        for chunk in self.iter_chunks(columns):
+            # Missing values become empty cells, as with DataFrame.to_excel
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                sheet.append(row)
+        workbook.save(fileobj)
+
+class ExportCache:
+    """LRU cache of exported bytes keyed by (ranking fingerprint, format, columns), with a memory budget"""
+
+    def __init__(self, memory_budget=DEFAULT_CACHE_BUDGET):
+        self.memory_budget = memory_budget
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def memory_used(self):
+        return sum(len(value) for value in self._entries.values())
+
+    @staticmethod
+    def key(fingerprint, fmt, columns=None):
+        return (fingerprint, fmt, tuple(columns) if columns else None)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return None
+
+    def put(self, key, payload):
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(payload) > self.memory_budget:
+                return
+            self._entries[key] = payload
+            while self.memory_used > self.memory_budget:
+                self._entries.popitem(last=False)
+
+    def export(self, ranking_export, fingerprint, fmt, columns=None):
+        """Cached bytes of ranking_export in fmt, serializing only on a miss"""
+        key = self.key(fingerprint, fmt, columns)
+        payload = self.get(key)
+        if payload is None:
+            payload = ranking_export.to_bytes(fmt, columns)
+            self.put(key, payload)
+        return payload
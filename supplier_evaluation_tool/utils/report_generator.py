@@ -1,33 +1,105 @@
-import google.generativeai as genai
-from config.secrets import GEMINI_API_KEY
+import asyncio
+import numpy as np
 import pandas as pd
-genai.configure(api_key=GEMINI_API_KEY)
+from core.data_preprocessor import ID_COLUMNS
+from core.job_queue import JobCancelled
+from utils.instrumentation import instrument
+from utils.llm_client import BackgroundLoop, ResponseCache, create_llm_client, stream_with_retries, with_retries
 
-def generate_supplier_report(ranked_suppliers, selected_criteria, top_n=3):
-    """Generate an AI-powered report analyzing the top suppliers"""
-    try:
-        # Create Gemini model
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Get top suppliers
-        selected_suppliers = ranked_suppliers.head(top_n)
-        
-        # Prepare supplier summaries
-        supplier_summaries = []
-        for idx, row in selected_suppliers.iterrows():
-            supplier_info = [f"• {col}: {val}" for col, val in row.items() 
-                             if pd.notna(val) and col != 'Supplier_Score']
-            supplier_summary = f"Supplier {idx+1}:\n\n" + "\n".join(supplier_info)
-            supplier_summaries.append(supplier_summary)
-        
-        # Join all supplier summaries
-        supplier_block = '\n\n'.join(supplier_summaries)
-        
-        # Format criteria text
-        criteria_text = ', '.join(selected_criteria) if selected_criteria else "None (Using AI-powered evaluation)"
-        
-        # Create Gemini-compatible prompt
-        gemini_prompt = f"""**Role**: You are a senior analyst specializing in supplier evaluation and strategic sourcing.
+DEFAULT_TOKEN_BUDGET = 6000
+CHARS_PER_TOKEN = 4
+MAX_CELL_CHARS = 40
+EXCLUDED_PROMPT_COLUMNS = ['Supplier_Score', 'Label', 'index']
+
+_llm_client = None
+_response_cache = ResponseCache(max_entries=128, ttl_seconds=3600)
+_background_loop = BackgroundLoop()
+
+def get_llm_client():
+    """Shared LLM client, created once per process"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = create_llm_client()
+    return _llm_client
+
+def build_supplier_summaries(selected_suppliers):
+    supplier_summaries = []
+    for idx, row in selected_suppliers.iterrows():
+        supplier_info = [f"• {col}: {val}" for col, val in row.items()
+                         if pd.notna(val) and col != 'Supplier_Score']
+        supplier_summary = f"Supplier {idx+1}:\n\n" + "\n".join(supplier_info)
+        supplier_summaries.append(supplier_summary)
+    return supplier_summaries
+
+def estimate_tokens(text):
+    """Rough token count for Gemini-style tokenizers (about 4 characters per token)"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def _column_importance(frame, keep_columns):
+    """Rank columns for the prompt: kept columns first, then by how much they vary across suppliers"""
+    spread = {}
+    for col in frame.columns:
+        series = frame[col]
+        if col in keep_columns:
+            spread[col] = np.inf
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            spread[col] = np.nanstd(values) / (abs(np.nanmean(values)) + 1e-9) if np.isfinite(values).any() else 0.0
+        else:
+            spread[col] = series.nunique() / max(len(series), 1)
+    return sorted(frame.columns, key=lambda col: spread[col], reverse=True)
+
+def build_compact_supplier_table(selected_suppliers, selected_criteria=None, token_budget=DEFAULT_TOKEN_BUDGET,
+                                 max_cell_chars=MAX_CELL_CHARS):
+    """Serialize suppliers as one markdown table that fits in token_budget.
+
+    Constant and empty columns are dropped, cells are truncated to max_cell_chars, and if the
+    table is still too large the least informative columns are left out. Returns
+    (table, included_columns, dropped_columns).
+    """
+    frame = selected_suppliers.drop(columns=[c for c in EXCLUDED_PROMPT_COLUMNS if c in selected_suppliers.columns])
+    keep_columns = [c for c in (selected_criteria or []) if c in frame.columns]
+    keep_columns += [c for c in ID_COLUMNS if c in frame.columns][:1]
+
+    non_empty = frame.notna().any()
+    varying = frame.nunique(dropna=False) > 1 if len(frame) > 1 else non_empty
+    candidates = [c for c in frame.columns if c in keep_columns or (non_empty[c] and varying[c])]
+    dropped_columns = [c for c in frame.columns if c not in candidates]
+
+    cells = {}
+    for col in candidates:
+        text = frame[col].astype(object).where(frame[col].notna(), '').astype(str)
+        cells[col] = text.str.slice(0, max_cell_chars).str.replace('|', '/', regex=False)
+
+    rank_cells = pd.Series(np.arange(1, len(frame) + 1), index=frame.index).astype(str)
+    # Every column costs its header, its cells and a " | " separator per row
+    column_chars = {col: len(col) + 3 + int(cells[col].str.len().sum()) + 3 * len(frame) for col in candidates}
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    total_chars = 16 + 8 * len(frame) + sum(column_chars.values())
+    included = _column_importance(frame[candidates], keep_columns)
+    while included and total_chars > budget_chars and included[-1] not in keep_columns:
+        removed = included.pop()
+        total_chars -= column_chars[removed]
+        dropped_columns.append(removed)
+    included = [c for c in candidates if c in included]
+
+    header = '| Rank | ' + ' | '.join(included) + ' |'
+    separator = '|---|' + '---|' * len(included)
+    rows = '| ' + rank_cells
+    for col in included:
+        rows = rows + ' | ' + cells[col]
+    table = '\n'.join([header, separator] + (rows + ' |').tolist())
+    return table, included, dropped_columns
+
+def build_report_prompt(supplier_summaries, selected_criteria):
+    # Join all supplier summaries
+    supplier_block = '\n\n'.join(supplier_summaries)
+
+    # Format criteria text
+    criteria_text = ', '.join(selected_criteria) if selected_criteria else "None (Using AI-powered evaluation)"
+
+    # Create Gemini-compatible prompt
+    return f"""**Role**: You are a senior analyst specializing in supplier evaluation and strategic sourcing.
 **Evaluation Criteria**: {criteria_text}
 **Supplier Data**:
 {supplier_block}
@@ -47,18 +119,154 @@ def generate_supplier_report(ranked_suppliers, selected_criteria, top_n=3):
 5. **Final Recommendation**:
    - Professional summary with benefits and risks
 Format the response using markdown with clear section headings."""
-        
+
+def build_compact_report_prompt(ranked_suppliers, selected_criteria, top_n=3, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Build the report prompt around a compact supplier table and estimate its token count.
+
+    Returns a dict with prompt, estimated_tokens, table and dropped_columns.
+    """
+    template_tokens = estimate_tokens(build_report_prompt([''], selected_criteria))
+    table, _, dropped_columns = build_compact_supplier_table(
+        ranked_suppliers.head(top_n), selected_criteria, max(token_budget - template_tokens, 0)
+    )
+    supplier_block = table
+    if dropped_columns:
+        supplier_block = f"{table}\n(Columns omitted for brevity: {', '.join(map(str, dropped_columns))})"
+        if estimate_tokens(build_report_prompt([supplier_block], selected_criteria)) > token_budget:
+            supplier_block = f"{table}\n({len(dropped_columns)} columns omitted for brevity)"
+    prompt = build_report_prompt([supplier_block], selected_criteria)
+    return {
+        'prompt': prompt,
+        'estimated_tokens': estimate_tokens(prompt),
+        'table': table,
+        'dropped_columns': dropped_columns,
+    }
+
+def format_score_drivers(drivers_table):
+    """Plain-text section listing each supplier's score and top drivers from an attribution table"""
+    lines = ["🔍 Score Drivers (computed locally):"]
+    for rank, row in enumerate(drivers_table.to_dict('records'), start=1):
+        drivers = row['Top drivers'] or 'no strong drivers'
+        lines.append(f"{rank}. {row['Supplier']}: score {row['Score']:.3f} (baseline {row['Baseline']:.3f}); {drivers}")
+    return "\n".join(lines)
+
+def format_report(supplier_summaries, ai_response, drivers_table=None):
+    report_lines = []
+    for supplier_summary in supplier_summaries:
+        report_lines.append(f"\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n{supplier_summary}\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+
+    report = "\n".join(report_lines)
+    if drivers_table is not None and len(drivers_table):
+        report += "\n\n" + format_score_drivers(drivers_table)
+    return report + "\n\n🏆 GenAI Evaluation:\n" + ai_response
+
+async def generate_text_async(prompt, client=None, cache=_response_cache, retries=3):
+    """Generate a response for prompt, served from the cache when the same prompt was seen recently"""
+    client = client or get_llm_client()
+    key = ResponseCache.make_key(client.model_name, prompt)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    text = (await with_retries(lambda: client.generate(prompt), retries=retries)).strip()
+    if cache is not None:
+        cache.put(key, text)
+    return text
+
+async def stream_text_async(prompt, client=None, cache=_response_cache, retries=3):
+    """Yield response chunks as they arrive; the complete text is cached once the stream ends.
+
+    Failures before the first chunk are retried with the same backoff as generate_text_async.
+    """
+    client = client or get_llm_client()
+    key = ResponseCache.make_key(client.model_name, prompt)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    async for chunk in stream_with_retries(lambda: client.stream(prompt), retries=retries):
+        chunks.append(chunk)
+        yield chunk
+    if cache is not None:
+        cache.put(key, ''.join(chunks).strip())
+
+async def generate_reports_async(prompts, client=None, max_concurrency=4, retries=3):
+    """Generate many prompts concurrently, at most max_concurrency requests in flight"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate_one(prompt):
+        async with semaphore:
+            return await generate_text_async(prompt, client=client, retries=retries)
+
+    return await asyncio.gather(*(generate_one(prompt) for prompt in prompts), return_exceptions=True)
+
+@instrument()
+def generate_supplier_report(ranked_suppliers, selected_criteria, top_n=3, on_token=None, token_budget=None,
+                             drivers_table=None):
+    """Generate an AI-powered report analyzing the top suppliers.
+
+    If on_token is given, the response is streamed and on_token is called in the caller's thread
+    with the text received so far. With token_budget, suppliers are sent as a compact table
+    trimmed to fit the budget instead of one bullet list per supplier. drivers_table (from
+    ScoreAttribution.table) is added to the report as is; it is not sent to the model.
+    """
+    try:
+        if token_budget is not None:
+            prompt_plan = build_compact_report_prompt(ranked_suppliers, selected_criteria, top_n, token_budget)
+            supplier_summaries = [prompt_plan['table']]
+            gemini_prompt = prompt_plan['prompt']
+        else:
+            # Get top suppliers
+            selected_suppliers = ranked_suppliers.head(top_n)
+
+            # Prepare supplier summaries
+            supplier_summaries = build_supplier_summaries(selected_suppliers)
+            gemini_prompt = build_report_prompt(supplier_summaries, selected_criteria)
+
         # Generate content with Gemini
-        response = model.generate_content(gemini_prompt)
-        ai_response = response.text.strip()
-        
-        # Format final report
-        report_lines = []
-        for supplier_summary in supplier_summaries:
-            report_lines.append(f"\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n{supplier_summary}\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-        
-        final_report = "\n".join(report_lines) + "\n\n🏆 GenAI Evaluation:\n" + ai_response
-        return final_report
-    
+        if on_token is None:
+            ai_response = _background_loop.run(generate_text_async(gemini_prompt))
+        else:
+            received = ''
+            for chunk in _background_loop.iterate(stream_text_async(gemini_prompt)):
+                received += chunk
+                on_token(received)
+            ai_response = received.strip()
+
+        return format_report(supplier_summaries, ai_response,
+                             drivers_table.head(top_n) if drivers_table is not None else None)
+
+    except JobCancelled:
+        raise
+    except Exception as e:
+        return f"⚠️ Error generating report: {str(e)}"
+
+def generate_sub_reports(ranked_suppliers, selected_criteria, group_by=None, top_n=3, max_concurrency=4):
+    """Generate one report per top supplier, or per value of group_by, concurrently.
+
+    Returns a dict mapping the supplier position or group value to its report text.
+    """
+    try:
+        if group_by is None:
+            groups = {i + 1: ranked_suppliers.iloc[[i]] for i in range(min(top_n, len(ranked_suppliers)))}
+        else:
+            groups = {value: group.head(top_n) for value, group in ranked_suppliers.groupby(group_by, sort=False, observed=True)}
+
+        summaries = {key: build_supplier_summaries(group) for key, group in groups.items()}
+        prompts = [build_report_prompt(summary, selected_criteria) for summary in summaries.values()]
+        responses = _background_loop.run(generate_reports_async(prompts, max_concurrency=max_concurrency))
+
+        reports = {}
+        for (key, summary), response in zip(summaries.items(), responses):
+            if isinstance(response, Exception):
+                reports[key] = f"⚠️ Error generating report: {str(response)}"
+            else:
+                reports[key] = format_report(summary, response)
+        return reports
+
+    except JobCancelled:
+        raise
     except Exception as e:
-        return f"⚠️ Error generating report: {str(e)}"
\ No newline at end of file
+        return {None: f"⚠️ Error generating report: {str(e)}"}